@@ -24,6 +24,10 @@ Dependencies
    the ``tzlocal`` python module. ``easy_install`` or ``pip install`` should
    suffice here. 
 
+4. optionally, the ``numpy`` module, for drawing ticks in batches and for
+   the time series overlays. It's imported when one of them is first used.
+   ``pip install numpy`` should suffice here.
+
 Platforms
 ---------
 
@@ -52,7 +56,9 @@ overwhelmingly. It will center around the current time in the current timezone.
 
 :class:`Timeline` and :class:`TimeTick` *is* timezone aware and is able to 
 handle it by themselves in most cases. They by default use the local timezone
-in the computation of times. 
+in the computation of times. The local timezone is looked up once, when
+the first one is created, and cached; call :func:`refresh_local_zone` if it changes
+while the app runs (see :func:`local_zone`).
 
 Most of the customizable settings in :class:`Timeline` are the same as
 :class:`~kivy.garden.tickline.Tickline`. These include 
@@ -66,11 +72,13 @@ versions of :attr:`~Timeline.min_index`, :attr:`~Timeline.max_index`,
 :attr:`~Timeline.index_0`, and :attr:`~Timeline.index_1`.
 
 The centerpiece of :class:`Timeline`, though, is really :class:`TimeTicks`s.
-There are many available options for the intervals tracked, from 1 second to
-1 day (the default ticks offer a sample of the them), listed in 
+There are many available options for the intervals tracked, from 1 microsecond to
+1 decade (the default ticks offer a sample of the them), listed in 
 :attr:`TimeTick.mode_options`. You can change a :class:`TimeTick`'s interval
 by changing its :attr:`~TimeTick.mode`. For example::
 
+    # interval of 100 microseconds
+    tick = TimeTick(mode='100 microseconds')
     # interval of 1 second
     tick = TimeTick(mode='second')
     # interval of 15 seconds
@@ -79,7 +87,14 @@ by changing its :attr:`~TimeTick.mode`. For example::
     tick = TimeTick(mode='minute')
     # interval of 30 minutes
     tick = TimeTick(mode='30 minutes')
+    # on the first of each month
+    tick = TimeTick(mode='month')
     
+Weeks, months, quarters, years and decades (the 
+:attr:`TimeTick.calendar_modes`) follow the calendar of 
+:attr:`TimeTick.tz`: their ticks fall on Mondays and on the first of the
+months, found by calendar arithmetic from the first one in view.
+
 Most other attributes are inherited from :class:`kivy.garden.tickline.Tick`.
 These include :attr:`~TimeTick.tick_size`, :attr:`~TimeTick.label_global`,
 :attr:`~TimeTick.halign`, :attr:`~TimeTick.valign`, etc.
@@ -109,64 +124,826 @@ A more complex working example is::
         acc.add_widget(complex_)
         runTouchApp(acc)
 
+Overlays
+--------
+
+Data can be drawn over the ticks by adding :class:`TimelineOverlay`s to 
+:attr:`Timeline.overlays`. For example, :class:`TimeSeries` plots a time 
+series given as seconds since unix epoch and values (this requires 
+``numpy``)::
+
+    series = TimeSeries(timestamps, values, value_min=-1, value_max=1)
+    timeline = Timeline(overlays=[series])
+
+The series is summarized at each granularity of :class:`TimeTick`, so 
+that no more than a couple of points per pixel are drawn, however many 
+samples are in view.
+
+Similarly, :class:`SpanLayer` draws spans of time, such as shifts or incidents,
+as bars; only the spans in view are looked up and drawn::
+
+    spans = SpanLayer()
+    spans.add_span(start_time, end_time)
+    timeline.overlays.append(spans)
+
+Live data can be pushed from any thread with :meth:`TimeSeries.push`,
+:meth:`TimeSeries.extend` and :meth:`SpanLayer.push_span`; what arrives 
+during a frame is applied at once at the next one, redrawing only what it
+affects. Setting :attr:`TimeSeries.capacity` keeps only the latest samples,
+and :attr:`Timeline.follow_now` keeps the current time in view::
+
+    series = TimeSeries(capacity=100000)
+    timeline = Timeline(overlays=[series], follow_now=True)
+    # in a producer thread
+    series.push(time.time(), reading)
+
+Series too large for memory can be written once to a :class:`TimeSeriesStore`,
+a directory of memory-mapped columns with a block index summarizing the 
+minimum and maximum of each block, and plotted by :class:`StoredTimeSeries`;
+each frame then reads only the blocks in view, or only their summaries when
+zoomed out::
+
+    store = TimeSeriesStore.write('readings', chunks)
+    timeline.overlays.append(StoredTimeSeries(store))
+
+Samples from slow sources, such as remote databases, can be fetched 
+asynchronously by a :class:`SourcedTimeSeries` from a :class:`DataSource`,
+whose :meth:`DataSource.fetch` returns futures. Only the parts of the window
+not cached are fetched, at the resolution of the densest tick shown, while 
+fetches the window moved away from are cancelled. :class:`SimulatedSource` 
+stands in for a remote source, with artificial latency::
+
+    series = SourcedTimeSeries(SimulatedSource(latency=.5))
+    timeline.overlays.append(series)
+
+Performance
+-----------
+
+Dense timelines, such as those showing all of :func:`all_time_ticks`, can
+draw each :class:`TimeTick` in one go by setting 
+:attr:`TimeTick.batch_draw` (this requires ``numpy``)::
+
+    timeline = Timeline(ticks=all_time_ticks(batch_draw=True))
+
+Label textures are cached by :class:`LabelTextureCache`. The ones not yet 
+cached can be rasterized later by setting :attr:`TimeLabeller.async_labels`;
+they show up a frame or two later, instead of stalling the frame that needs
+them. With the PIL text provider they are rasterized off the main thread; 
+with the others, which aren't thread safe, in the spare time of the next 
+frames (see :class:`LabelRasterizer`)::
+
+    timeline.labeller.async_labels = True
+
+Alternatively, :attr:`TimeLabeller.glyph_labels` draws all labels from
+one :class:`GlyphAtlas` of the few glyphs they use per font size, as the 
+quads of a single mesh, so that no texture is created per label.
+
+When panning or zooming, :attr:`Timeline.prefetch` prepares the labels 
+about to enter the window in the spare time of each frame, extrapolating
+the motion of the window.
+
+With :attr:`TimeLabeller.cull_labels`, labels that would overlap, as on narrow 
+horizontal timelines, are left out before their textures are made, their 
+extents being estimated from the widths of their glyphs; labels of coarser
+ticks are kept first. It's off by default, drawing all labels as before.
+
+Setting :attr:`Timeline.frame_budget` keeps redraws within a time budget by
+lowering the level of detail, :attr:`Timeline.lod`, while the window 
+moves, deferring label rasterization then dropping the densest ticks, and 
+redraws in full once it stops.
+
+Alternatively, :attr:`Timeline.tiled` renders ticks and labels into 
+tiles of fixed length in time, kept in textures (see 
+:class:`TimelineTiles`), so that panning only moves tiles and renders 
+those entering the window.
+
+Time arithmetic is done on integer microseconds since unix epoch, which
+are exact at any date and need no datetime: see :func:`micros_of`, 
+:func:`round_micros`, :func:`split_micros` and :class:`TzOffsets`. These 
+also take numpy integer arrays, and functions and methods ending in 
+``_array``, such as :meth:`TzOffsets.wall_clock_array`, convert arrays in 
+bulk::
+
+    micros = tick.micros_array(indices)
+    years, months, days = tick.get_offsets().wall_clock_array(micros)[:3]
+
+The datetime based API, such as :meth:`Timeline.datetime_of` and 
+:func:`round_time`, wraps these.
+
+When a utc offset change, such as a daylight saving transition, is in view,
+the ticks of fixed length modes are read from the :class:`BoundaryTable` of
+their timezone and mode (see :meth:`TzOffsets.boundaries`): the instants 
+the wall clock crosses their units, such as local midnights, computed once
+per range and extended as the window pans.
+
+Indices are float numbers of days, which are too coarse far from 1970 for
+the sub-second modes. A :class:`Timeline` thus counts its indices from a
+movable :attr:`Timeline.origin`, in microseconds since unix epoch, which 
+:attr:`Timeline.auto_origin` brings to the window when zooming in below 
+about a second, keeping ticks, :meth:`Timeline.pos2time` and 
+:meth:`Timeline.index_of` exact to the microsecond.
+
+Timelines showing the same window, say in several timezones, can be
+locked together with a :class:`TimelineGroup`, which also shares their 
+label textures and the ticks they compute::
+
+    group = TimelineGroup([Timeline(tz=tz) for tz in zones])
+
+To measure such changes, ``benchmark.py`` drives timelines headlessly 
+through scripted pan, zoom and follow-now scenarios and prints per-frame 
+timings as JSON::
+
+    python benchmark.py --frames 300 > results.json
+
 Extending
 ---------
 
 The :class:`TimeTick` overrides :meth:`Tick.tick_iter`
-to yield datetimes instead of local indices, and :meth:`Tick.draw` similarly
-expects datetimes instead of indices. Hence for most graphics customization, 
+to yield local indices computed directly from the window, and 
+:meth:`Tick.draw` to take these indices instead of (pos, index) pairs. 
+Set :attr:`TimeTick.datetime_ticks` to have them work with datetimes instead.
+Hence for most graphics customization, 
 overriding :meth:`TimeTick.draw` may be enough. For example, a time series
 grapher can override :meth:`TimeTick.draw` to draw a dot at the height 
-corresponding to the given datetime. 
+corresponding to the given datetime (see :meth:`TimeTick.datetime_of`). 
 
 Of course, the labeller :class:`TimeLabeller` can also be subclassed or
 ducktyped to provide the necessary functionality.
 
 '''
+from array import array
 from bisect import bisect, bisect_left
+from calendar import day_abbr, month_abbr
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from decimal import DivisionByZero
-from itertools import chain
-from kivy.base import runTouchApp
-from kivy.core.text import Label as CoreLabel
+from functools import partial
+from itertools import chain, count
+from json import dumps, loads
+from kivy.clock import Clock
 from kivy.event import EventDispatcher
 from kivy.garden.tickline import TickLabeller, Tick, Tickline
 from kivy.graphics.context_instructions import Color
-from kivy.graphics.vertex_instructions import Rectangle, Line
+from kivy.graphics.instructions import InstructionGroup
+from kivy.graphics.texture import Texture
+from kivy.graphics.vertex_instructions import Rectangle, Mesh
 from kivy.lang import Builder
-from kivy.metrics import dp
+from kivy.logger import Logger
+from kivy.metrics import dp, Metrics
 from kivy.properties import ListProperty, NumericProperty, OptionProperty, \
     DictProperty, ObjectProperty, BoundedNumericProperty, BooleanProperty, \
-    AliasProperty
-from kivy.uix.accordion import AccordionItem, Accordion
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.button import Button
-from kivy.uix.label import Label
-from math import ceil, floor
+    AliasProperty, Property, ReferenceListProperty
+from kivy.uix.widget import Widget
+from math import ceil, floor, log
 from numbers import Number
+from operator import add
+from os import makedirs
+from os.path import exists, getsize, join
 from pytz import UTC
+from time import sleep, time as unix_time
+from timeit import default_timer
 
-try:
-    from tzlocal import get_localzone
-except ImportError:
-    from jnius import autoclass
-    from pytz import timezone
-    TimeZone = autoclass('java.util.TimeZone')
+class _LazyNumpy(object):
+    '''stands in for numpy until it's first used, so that importing this
+    module, e.g. only for its time math, doesn't import numpy. The first
+    attribute looked up on it imports numpy in its place.'''
+    
+    def __getattr__(self, name):
+        module = import_numpy()
+        if module is None:
+            raise ImportError('numpy is required here')
+        return getattr(module, name)
     
-    def get_localzone():
-        return timezone(TimeZone.getDefault().getID())
+numpy = _LazyNumpy()
+
+def import_numpy():
+    '''imports numpy, if it's not yet, and returns it, or None if it's not
+    installed. numpy is only imported when the batch drawing of ticks or the
+    time series need it.'''
+    global numpy
+    if isinstance(numpy, _LazyNumpy):
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+    return numpy
+
+def get_localzone():
+    '''looks up the local timezone, with tzlocal or, on Android, through
+    pyjnius. Both are imported on the first lookup only. Prefer
+    :func:`local_zone`, which caches the result.'''
+    try:
+        from tzlocal import get_localzone
+    except ImportError:
+        from jnius import autoclass
+        from pytz import timezone
+        return timezone(autoclass('java.util.TimeZone').getDefault().getID())
+    return get_localzone()
+
+_local_zone = None
+
+def local_zone():
+    '''gives the local timezone, looked up on first use and cached. This is
+    the default :attr:`TimeTick.tz` and :attr:`Timeline.tz`.'''
+    global _local_zone
+    if _local_zone is None:
+        _local_zone = get_localzone()
+    return _local_zone
+
+def refresh_local_zone():
+    '''looks up the local timezone again, e.g. after the system timezone
+    was changed, and returns it. Only ticks and timelines created afterwards
+    default to the new zone; set their ``tz`` to update existing ones.'''
+    global _local_zone
+    try:
+        from tzlocal import reload_localzone
+    except ImportError:
+        pass
+    else:
+        reload_localzone()
+    _local_zone = None
+    return local_zone()
     
 def local_now():
-    return get_localzone().localize(datetime.now())    
+    return local_zone().localize(datetime.now())    
 
-Builder.load_string('''
+def auto_size_label():
+    '''gives the class :class:`AutoSizeLabel`, a 
+    :class:`~kivy.uix.label.Label` sized to its texture. It's defined, and
+    its kv rule registered, on first use, so that importing this module
+    doesn't import :mod:`kivy.uix.label`.'''
+    global AutoSizeLabel
+    try:
+        return AutoSizeLabel
+    except NameError:
+        pass
+    from kivy.uix.label import Label
+    
+    class AutoSizeLabel(Label):
+        '''a :class:`~kivy.uix.label.Label` sized to its texture.'''
+    
+    Builder.load_string('''
 <AutoSizeLabel>:
     size: self.texture_size
     size_hint: None, None
 ''')
-class AutoSizeLabel(Label):
-    pass
+    return AutoSizeLabel
+
+def __getattr__(name):
+    # defines AutoSizeLabel when it's first imported from this module
+    if name == 'AutoSizeLabel':
+        return auto_size_label()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+class LabelTextureCache(object):
+    '''a bounded, least recently used cache of label textures, keyed on
+    all the keyword arguments the label is created with (its text, font 
+    size, alignment, color, font name, ...) and the screen dpi.
+    
+    Time labels repeat a lot: panning back and forth over the same few days
+    asks for the same "12:15" over and over again. Consulting this cache
+    before creating a :class:`~kivy.core.text.Label` avoids rasterizing and
+    uploading identical textures each time a tick scrolls back into view.
+    
+    :param capacity: the maximal number of textures kept. When exceeded,
+        the least recently used texture is evicted. Defaults to 512.
+    '''
+    
+    def __init__(self, capacity=512):
+        self._textures = OrderedDict()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        
+    def __len__(self):
+        return len(self._textures)
+    
+    def __contains__(self, key):
+        return key in self._textures
+    
+    @staticmethod
+    def key_of(label_kw):
+        '''gives the cache key for the keyword arguments ``label_kw`` of
+        a :class:`~kivy.core.text.Label`.'''
+        # lists, such as colors, aren't hashable
+        return tuple(sorted((name, tuple(value) if isinstance(value, list) 
+                             else value)
+                            for name, value in label_kw.items())) + \
+               (Metrics.dpi,)
+        
+    def get(self, key):
+        '''returns the texture cached under ``key``, or None. A hit marks
+        the texture as the most recently used.'''
+        texture = self._textures.pop(key, None)
+        if texture is None:
+            self.misses += 1
+            return None
+        self._textures[key] = texture
+        self.hits += 1
+        return texture
+    
+    def put(self, key, texture):
+        '''caches ``texture`` under ``key``, evicting the least recently used
+        textures if the cache grows beyond :attr:`capacity`.'''
+        textures = self._textures
+        textures.pop(key, None)
+        textures[key] = texture
+        while len(textures) > max(self.capacity, 0):
+            textures.popitem(last=False)
+            
+    def texture_of(self, label_kw):
+        '''returns the texture of a :class:`~kivy.core.text.Label` created
+        with ``label_kw``, rasterizing it only if it's not already cached.'''
+        key = self.key_of(label_kw)
+        texture = self.get(key)
+        if texture is None:
+            texture = self.rasterize(key, label_kw)
+        return texture
+    
+    def rasterize(self, key, label_kw):
+        '''creates the texture of a :class:`~kivy.core.text.Label` with
+        ``label_kw`` and caches it under ``key``.'''
+        from kivy.core.text import Label as CoreLabel
+        label = CoreLabel(**label_kw)
+        label.refresh()
+        texture = label.texture
+        self.put(key, texture)
+        return texture
+    
+    def resize(self, capacity):
+        '''changes :attr:`capacity`, evicting textures if necessary.'''
+        self.capacity = capacity
+        textures = self._textures
+        while len(textures) > max(capacity, 0):
+            textures.popitem(last=False)
+    
+    def clear(self):
+        self._textures.clear()
+        
+default_texture_cache = LabelTextureCache()
+'''the :class:`LabelTextureCache` shared by :meth:`TimeTick.get_label_texture`
+and, unless given another one, all :class:`TimeLabeller`s.
+'''
+
+def render_label(label_kw):
+    '''lays out and rasterizes the text of a :class:`~kivy.core.text.Label`
+    created with ``label_kw``, without touching OpenGL, and returns the
+    pixels as an :class:`~kivy.core.image.ImageData`, or None if the text
+    has no extent.
+    
+    Kivy has no public api for this: it runs the two passes of 
+    :meth:`~kivy.core.text.LabelBase.refresh`, ``render()`` and then 
+    ``_render_real()``, handing the latter a stand-in texture that keeps the
+    pixels. All the text providers of Kivy 1.8 to 2.3 inherit both from 
+    :class:`~kivy.core.text.LabelBase`; if the text provider lacks them 
+    (see :func:`renders_labels`), this raises NotImplementedError. It's 
+    only safe outside of the main thread with the providers of 
+    :attr:`LabelRasterizer.threaded_providers`.'''
+    if not renders_labels():
+        raise NotImplementedError('the text provider has no render pass')
+    from kivy.core.text import Label as CoreLabel
+    label = CoreLabel(**label_kw)
+    label.resolve_font_name()
+    size = label.render()
+    if size[0] <= 1 or size[1] <= 1:
+        return None
+    label._size = label._size_texture = size
+    captured = []
+    class Capture(object):
+        def blit_data(self, data):
+            captured.append(data)
+    label.texture = Capture()
+    label._render_real()
+    return captured[0] if captured else None
+
+def renders_labels():
+    '''whether the text provider has the internals :func:`render_label` 
+    relies on. If not, labels are only rasterized by
+    :meth:`~kivy.core.text.LabelBase.refresh`, on the main thread.'''
+    from kivy.core.text import Label as CoreLabel
+    return all(hasattr(CoreLabel, name) for name in 
+               ('resolve_font_name', 'render', '_render_real', 
+                '_render_begin', '_render_end'))
+
+class LabelRasterizer(object):
+    '''rasterizes label textures later, so that the frame needing them 
+    doesn't have to.
+    
+    Laying out and rasterizing text dominates the cost of a new label; 
+    :meth:`submit` queues that work instead, and :meth:`upload` creates the
+    textures on the main thread, at most for :attr:`budget` seconds a 
+    frame, the rest waiting for the next frame. With the text providers of
+    :attr:`threaded_providers`, the text is rasterized by :func:`render_label`
+    in worker threads beforehand, so that :meth:`upload` only has to upload
+    the pixels. Note that the text providers of Kivy run with the GIL held,
+    so the workers only keep rasterizing off the frame, they don't run in
+    parallel with it.
+    
+    :param workers: the number of worker threads, started on the first
+        :meth:`submit`. Defaults to 1.
+    :param budget: the time in seconds :meth:`upload` may spend each frame.
+        Defaults to 4 milliseconds.
+    '''
+    
+    threaded_providers = ('LabelPIL',)
+    '''the class names of the text providers rasterized in worker threads.
+    The others rasterize on the main thread, within :attr:`budget`: the 
+    SDL2 and pango providers share their font state between all labels, 
+    including those rasterized at the same time on the main thread, and 
+    aren't thread safe.'''
+    
+    def __init__(self, workers=1, budget=.004):
+        self.workers = workers
+        self.budget = budget
+        self._jobs = deque()
+        self._done = deque()
+        # the threads, and their semaphore, are made on the first submit
+        self._waiting = None
+        self._pending = {}
+        self._threads = []
+        self._trigger_upload = Clock.create_trigger(self.upload)
+        
+    def __len__(self):
+        return len(self._pending)
+        
+    def submit(self, key, label_kw, callback):
+        '''queues the rasterization of the label with ``label_kw``. Once 
+        uploaded, ``callback(key, texture)`` is called on the main thread. 
+        Returns False if ``key`` was already queued, in which case 
+        ``callback`` is only added to its callbacks.'''
+        callbacks = self._pending.get(key)
+        if callbacks is not None:
+            callbacks.append(callback)
+            return False
+        self._pending[key] = [callback]
+        if not self.threaded():
+            # rasterized by upload, on the main thread
+            self._done.append((key, label_kw, None))
+            self._trigger_upload()
+            return True
+        if self._waiting is None:
+            from threading import Semaphore
+            self._waiting = Semaphore(0)
+        if len(self._threads) < self.workers:
+            from threading import Thread
+        while len(self._threads) < self.workers:
+            thread = Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        self._jobs.append((key, label_kw))
+        self._waiting.release()
+        return True
+    
+    def threaded(self):
+        '''whether the current text provider is one of 
+        :attr:`threaded_providers`, and :func:`render_label` works with 
+        it.'''
+        from kivy.core.text import Label as CoreLabel
+        return CoreLabel.__name__ in self.threaded_providers and \
+            renders_labels()
+    
+    def _work(self):
+        jobs, done = self._jobs, self._done
+        while True:
+            self._waiting.acquire()
+            key, label_kw = jobs.popleft()
+            try:
+                data = render_label(label_kw)
+            except Exception:
+                # leave it to the main thread, to fail there if it must
+                data = None
+            done.append((key, label_kw, data))
+            self._trigger_upload()
+            
+    def upload(self, *args):
+        '''creates the textures of rasterized labels and calls their
+        callbacks, until :attr:`budget` is spent, rasterizing those that 
+        aren't yet. Called on the main thread whenever a label is queued or
+        rasterized.'''
+        done = self._done
+        start = default_timer()
+        while done:
+            key, label_kw, data = done.popleft()
+            if data is None:
+                from kivy.core.text import Label as CoreLabel
+                label = CoreLabel(**label_kw)
+                label.refresh()
+                texture = label.texture
+            else:
+                texture = self.texture_of(data, label_kw)
+            for callback in self._pending.pop(key, ()):
+                callback(key, texture)
+            if default_timer() - start > self.budget:
+                break
+        if done:
+            self._trigger_upload()
+            
+    @staticmethod
+    def texture_of(data, label_kw):
+        '''uploads the pixels ``data`` of the label with ``label_kw`` to a
+        new texture, which rasterizes the label again if the OpenGL context
+        is lost.'''
+        texture = Texture.create(size=(data.width, data.height),
+                                 colorfmt=data.fmt,
+                                 mipmap=label_kw.get('mipmap', False))
+        texture.flip_vertical()
+        texture.blit_data(data)
+        def reload(texture):
+            data = render_label(label_kw)
+            if data is not None:
+                texture.blit_data(data)
+        texture.add_reload_observer(reload)
+        return texture
+
+default_rasterizer = LabelRasterizer()
+'''the :class:`LabelRasterizer` shared by the labellers with 
+:attr:`TimeLabeller.async_labels` set.'''
+
+class GlyphRun(object):
+    '''the layout of a text with the glyphs of a :class:`GlyphAtlas`. Has
+    the ``size`` of the texture a :class:`~kivy.core.text.Label` would
+    have, and gives the quads of its glyphs with :meth:`emit`.'''
+    
+    def __init__(self, atlas, text, halign='left'):
+        self.atlas = atlas
+        self.text = text
+        self.halign = halign
+        glyphs = atlas.glyphs
+        line_height = atlas.height
+        lines = text.split('\n')
+        widths = [sum(glyphs[c][1] for c in line) for line in lines]
+        self.width = width = max(widths)
+        self.height = height = line_height * len(lines)
+        self.size = (width, height)
+        # (x, y, width, u0, u1) of each glyph, from the bottom left corner
+        quads = self.quads = []
+        for line, line_width, y in zip(lines, widths,
+                                       count(height - line_height, 
+                                             -line_height)):
+            if halign == 'center':
+                x = (width - line_width) / 2.
+            elif halign == 'right':
+                x = width - line_width
+            else:
+                x = 0
+            for c in line:
+                u, w = glyphs[c]
+                if c != ' ':
+                    quads.append((x, y, w, u, u + w))
+                x += w
+        # the vertices and indices of the quads, drawn at (0, 0), for emit
+        # to shift
+        tex_width = float(atlas.texture.width)
+        h = line_height
+        vertices = self._vertices = []
+        indices = self._indices = []
+        for n, (x, y, w, u0, u1) in zip(count(0, 4), quads):
+            u0 /= tex_width
+            u1 /= tex_width
+            # the atlas isn't flipped: v = 0 is the top of the glyphs
+            vertices.extend((x, y, u0, 1., x + w, y, u1, 1., 
+                             x + w, y + h, u1, 0., x, y + h, u0, 0.))
+            indices.extend((n, n + 1, n + 2, n + 2, n + 3, n))
+        self.vertex_count = len(vertices) // 4
+                
+    def emit(self, pos, vertices, indices):
+        '''appends to the lists ``vertices`` and ``indices`` of a triangle
+        :class:`~kivy.graphics.vertex_instructions.Mesh` the quads of the
+        glyphs, drawn with the bottom left corner at ``pos``.'''
+        x0, y0 = pos
+        n = len(vertices) // 4
+        vertices.extend(map(add, self._vertices, 
+                            (x0, y0, 0., 0.) * self.vertex_count))
+        indices.extend(map(n.__add__, self._indices))
+
+class GlyphAtlas(object):
+    '''a texture holding the glyphs of the time labels for a font size,
+    each rasterized once, side by side, for :class:`TimeLabeller` to
+    draw labels as quads of a single mesh (see 
+    :attr:`TimeLabeller.glyph_labels`). Glyphs missing from the atlas are
+    added, rebuilding its texture, when a text needing them is laid out.
+    
+    The :class:`GlyphRun`s laid out are kept, least recently used first,
+    up to :attr:`capacity`.
+    
+    :param font_size: the font size, in pixels.
+    '''
+    
+    capacity = 1024
+    '''the most :class:`GlyphRun`s kept by :meth:`layout`.'''
+    
+    alphabet = ''.join(sorted(set('0123456789:-. QWs' + ''.join(day_abbr) +
+                                  ''.join(month_abbr))))
+    '''the glyphs the atlas starts with: those of all the labels of
+    :class:`TimeTick`.'''
+    
+    def __init__(self, font_size):
+        self.font_size = font_size
+        self.glyphs = {}
+        self.texture = None
+        self.height = 0
+        self._runs = OrderedDict()
+        self.add(self.alphabet)
+        
+    def add(self, chars):
+        '''adds the glyphs of ``chars`` to the atlas, rebuilding its texture
+        if any is new.'''
+        chars = set(chars) - set(self.glyphs) - set('\n')
+        if not chars:
+            return
+        chars = sorted(chars.union(self.glyphs))
+        from kivy.core.text import Label as CoreLabel
+        font_size = self.font_size
+        images = [render_label({'text': c, 'font_size': font_size})
+                  for c in chars]
+        widths = [image.width if image is not None else
+                  CoreLabel(font_size=font_size).get_extents(c)[0]
+                  for c, image in zip(chars, images)]
+        height = max(image.height for image in images if image is not None)
+        # a column of padding between glyphs keeps them from bleeding
+        width = sum(widths) + len(widths)
+        texture = Texture.create(size=(width, height), colorfmt='rgba')
+        texture.blit_buffer(b'\x00' * (4 * width * height), colorfmt='rgba',
+                            bufferfmt='ubyte')
+        glyphs = {}
+        x = 0
+        for c, w, image in zip(chars, widths, images):
+            if image is not None:
+                texture.blit_data(image, pos=(x, 0))
+            glyphs[c] = (x, w)
+            x += w + 1
+        self.glyphs = glyphs
+        self.height = height
+        self.texture = texture
+        self._runs.clear()
+        
+    def __contains__(self, key):
+        '''whether the (text, halign) ``key`` is laid out already.'''
+        return key in self._runs
+    
+    def layout(self, text, halign='left'):
+        '''gives the :class:`GlyphRun` of ``text``, adding its glyphs to the
+        atlas if needed.'''
+        key = (text, halign)
+        runs = self._runs
+        run = runs.pop(key, None)
+        if run is None:
+            self.add(text)
+            run = GlyphRun(self, text, halign)
+        runs[key] = run
+        while len(runs) > self.capacity:
+            runs.popitem(last=False)
+        return run
+    
+    def measure(self, text):
+        '''gives the size ``text`` laid out would have, adding its glyphs to
+        the atlas if needed, without keeping its :class:`GlyphRun`.'''
+        self.add(text)
+        glyphs = self.glyphs
+        lines = text.split('\n')
+        return (max(sum(glyphs[c][1] for c in line) for line in lines),
+                self.height * len(lines))
+    
+_glyph_atlases = {}
+
+def glyph_atlas(font_size):
+    '''gives the :class:`GlyphAtlas` of ``font_size`` at the screen dpi,
+    building it the first time it's asked for.'''
+    key = (font_size, Metrics.dpi)
+    try:
+        return _glyph_atlases[key]
+    except KeyError:
+        atlas = _glyph_atlases[key] = GlyphAtlas(font_size)
+        return atlas
+
+class GlyphLabel(object):
+    '''stands for the :class:`~kivy.graphics.vertex_instructions.Rectangle`
+    of a label in :attr:`TimeLabeller.instructions` when drawing glyphs:
+    its ``texture`` is a :class:`GlyphRun`.'''
+    
+    __slots__ = ('texture', 'pos', 'size')
+    
+    def __init__(self, run, pos):
+        self.texture = run
+        self.pos = pos
+        self.size = run.size
 
+class LabelRegistry(object):
+    '''the labels registered for a tick, as parallel arrays sorted by local
+    index: the indices, their times in microseconds since unix epoch, and 
+    their ``tick_info`` (x, y, width, height), 4 numbers per label. 
+    
+    It's what the ``registrar`` of :class:`TimeLabeller` holds for each
+    tick, and reads like the dict of tick infos by index of 
+    :class:`TickLabeller`; labels are added with :meth:`add`, as they need
+    their time.'''
+    
+    __slots__ = ('indices', 'micros', 'infos')
+    
+    def __init__(self):
+        self.indices = array('d')
+        self.micros = array('q')
+        self.infos = array('d')
+        
+    def __len__(self):
+        return len(self.indices)
+    
+    def __iter__(self):
+        return iter(self.indices)
+    
+    def _find(self, index):
+        indices = self.indices
+        i = bisect_left(indices, index)
+        if i == len(indices) or indices[i] != index:
+            raise KeyError(index)
+        return i
+    
+    def __contains__(self, index):
+        indices = self.indices
+        i = bisect_left(indices, index)
+        return i < len(indices) and indices[i] == index
+    
+    def __getitem__(self, index):
+        i = 4 * self._find(index)
+        return tuple(self.infos[i:i + 4])
+    
+    def __setitem__(self, index, tick_info):
+        '''updates the ``tick_info`` of a registered ``index``.'''
+        i = 4 * self._find(index)
+        self.infos[i:i + 4] = array('d', tick_info)
+        
+    def __delitem__(self, index):
+        self.remove(index)
+        
+    def add(self, index, micros, tick_info):
+        '''registers ``index``, at time ``micros``, with ``tick_info``.'''
+        i = bisect_left(self.indices, index)
+        self.indices.insert(i, index)
+        self.micros.insert(i, int(micros))
+        self.infos[4 * i:4 * i] = array('d', tick_info)
+        
+    def remove(self, index):
+        '''unregisters ``index``, and gives its time.'''
+        i = self._find(index)
+        del self.indices[i]
+        del self.infos[4 * i:4 * i + 4]
+        return self.micros.pop(i)
+    
+    def index_at(self, micros):
+        '''gives the index registered at time ``micros``, or None.'''
+        times = self.micros
+        i = bisect_left(times, micros)
+        if i < len(times) and times[i] == micros:
+            return self.indices[i]
+        
+    def items(self):
+        return [(index, self[index]) for index in self.indices]
+    
+class TickRegistry(object):
+    '''the tick labelled at each time, as a sorted array of the times, in 
+    microseconds since unix epoch, and the list of their ticks. It's the
+    ``micros_registrar`` of :class:`TimeLabeller`, through which the
+    coarsest tick at a time wins its label, and reads like a dict.'''
+    
+    __slots__ = ('micros', 'ticks')
+    
+    def __init__(self):
+        self.micros = array('q')
+        self.ticks = []
+        
+    def __len__(self):
+        return len(self.micros)
+    
+    def __iter__(self):
+        return iter(self.micros)
+    
+    def __contains__(self, micros):
+        return self.get(micros) is not None
+    
+    def get(self, micros, default=None):
+        times = self.micros
+        i = bisect_left(times, micros)
+        if i < len(times) and times[i] == micros:
+            return self.ticks[i]
+        return default
+    
+    def __setitem__(self, micros, tick):
+        times = self.micros
+        i = bisect_left(times, micros)
+        if i < len(times) and times[i] == micros:
+            self.ticks[i] = tick
+        else:
+            times.insert(i, int(micros))
+            self.ticks.insert(i, tick)
+            
+    def __delitem__(self, micros):
+        times = self.micros
+        i = bisect_left(times, micros)
+        if i == len(times) or times[i] != micros:
+            raise KeyError(micros)
+        del times[i]
+        del self.ticks[i]
+    
 class TimeLabeller(TickLabeller):
     '''default labeller of :class:`Timeline`. For an example of its graphics,
     see example images or run the example in the module documentation.
@@ -204,47 +981,326 @@ class TimeLabeller(TickLabeller):
     time_font_size = NumericProperty('7sp')
     '''font size of the time labels.'''
     
+    push_dates = BooleanProperty(True)
+    '''if True, the date label of the day at the edge of the window is 
+    pushed along to stay in view, when times are labelled too. If False, 
+    date labels are drawn at their ticks, as the labels of 
+    :attr:`TimeTick.calendar_modes` are.'''
+    
+    texture_cache = ObjectProperty(None)
+    '''the :class:`LabelTextureCache` consulted before creating a new label 
+    texture. Defaults to :data:`default_texture_cache`, shared by all 
+    labellers and kept across redraws.'''
+    
+    texture_cache_size = NumericProperty(512)
+    '''the capacity of :attr:`texture_cache`. Setting it resizes the cache,
+    for all the labellers sharing it, except :data:`default_texture_cache`,
+    which is left alone: a labeller given a size of its own gets a cache 
+    of its own.'''
+    
+    cache_hits = NumericProperty(0)
+    '''number of labels whose texture was found in :attr:`texture_cache`.'''
+    
+    cache_misses = NumericProperty(0)
+    '''number of labels whose texture had to be rasterized.'''
+    
+    async_labels = BooleanProperty(False)
+    '''if True, label textures missing from :attr:`texture_cache` are
+    rasterized later by :attr:`rasterizer`, off the main thread if the 
+    text provider allows (see :attr:`LabelRasterizer.threaded_providers`)
+    or else in the spare time of the next frames. Until then, such
+    a label is drawn as an empty placeholder, whose texture is swapped in
+    once uploaded, usually a frame or two later.'''
+    
+    rasterizer = ObjectProperty(None)
+    '''the :class:`LabelRasterizer` used when :attr:`async_labels`. Defaults
+    to :data:`default_rasterizer`.'''
+    
+    glyph_labels = BooleanProperty(False)
+    '''if True, labels are laid out with the glyphs of a :class:`GlyphAtlas`
+    per font size and all drawn by one 
+    :class:`~kivy.graphics.vertex_instructions.Mesh` per atlas (or more, 
+    past :attr:`max_mesh_vertices`), updated in place when labels move, 
+    instead of with a texture and a 
+    :class:`~kivy.graphics.vertex_instructions.Rectangle` per label. 
+    Glyphs are not kerned.'''
+    
+    cull_labels = BooleanProperty(False)
+    '''if True, labels that would overlap others along the timeline are 
+    not drawn, before their textures are even made. Labels of coarser ticks
+    go first, so that finer labels give way. Only labels drawn at the same
+    distance from the same edge are checked against each other. Defaults to
+    False, drawing all labels.'''
+    
+    label_gap = NumericProperty('4dp')
+    '''the minimal space left between labels when :attr:`cull_labels`.'''
+    
     def __init__(self, tickline, **kw):
         super(TimeLabeller, self).__init__(tickline, **kw)
         self.labels = []
-        self.seconds_registrar = {}
+        self.micros_registrar = TickRegistry()
         self.have_time = False
         self.instructions = {}
+        self.placeholders = set()
+        # the meshes of each atlas, and the runs they were last drawn with
+        self._glyph_meshes = {}
+        self._glyph_runs = {}
+        self._scale = None
+        self._ranges = {}
+        self._leaving = set()
+        self._trigger_labels = Clock.create_trigger(self._remake_labels)
+        if self.texture_cache is None:
+            if 'texture_cache_size' in kw:
+                self.texture_cache = LabelTextureCache(self.texture_cache_size)
+            else:
+                self.texture_cache = default_texture_cache
+        elif 'texture_cache_size' in kw:
+            self.texture_cache.resize(self.texture_cache_size)
+        if self.rasterizer is None:
+            self.rasterizer = default_rasterizer
+            
+    def on_glyph_labels(self, *args):
+        # labels are drawn differently: start over
+        canvas = self.tickline.canvas
+        for instrs in self.instructions.values():
+            for rect in instrs.values():
+                if not isinstance(rect, GlyphLabel):
+                    canvas.remove(rect)
+        self.instructions = {}
+        self.placeholders.clear()
+        for meshes in self._glyph_meshes.values():
+            for mesh in meshes:
+                canvas.remove(mesh)
+        self._glyph_meshes = {}
+        self._glyph_runs = {}
+        
+    def on_texture_cache_size(self, *args):
+        cache = self.texture_cache
+        if cache is default_texture_cache:
+            # the other labellers keep the shared cache as it is
+            self.texture_cache = LabelTextureCache(self.texture_cache_size)
+        elif cache is not None:
+            cache.resize(self.texture_cache_size)
         
     def re_init(self, *args):
+        '''prepares the registration of a new frame. Labels are kept across
+        frames: for the ticks whose indices have a closed form (see 
+        :meth:`TimeTick.index_range`), only the indices that left the window
+        since the last frame are unregistered, so that a pan costs in 
+        proportion to the labels entering and leaving it. Everything is
+        registered anew when the scale changes, and so are ticks without
+        a closed form.'''
         self.labels = []
-        self.seconds_registrar = {}
-        self.have_time = False
-        super(TimeLabeller, self).re_init(*args)
+        tl = self.tickline
+        if isinstance(tl, Timeline) and tl.profiling:
+            tl.start_frame_stats()
+        registrar = self.registrar
+        leaving = self._leaving = set()
+        if tl.scale != self._scale:
+            # every label may have changed
+            self._scale = tl.scale
+            self._ranges = {}
+            self.micros_registrar = TickRegistry()
+            for tick, labels in registrar.items():
+                leaving.update((tick, index) for index in labels)
+            registrar.clear()
+            return
+        ranges = self._ranges
+        ticks = set(tl.ticks)
+        ticks.update(registrar)
+        for tick in ticks:
+            old = ranges.pop(tick, None)
+            new = self._label_range(tick) if tick in tl.ticks else None
+            if new is not None:
+                ranges[tick] = new
+            labels = registrar.get(tick)
+            if not labels:
+                continue
+            if old is None or new is None or old[2:] != new[2:]:
+                gone = list(labels)
+            else:
+                # the indices of the old range that aren't in the new one
+                (first, last), (new_first, new_last), shift = \
+                    old[:2], new[:2], old[2]
+                gone = [k - shift for k in 
+                        chain(range(first, min(last, new_first - 1) + 1),
+                              range(max(first, new_last + 1), last + 1))]
+            for index in gone:
+                if index in labels:
+                    self._unregister(tick, index)
+                    leaving.add((tick, index))
+        
+    def _label_range(self, tick):
+        # the labelled indices of ``tick`` as (first, last, shift, ...), 
+        # with what the indices depend on; None if they have no closed form
+        tl = self.tickline
+        if not isinstance(tick, TimeTick) or tick.datetime_ticks or \
+                not tick.shown_on(tl) or \
+                tick.scale(tl.scale) < tick.min_label_space:
+            return None
+        index_range = tick.index_range(tl)
+        if index_range is None:
+            return None
+        return index_range + (tick.mode, tick.origin)
+        
+    def _unregister(self, tick, index):
+        micros = self.registrar[tick].remove(index)
+        if self.micros_registrar.get(micros) is tick:
+            del self.micros_registrar[micros]
         
     def register(self, tick, tick_index, tick_info):
+        '''registers the label of ``tick`` at ``tick_index``, unless the tick
+        is too dense to be labelled or a coarser tick is labelled at the 
+        same time. A label registered in a previous frame only has its
+        ``tick_info`` updated.'''
         assert isinstance(tick_index, Number)
+        labels = self.registrar.get(tick)
+        if labels is not None and tick_index in labels:
+            # still in view: only its position changed
+            labels[tick_index] = tick_info
+            return
         tick_sc = tick.scale(self.tickline.scale)
         if tick_sc < tick.min_label_space:
             return
-        seconds = tick.to_seconds(tick_index)
-        if self.seconds_registrar.get(seconds, 0) < tick_sc:
-            self.have_time |= tick.mode != 'day'
-            self.registrar.setdefault(tick, {})[tick_index] = tick_info
-            self.seconds_registrar[seconds] = tick_sc
+        micros = tick.to_micros(tick_index)
+        # the coarsest tick labelled at micros
+        other = self.micros_registrar.get(micros)
+        if other is None or other.scale(self.tickline.scale) < tick_sc:
+            if other is not None:
+                # the finer label, possibly kept from previous frames, 
+                # gives way
+                index = self.registrar[other].index_at(micros)
+                self._unregister(other, index)
+                self._leaving.add((other, index))
+            if labels is None:
+                labels = self.registrar[tick] = LabelRegistry()
+            labels.add(tick_index, micros, tick_info)
+            self.micros_registrar[micros] = tick
             
+    def _label_kw(self, tick, index, succinct, which):
+        label_kw = tick.get_label_texture(index, succinct, return_kw=True)
+        if label_kw:
+            label_kw['font_size'] = self.time_font_size if which == 'time' \
+                                    else self.date_font_size
+            label_kw['halign'] = 'left' if self.tickline.is_vertical() \
+                                 else 'center'
+        return label_kw
+    
+    def prefetch(self, tick, index):
+        '''prepares the label of ``tick`` at ``index`` before it's shown:
+        rasterizes and caches its texture, or lays it out with 
+        :attr:`glyph_labels`, or queues it with :attr:`async_labels`. 
+        Returns True if there was anything to do. See 
+        :attr:`Timeline.prefetch`.'''
+        which = 'date' if tick.mode == 'day' or \
+                tick.mode in tick.calendar_modes else 'time'
+        succinct = not any('second' in t.mode for t in self.registrar)
+        label_kw = self._label_kw(tick, index, succinct, which)
+        if not label_kw:
+            return False
+        if self.glyph_labels:
+            atlas = glyph_atlas(label_kw['font_size'])
+            key = (label_kw['text'], label_kw['halign'])
+            if key in atlas:
+                return False
+            atlas.layout(*key)
+            return True
+        cache = self.texture_cache
+        key = cache.key_of(label_kw)
+        if key in cache:
+            return False
+        if self.async_labels:
+            self.rasterizer.submit(key, label_kw, self._on_rasterized)
+        else:
+            cache.rasterize(key, label_kw)
+        return True
+        
+    def _cull(self, succinct):
+        # the (tick, index) of the labels overlapping the labels of coarser
+        # ticks, or earlier ones of the same tick, in the same row. Each row
+        # keeps the sorted, disjoint extents of the labels it shows.
+        tl = self.tickline
+        vertical = tl.is_vertical()
+        a = 1 if vertical else 0
+        half_gap = self.label_gap / 2.
+        r = self.registrar
+        instructions = self.instructions
+        placeholders = self.placeholders
+        scale = tl.scale
+        rows = {}
+        culled = set()
+        for tick in sorted(r, key=lambda t: t.scale(scale), reverse=True):
+            if tick.mode == 'day' and self.push_dates and self.have_time:
+                # pushed along instead
+                continue
+            which = 'date' if tick.mode == 'day' or \
+                    tick.mode in tick.calendar_modes else 'time'
+            dist = self.time_dist_from_edge if which == 'time' else \
+                   self.date_dist_from_edge
+            dist = max(dist, tick.tick_size[1] + tl.tick_label_padding)
+            starts, ends = rows.setdefault(
+                (tick.halign if vertical else tick.valign, dist), ([], []))
+            instrs = instructions.get(tick, {})
+            labels = r[tick]
+            for index in labels:
+                rect = instrs.get(index)
+                if rect is not None and (tick, index) not in placeholders:
+                    length = rect.size[a]
+                else:
+                    # estimated from the glyph widths, before any texture
+                    label_kw = self._label_kw(tick, index, succinct, which)
+                    if not label_kw:
+                        continue
+                    length = glyph_atlas(label_kw['font_size']).measure(
+                        label_kw['text'])[a]
+                info = labels[index]
+                center = info[a] + info[2 + a] / 2.
+                low = center - length / 2. - half_gap
+                high = center + length / 2. + half_gap
+                i = bisect(starts, high)
+                if i and ends[i - 1] >= low:
+                    culled.add((tick, index))
+                else:
+                    starts.insert(i, low)
+                    ends.insert(i, high)
+        return culled
+        
     def _get_texture_pos(self, tick, index, succinct=True, which='time',
                          texture=None):
         tl = self.tickline
         # tick_info should be (x, y, width, height) of tick
         tick_info = self.registrar[tick][index]
         if not texture:
-            label_kw = tick.get_label_texture(index, succinct, return_kw=True)
+            label_kw = self._label_kw(tick, index, succinct, which)
             if not label_kw:
                 return
-            label_kw['font_size'] = self.time_font_size if which == 'time' else \
-                                      self.date_font_size
-            label_kw['halign'] = 'left' if tl.is_vertical() else 'center'
-            label = CoreLabel(**label_kw)
-            label.refresh()
-            texture = label.texture
+            if self.glyph_labels:
+                texture = glyph_atlas(label_kw['font_size']).layout(
+                    label_kw['text'], label_kw['halign'])
+            else:
+                cache = self.texture_cache
+                key = cache.key_of(label_kw)
+                texture = cache.get(key)
+                if texture is None and (self.async_labels or 
+                                        getattr(tl, 'lod', 0) > 0):
+                    if self.rasterizer.submit(key, label_kw, 
+                                              self._on_rasterized):
+                        self.cache_misses += 1
+                elif texture is None:
+                    self.cache_misses += 1
+                    stats = getattr(tl, '_frame_stats', None)
+                    if stats is None:
+                        texture = cache.rasterize(key, label_kw)
+                    else:
+                        start = default_timer()
+                        texture = cache.rasterize(key, label_kw)
+                        stats['texture_time'] += default_timer() - start
+                else:
+                    self.cache_hits += 1
+        # a placeholder, while rasterizing, takes no room
+        width, height = texture.size if texture else (0, 0)
         if tl.is_vertical():
-            y = tick_info[1] + tick_info[3] / 2 - texture.height / 2
+            y = tick_info[1] + tick_info[3] / 2 - height / 2
             if which == 'time':
                 dist = self.time_dist_from_edge
             else:
@@ -254,14 +1310,13 @@ class TimeLabeller(TickLabeller):
             if halign == 'left':
                 x = tl.x + dist
             elif halign == 'line_left':
-                x = tl.line_pos - dist - texture.width
+                x = tl.line_pos - dist - width
             elif halign == 'line_right':
                 x = tl.line_pos + dist
             else:
-                x = tl.right - dist - texture.width
+                x = tl.right - dist - width
         else:
-            # TODO horizontal is gonna get crowded with text
-            x = tick_info[0] + tick_info[2] / 2 - texture.width / 2
+            x = tick_info[0] + tick_info[2] / 2 - width / 2
             if which == 'time':
                 dist = self.time_dist_from_edge
             else:
@@ -269,11 +1324,11 @@ class TimeLabeller(TickLabeller):
             dist = max(dist, tick.tick_size[1] + tl.tick_label_padding)
             valign = tick.valign
             if valign == 'top':
-                y = tl.top - dist - texture.height
+                y = tl.top - dist - height
             elif valign == 'line_top':
                 y = tl.line_pos + dist
             elif valign == 'line_bottom':
-                y = tl.line_pos - dist - texture.height
+                y = tl.line_pos - dist - height
             else:
                 y = tl.y + dist       
         return (texture, [x, y])
@@ -281,16 +1336,36 @@ class TimeLabeller(TickLabeller):
         r = self.registrar
         instructions = self.instructions
         setdefault = instructions.setdefault
-        to_pop = set((tick, index) for tick in instructions 
-                  for index in instructions[tick])
+        # only the labels that left are removed, and the day labels, which 
+        # are drawn depending on the others
+        to_pop = set(key for key in self._leaving 
+                     if key[1] in instructions.get(key[0], ()))
+        to_pop.update((tick, index) for tick in instructions 
+                      if tick.mode == 'day' for index in instructions[tick])
+        n_instructions = sum(len(instrs) for instrs in instructions.values())
+        self.have_time = any(r[tick] for tick in r if tick.mode != 'day' and 
+                             tick.mode not in tick.calendar_modes)
         tl = self.tickline
         succinct = not any('second' in tick.mode for tick in r)
         get_texture_pos = self._get_texture_pos
         canvas = tl.canvas
+        culled = self._cull(succinct) if self.cull_labels else ()
+        # labels shown before may be culled now
+        to_pop.update(key for key in culled 
+                      if key[1] in instructions.get(key[0], ()))
         for tick in r:
             instrs = setdefault(tick, {})
-            if tick.mode != 'day':
+            if tick.mode in tick.calendar_modes or \
+                    tick.mode == 'day' and not self.push_dates:
                 for index in r[tick]:
+                    if (tick, index) in culled:
+                        continue
+                    self._update_rect(tick, index, instrs, get_texture_pos,
+                                      to_pop, succinct, canvas, which='date')
+            elif tick.mode != 'day':
+                for index in r[tick]:
+                    if (tick, index) in culled:
+                        continue
                     self._update_rect(tick, index, instrs, get_texture_pos,
                                       to_pop, succinct, canvas)
             else:
@@ -324,37 +1399,556 @@ class TimeLabeller(TickLabeller):
                                             (new_coord, last_rect[1].pos[b])
                 else:
                     for index in bottom_up[:-1]:
+                        if (tick, index) in culled:
+                            continue
                         self._update_rect(tick, index, instrs, get_texture_pos,
                                           to_pop, succinct, canvas, which='date')
+        glyph_labels = self.glyph_labels
         for tick, index in to_pop:
             rect = instructions[tick].pop(index)
-            canvas.remove(rect)
+            if not glyph_labels:
+                canvas.remove(rect)
+            self.placeholders.discard((tick, index))
+        if glyph_labels:
+            self._draw_glyphs()
+        stats = getattr(tl, '_frame_stats', None)
+        if stats is not None:
+            stats['labels_registered'] = sum(len(r[tick]) for tick in r)
+            stats['labels_removed'] = len(to_pop)
+            stats['labels_culled'] = len(culled)
+            stats['labels_reused'] = n_instructions - len(to_pop)
+            stats['labels_created'] = sum(len(instructions[tick]) for tick 
+                                          in instructions) - \
+                                        stats['labels_reused']
+            tl.finish_frame_stats()
              
     def _update_rect(self, tick, index, instrs, get_texture_pos, to_pop,
                      succinct, canvas, which='time'):
         if index in instrs:
             # old label: change position
             old_rect = instrs[index]
-            t_p = get_texture_pos(tick, index, succinct,
-                                  texture=old_rect.texture, which=which)
+            placeholder = (tick, index) in self.placeholders
+            t_p = get_texture_pos(tick, index, succinct, which=which,
+                                  texture=None if placeholder else
+                                          old_rect.texture)
+            if placeholder and t_p[0] is not None:
+                # swap the rasterized texture in for the placeholder
+                self.placeholders.remove((tick, index))
+                old_rect.texture = t_p[0]
+                old_rect.size = t_p[0].size
             old_rect.pos = t_p[1]
-            to_pop.remove((tick, index))
+            to_pop.discard((tick, index))
             return old_rect
         else:
             # new label
             t_p = get_texture_pos(tick, index, succinct, which=which) 
             if t_p:
                 texture, pos = t_p
-                rect = Rectangle(texture=texture, pos=pos,
-                                 size=texture.size)
+                if self.glyph_labels:
+                    # drawn by the glyph meshes at the end of make_labels
+                    rect = GlyphLabel(texture, pos)
+                    instrs[index] = rect
+                    return rect
+                if texture is None:
+                    self.placeholders.add((tick, index))
+                    rect = Rectangle(pos=pos, size=(0, 0))
+                else:
+                    rect = Rectangle(texture=texture, pos=pos,
+                                     size=texture.size)
                 instrs[index] = rect
                 canvas.add(rect)
                 return rect
+                
+    max_mesh_vertices = 65532
+    '''the most vertices drawn by one of the meshes of :attr:`glyph_labels`,
+    a multiple of 4 within the reach of their 16 bit indices. The labels of
+    an atlas needing more are spread over several meshes.'''
+    
+    def _draw_glyphs(self):
+        # the runs of all labels and where they're drawn, by atlas. The 
+        # atlas may have been rebuilt since a label was laid out.
+        runs = {}
+        for instrs in self.instructions.values():
+            for label in instrs.values():
+                run = label.texture
+                runs.setdefault(run.atlas, []).append(
+                    (run.atlas.layout(run.text, run.halign), label.pos))
+        if runs == self._glyph_runs:
+            # nothing moved
+            return
+        self._glyph_runs = runs
+        # gather the quads, starting another mesh when one is full
+        limit = self.max_mesh_vertices
+        batches = {}
+        for atlas, placed in runs.items():
+            vertices, indices = [], []
+            batch = batches[atlas] = [(vertices, indices)]
+            for run, pos in placed:
+                if len(vertices) // 4 + run.vertex_count > limit and vertices:
+                    vertices, indices = [], []
+                    batch.append((vertices, indices))
+                run.emit(pos, vertices, indices)
+        meshes = self._glyph_meshes
+        canvas = self.tickline.canvas
+        for atlas in set(meshes).difference(batches):
+            for mesh in meshes.pop(atlas):
+                canvas.remove(mesh)
+        for atlas, batch in batches.items():
+            atlas_meshes = meshes.setdefault(atlas, [])
+            while len(atlas_meshes) < len(batch):
+                mesh = Mesh(mode='triangles')
+                canvas.add(mesh)
+                atlas_meshes.append(mesh)
+            while len(atlas_meshes) > len(batch):
+                canvas.remove(atlas_meshes.pop())
+            for mesh, (vertices, indices) in zip(atlas_meshes, batch):
+                mesh.texture = atlas.texture
+                mesh.vertices = vertices
+                mesh.indices = indices
+        
+    def _on_rasterized(self, key, texture):
+        self.texture_cache.put(key, texture)
+        self._trigger_labels()
+        
+    def _remake_labels(self, *args):
+        # lay the labels out again with the textures now cached, which also
+        # redoes the pushing of the date labels
+        if self.placeholders:
+            self.make_labels()
                         
         
 unixepoch = datetime(1970, 1, 1, tzinfo=UTC)
 
 
+def civil_from_days(days):
+    '''converts the number of ``days`` since unix epoch to a 
+    (year, month, day) triple of the proleptic gregorian calendar, using 
+    only integer arithmetic::
+    
+        >>> civil_from_days(0)
+        (1970, 1, 1)
+        >>> civil_from_days(15000)
+        (2011, 1, 26)
+        
+    ``days`` can also be a numpy integer array, in which case a triple of
+    arrays is returned.
+    '''
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524
+                   - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 
+                                - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * mp + 2) // 5 + 1
+    month = mp + 3 - 12 * (mp >= 10)
+    return year_of_era + era * 400 + (month <= 2), month, day
+
+def days_from_civil(year, month, day):
+    '''the inverse of :func:`civil_from_days`: gives the number of days
+    since unix epoch of a date of the proleptic gregorian calendar::
+    
+        >>> days_from_civil(2011, 1, 26)
+        15000
+    '''
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + 9 - 12 * (month > 2)) + 2) // 5 + day - 1
+    day_of_era = (year_of_era * 365 + year_of_era // 4 - year_of_era // 100
+                  + day_of_year)
+    return era * 146097 + day_of_era - 719468
+
+
+micros_per_second = 10 ** 6
+micros_per_day = 86400 * micros_per_second
+_naive_epoch = datetime(1970, 1, 1)
+
+def mode_micros(mode):
+    '''gives the length of one unit of :attr:`TimeTick.mode` ``mode``, in
+    microseconds. Calendar modes (see :attr:`TimeTick.calendar_modes`) 
+    have no fixed length.'''
+    if mode in _calendar_months or mode == 'week':
+        raise ValueError('%s has no fixed length' % mode)
+    return micros_per_day // TimeTick.scale_factor_dict[mode]
+
+_calendar_months = {'month': 1, 'quarter': 3, 'year': 12, 'decade': 120}
+
+def calendar_bounds(micros, mode):
+    '''gives the (start, end) micros of the period of calendar ``mode`` 
+    (one of :attr:`TimeTick.calendar_modes`) containing ``micros``, all
+    read on a wall clock (i.e. local micros). Weeks start on Monday. 
+    
+        >>> calendar_bounds(micros_of(datetime(2024, 5, 17, 8)), 'quarter')
+        (1711929600000000, 1719792000000000)
+    '''
+    days = micros // micros_per_day
+    if mode == 'week':
+        start = days - (days + 3) % 7
+        end = start + 7
+    else:
+        year, month, _ = civil_from_days(days)
+        step = _calendar_months[mode]
+        months = year * 12 + month - 1
+        months = months - months % step
+        start = days_from_civil(months // 12, months % 12 + 1, 1)
+        months = months + step
+        end = days_from_civil(months // 12, months % 12 + 1, 1)
+    return start * micros_per_day, end * micros_per_day
+
+def micros_of(dt):
+    '''converts the datetime ``dt`` to microseconds since unix epoch. Naive
+    datetimes are taken to be in UTC.'''
+    offset = dt.utcoffset()
+    delta = dt.replace(tzinfo=None) - _naive_epoch
+    if offset is not None:
+        delta -= offset
+    return ((delta.days * 86400 + delta.seconds) * micros_per_second 
+            + delta.microseconds)
+    
+def micros_of_seconds(seconds):
+    '''converts (possibly fractional) ``seconds`` since unix epoch to the 
+    nearest microsecond.'''
+    return int(round(seconds * micros_per_second))
+
+def datetime_of_micros(micros, tz=UTC):
+    '''converts ``micros`` since unix epoch to a datetime in ``tz``.'''
+    return (unixepoch + timedelta(microseconds=micros)).astimezone(tz)
+
+def index_of_micros(micros, scale_factor=1, origin=0):
+    '''converts ``micros`` since unix epoch to an index, global by default,
+    or local to a :class:`TimeTick` of ``scale_factor``, counted from
+    ``origin`` micros (see :attr:`Timeline.origin`). The difference is
+    taken before converting to float, so the index is exact near 
+    ``origin``.'''
+    return (micros - origin) * scale_factor / float(micros_per_day)
+
+def micros_of_index(index, scale_factor=1, origin=0):
+    '''the inverse of :func:`index_of_micros`, to the nearest
+    microsecond.'''
+    return origin + int(round(index * micros_per_day / float(scale_factor)))
+
+def micros_of_index_array(indices, scale_factor=1, origin=0):
+    '''vectorized :func:`micros_of_index`, giving an int64 array.'''
+    return origin + numpy.rint(numpy.asarray(indices, 'float64') 
+                               * (micros_per_day / float(scale_factor))
+                               ).astype('int64')
+
+def round_micros(micros, mode='second', rounding='nearest'):
+    '''rounds ``micros`` since unix epoch to the nearest, next or previous
+    unit of ``mode``, any of :attr:`TimeTick.mode_options`; halves round
+    up. Units are aligned on midnight, and calendar units on the first of
+    their month (or Monday, for weeks), so to round local wall clock times,
+    round the local micros of :meth:`TzOffsets.local_micros`, or use
+    :meth:`TzOffsets.round_micros`.
+    
+    :param rounding: one of 'nearest', 'up' or 'down'. Defaults to 
+        'nearest'
+    '''
+    if mode in _calendar_months or mode == 'week':
+        start, end = calendar_bounds(micros, mode)
+        if rounding == 'up':
+            return start + (micros != start) * (end - start)
+        if rounding == 'down':
+            return start
+        return start + (2 * (micros - start) >= end - start) * (end - start)
+    unit = mode_micros(mode)
+    if rounding == 'up':
+        return -(-micros // unit) * unit
+    if rounding == 'down':
+        return micros // unit * unit
+    return (micros + unit // 2) // unit * unit
+
+def split_micros(micros):
+    '''splits ``micros`` since unix epoch, as read on a wall clock (i.e. 
+    local micros), into the fields (year, month, day, hour, minute, second, 
+    microsecond, weekday), where weekday is 0 for Monday, like 
+    :meth:`datetime.weekday`.'''
+    days, rem = divmod(micros, micros_per_day)
+    seconds, microsecond = divmod(rem, micros_per_second)
+    hour, rem = divmod(seconds, 3600)
+    minute, second = divmod(rem, 60)
+    year, month, day = civil_from_days(days)
+    return (year, month, day, hour, minute, second, microsecond, 
+            (days + 3) % 7)
+
+
+class TzOffsets(object):
+    '''the utc offsets of a timezone ``tz``, as a sorted array of the 
+    epoch seconds of its transitions and the offsets, in seconds, taking
+    effect at each transition. Looking up the offset at an instant is then
+    a bisect, and its local wall clock an integer addition, without creating
+    any timezone aware datetime.
+    
+    Use :func:`tz_offsets` to get the (cached) table of a timezone.
+    '''
+    
+    def __init__(self, tz):
+        self.tz = tz
+        # numpy copies of transitions and offsets, for offset_array
+        self._arrays = None
+        self._boundaries = {}
+        transitions = getattr(tz, '_utc_transition_times', None)
+        if transitions:
+            # pytz timezone with daylight saving or historical changes
+            epoch = datetime(1970, 1, 1)
+            self.transitions = [(t - epoch).days * 86400 + (t - epoch).seconds
+                                for t in transitions]
+            self.offsets = [int(info[0].total_seconds()) 
+                            for info in tz._transition_info]
+        else:
+            offset = tz.utcoffset(None)
+            if offset is not None:
+                # fixed offset
+                self.transitions = []
+                self.offsets = [int(offset.total_seconds())]
+            else:
+                # not a pytz timezone; ask it every time
+                self.transitions = self.offsets = None
+                
+    def offset_at(self, seconds):
+        '''gives the utc offset, in seconds, at ``seconds`` since unix 
+        epoch.'''
+        transitions = self.transitions
+        if transitions is None:
+            t = (unixepoch + timedelta(seconds=seconds)).astimezone(self.tz)
+            return int(t.utcoffset().total_seconds())
+        return self.offsets[max(bisect(transitions, seconds) - 1, 0)]
+    
+    def offset_array(self, micros):
+        '''vectorized :meth:`offset_at`, taking an array of ``micros``
+        since unix epoch and giving the utc offsets in seconds.'''
+        seconds = numpy.asarray(micros) // micros_per_second
+        if self.transitions is None:
+            return numpy.array([self.offset_at(int(s)) for s in seconds.flat],
+                               'int64').reshape(seconds.shape)
+        arrays = self._arrays
+        if arrays is None:
+            arrays = self._arrays = (numpy.array(self.transitions, 'int64'),
+                                     numpy.array(self.offsets, 'int64'))
+        transitions, offsets = arrays
+        i = numpy.searchsorted(transitions, seconds, 'right') - 1
+        return offsets[numpy.maximum(i, 0)]
+    
+    def local_micros(self, micros):
+        '''converts ``micros`` since unix epoch to local micros, i.e. the
+        wall clock read as if it was utc.'''
+        return (micros + self.offset_at(micros // micros_per_second) 
+                * micros_per_second)
+    
+    def local_array(self, micros):
+        '''vectorized :meth:`local_micros`.'''
+        return micros + self.offset_array(micros) * micros_per_second
+    
+    def utc_micros(self, local):
+        '''the inverse of :meth:`local_micros`. A wall clock time skipped or 
+        repeated by a transition gives one of the instants around it.'''
+        guess = local // micros_per_second
+        offset = self.offset_at(guess - self.offset_at(guess))
+        return local - offset * micros_per_second
+    
+    def first_showing(self, local):
+        '''the first instant, in micros since unix epoch, whose wall clock
+        shows ``local`` or later: that of :meth:`utc_micros`, unless the
+        clock is turned forward past ``local``, which then gives the 
+        transition.'''
+        time = self.utc_micros(local)
+        if self.local_micros(time) == local:
+            return time
+        # skipped: the transition is less than a day away
+        local_micros = self.local_micros
+        seconds = time // micros_per_second - 86400
+        last = seconds + 2 * 86400
+        while last - seconds > 1:
+            mid = (seconds + last) // 2
+            if local_micros(mid * micros_per_second) < local:
+                seconds = mid
+            else:
+                last = mid
+        return last * micros_per_second
+    
+    def utc_array(self, local):
+        '''vectorized :meth:`utc_micros`.'''
+        guess = local - self.offset_array(local) * micros_per_second
+        return local - self.offset_array(guess) * micros_per_second
+    
+    def round_micros(self, micros, mode='second', rounding='nearest'):
+        '''like :func:`round_micros`, but rounds to the units of ``mode``
+        of the local wall clock.'''
+        return self.utc_micros(round_micros(self.local_micros(micros), mode,
+                                            rounding))
+    
+    def round_array(self, micros, mode='second', rounding='nearest'):
+        '''vectorized :meth:`round_micros`.'''
+        return self.utc_array(round_micros(self.local_array(micros), mode,
+                                           rounding))
+    
+    def wall_clock_micros(self, micros):
+        '''gives the local wall clock at ``micros`` since unix epoch as a 
+        tuple (year, month, day, hour, minute, second, microsecond, weekday),
+        where weekday is 0 for Monday, like :meth:`datetime.weekday`.'''
+        return split_micros(self.local_micros(micros))
+    
+    def wall_clock_array(self, micros):
+        '''vectorized :meth:`wall_clock_micros`, giving a tuple of 
+        arrays.'''
+        return split_micros(self.local_array(micros))
+    
+    def wall_clock(self, seconds):
+        '''like :meth:`wall_clock_micros`, at ``seconds`` since unix 
+        epoch, rounded to the nearest microsecond.'''
+        return self.wall_clock_micros(micros_of_seconds(seconds))
+        
+    def datetime_of(self, seconds):
+        '''gives the datetime in :attr:`tz` at ``seconds`` since unix 
+        epoch.'''
+        return (unixepoch + timedelta(seconds=seconds)).astimezone(self.tz)
+    
+    def boundaries(self, mode):
+        '''gives the :class:`BoundaryTable` of the fixed length 
+        :attr:`TimeTick.mode` ``mode`` on the wall clock of :attr:`tz`, 
+        building it the first time the mode is asked for.'''
+        table = self._boundaries.get(mode)
+        if table is None:
+            table = self._boundaries[mode] = BoundaryTable(self, mode)
+        return table
+    
+class BoundaryTable(object):
+    '''the instants, in microseconds since unix epoch, at which the local 
+    wall clock of a timezone crosses the units of a :attr:`TimeTick.mode` 
+    of fixed length, e.g. the local midnights for "day". Boundaries are 
+    found on the wall clock of each stretch of constant utc offset, so they
+    stay on it across daylight saving transitions. When the clock is 
+    turned forward past a boundary, e.g. from 00:00 to 01:00, the 
+    transition is the boundary of that day. When it's turned back by less 
+    than a unit, the boundary it shows again isn't repeated: a day starts
+    once, but the hour repeated by turning back an hour is ticked twice.
+    
+    The boundaries of a range are computed once, and the range extended as
+    needed, so that panning only computes those entering the window.
+    
+    Use :meth:`TzOffsets.boundaries` to get the (cached) table of a 
+    timezone and mode.
+    
+    :param offsets: the :class:`TzOffsets` of the timezone.
+    :param mode: the :attr:`TimeTick.mode`, not one of 
+        :attr:`TimeTick.calendar_modes`.
+    '''
+    
+    limit = 4096
+    '''the number of boundaries beyond which the table is computed anew, 
+    rather than extended.'''
+    
+    def __init__(self, offsets, mode):
+        self.offsets = offsets
+        self.mode = mode
+        self.unit = mode_micros(mode)
+        self.micros = []
+        # the range [start, end) micros the table covers
+        self.start = self.end = None
+        
+    def _compute(self, start, end):
+        # the boundaries in [start, end)
+        offset_at, unit = self.offsets.offset_at, self.unit
+        boundaries = []
+        time = start
+        while time < end:
+            seconds = time // micros_per_second
+            offset = offset_at(seconds)
+            local = offset * micros_per_second
+            # the first boundary on the wall clock of this offset
+            boundary = -(-(time + local) // unit) * unit - local
+            last = min(boundary, end - 1) // micros_per_second
+            if offset_at(last) == offset:
+                if boundary >= end:
+                    break
+                if not self._shown_before(boundary, offset):
+                    boundaries.append(boundary)
+                time = boundary + 1
+                continue
+            # a transition: find it, and go on from there
+            while last - seconds > 1:
+                mid = (seconds + last) // 2
+                if offset_at(mid) == offset:
+                    seconds = mid
+                else:
+                    last = mid
+            time = last * micros_per_second
+            new_local = offset_at(last) * micros_per_second
+            if boundary + local < time + new_local and \
+                    (time + new_local) % unit:
+                # the clock was turned forward past the boundary, which is
+                # then crossed at the transition. If the new wall clock is
+                # on a boundary, the next turn finds it.
+                boundaries.append(time)
+                time += 1
+        return boundaries
+    
+    def _shown_before(self, boundary, offset):
+        # whether the wall clock, turned back by less than a unit before
+        # boundary, already showed the time of boundary at the offset
+        # before. Clocks are turned by whole seconds, which is never less
+        # than a unit of a second or shorter.
+        unit = self.unit
+        if unit <= micros_per_second:
+            return False
+        offset_at = self.offsets.offset_at
+        before = offset_at((boundary - unit) // micros_per_second)
+        jump = (before - offset) * micros_per_second
+        return 0 < jump < unit and \
+            offset_at((boundary - jump) // micros_per_second) == before
+            
+    def cover(self, start, end):
+        '''makes sure the table holds the boundaries between the ``start``
+        and ``end`` micros.'''
+        end += 1
+        span = end - start
+        if self.start is None or start > self.end + span or \
+                end < self.start - span or len(self.micros) > self.limit:
+            self.micros = self._compute(start, end)
+            self.start, self.end = start, end
+            return
+        # extend by as much again, so that the next frames of a pan are
+        # covered already
+        if start < self.start:
+            start = min(start, self.start - span)
+            self.micros[:0] = self._compute(start, self.start)
+            self.start = start
+        if end > self.end:
+            end = max(end, self.end + span)
+            self.micros.extend(self._compute(self.end, end))
+            self.end = end
+            
+    def between(self, start, end):
+        '''gives the list of the boundaries between the ``start`` and 
+        ``end`` micros, inclusive.'''
+        self.cover(start, end)
+        micros = self.micros
+        return micros[bisect_left(micros, start):bisect(micros, end)]
+    
+    def before(self, micros):
+        '''gives the last boundary before ``micros``.'''
+        self.cover(micros - 2 * self.unit, micros)
+        return self.micros[bisect_left(self.micros, micros) - 1]
+    
+    def after(self, micros):
+        '''gives the first boundary after ``micros``.'''
+        self.cover(micros, micros + 2 * self.unit)
+        return self.micros[bisect(self.micros, micros)]
+    
+_tz_offsets = {}
+
+def tz_offsets(tz):
+    '''gives the :class:`TzOffsets` of timezone ``tz``, building it the first
+    time the timezone is asked for.'''
+    try:
+        return _tz_offsets[tz]
+    except KeyError:
+        offsets = _tz_offsets[tz] = TzOffsets(tz)
+        return offsets
+
+
 _tail_names = ['microsecond', 'second', 'minute', 'hour', 'day']
 _tail_res = {'microsecond': 10 ** -6, 'second': 1, 'minute': 60, 'hour': 3600,
              'day': 3600 * 24}
@@ -405,28 +1999,23 @@ def round_time(dt, grain='second', mode='nearest'):
         :attr:`TimeTick.mode`. Defaults to 'second'
     :param mode: the rounding mode. Can be any one of 'nearest', 'up', or 'down'.
         Defaults to 'nearest'
+        
+    The wall clock of ``dt`` is rounded with :func:`round_micros`, keeping 
+    its tzinfo.
     '''
-    if mode == 'nearest':
-        round_func = round
-    elif mode == 'up':
-        round_func = ceil
-    else:
-        round_func = floor
-    res = TimeTick.granularity(grain)
-    if grain in _tail_names:
-        tail = time_tail(dt, _tail_names.index(grain))
-    else:
-        mult, gr = grain.split(' ')
-        tail = time_tail(dt, _tail_names.index(gr[:-1]) + 1)
-    trunced = dt - tail
-    return timedelta(seconds=res * round_func(tail.total_seconds() / res)) \
-        + trunced
+    wall = micros_of(dt.replace(tzinfo=None))
+    return dt + timedelta(microseconds=round_micros(wall, grain, mode) - wall)
 
 
 class TimeTick(Tick):  
     
     size_dict = \
-        {'day': [dp(5), dp(48)],
+        {'decade': [dp(7), dp(68)],
+         'year': [dp(6.5), dp(64)],
+         'quarter': [dp(6), dp(60)],
+         'month': [dp(5.5), dp(56)],
+         'week': [dp(5), dp(52)],
+         'day': [dp(5), dp(48)],
          '12 hours': [dp(4.5), dp(25)],
          '6 hours': [dp(4.5), dp(25)],
          '4 hours': [dp(4), dp(20)],
@@ -441,10 +2030,27 @@ class TimeTick(Tick):
          '15 seconds': [dp(1.5), dp(7)],
          '10 seconds': [dp(1), dp(4)],
          '5 seconds': [dp(1), dp(4)],
-         'second': [dp(1), dp(4)]} 
+         'second': [dp(1), dp(4)],
+         '500 milliseconds': [dp(1), dp(4)],
+         '100 milliseconds': [dp(1), dp(3.5)],
+         '50 milliseconds': [dp(1), dp(3.5)],
+         '10 milliseconds': [dp(1), dp(3)],
+         '5 milliseconds': [dp(1), dp(3)],
+         'millisecond': [dp(1), dp(3)],
+         '500 microseconds': [dp(1), dp(2.5)],
+         '100 microseconds': [dp(1), dp(2.5)],
+         '50 microseconds': [dp(1), dp(2)],
+         '10 microseconds': [dp(1), dp(2)],
+         '5 microseconds': [dp(1), dp(1.5)],
+         'microsecond': [dp(1), dp(1.5)]} 
         
     scale_factor_dict = \
-        {'day': 1,
+        {'decade': 1 / 3652.425,
+         'year': 1 / 365.2425,
+         'quarter': 4 / 365.2425,
+         'month': 12 / 365.2425,
+         'week': 1 / 7.,
+         'day': 1,
          '12 hours': 2,
          '6 hours': 4,
          '4 hours': 6,
@@ -459,9 +2065,26 @@ class TimeTick(Tick):
          '15 seconds': 24 * 240,
          '10 seconds': 24 * 360,
          '5 seconds': 24 * 720,
-         'second': 24 * 3600}
+         'second': 24 * 3600,
+         '500 milliseconds': 24 * 3600 * 2,
+         '100 milliseconds': 24 * 3600 * 10,
+         '50 milliseconds': 24 * 3600 * 20,
+         '10 milliseconds': 24 * 3600 * 100,
+         '5 milliseconds': 24 * 3600 * 200,
+         'millisecond': 24 * 3600 * 1000,
+         '500 microseconds': 24 * 3600 * 2000,
+         '100 microseconds': 24 * 3600 * 10000,
+         '50 microseconds': 24 * 3600 * 20000,
+         '10 microseconds': 24 * 3600 * 100000,
+         '5 microseconds': 24 * 3600 * 200000,
+         'microsecond': 24 * 3600 * 1000000}
         
-    mode_options = ['day',
+    mode_options = ['decade',
+           'year',
+           'quarter',
+           'month',
+           'week',
+           'day',
            '12 hours',
            '6 hours',
            '4 hours',
@@ -476,7 +2099,25 @@ class TimeTick(Tick):
            '15 seconds',
            '10 seconds',
            '5 seconds',
-           'second']
+           'second',
+           '500 milliseconds',
+           '100 milliseconds',
+           '50 milliseconds',
+           '10 milliseconds',
+           '5 milliseconds',
+           'millisecond',
+           '500 microseconds',
+           '100 microseconds',
+           '50 microseconds',
+           '10 microseconds',
+           '5 microseconds',
+           'microsecond']
+    
+    calendar_modes = ['decade', 'year', 'quarter', 'month', 'week']
+    '''the modes whose ticks fall on calendar boundaries (the first of 
+    a month, or Monday for weeks), at irregular intervals. Their 
+    :attr:`scale_factor_dict` entries are averages, only used for spacing
+    ticks and labels.'''
     
     mode = OptionProperty('day', options=mode_options)
     # 188 is good to be an entire header for the date
@@ -487,13 +2128,42 @@ class TimeTick(Tick):
         self._tick_size = val
     tick_size = AliasProperty(get_tick_size, set_tick_size,
                               bind=['_tick_size', 'mode'])
-    tz = ObjectProperty(get_localzone())
+    tz = ObjectProperty(None)
+    '''the timezone of the ticks, a pytz timezone. Defaults to the local
+    zone, see :func:`local_zone`.'''
+    
+    origin = NumericProperty(0)
+    '''the time, in microseconds since unix epoch, of index 0. Set by the 
+    owning :class:`Timeline`, see :attr:`Timeline.origin`.'''
+    
+    datetime_ticks = BooleanProperty(False)
+    '''if True, :meth:`tick_iter` yields the times of the ticks instead of
+    their local indices, and :meth:`draw` receives datetimes. This is
+    convenient for subclasses working with datetimes, but slower.'''
+    
+    batch_draw = BooleanProperty(False)
+    '''if True and numpy is available, all ticks of a frame are drawn at once
+    by :meth:`draw_batch` into a single :class:`~kivy.graphics.Mesh` that is
+    updated in place, instead of one :meth:`draw` call per tick. Overrides
+    of :meth:`draw` are then bypassed. Should be set before the tick is
+    first displayed.'''
+    
+    max_batch_size = 16384
+    '''the maximal number of ticks drawn by :meth:`draw_batch`, bounded by 
+    the number of vertices a :class:`~kivy.graphics.Mesh` can index.'''
+    
     def __init__(self, *args, **kw):
+        self._offsets = None
+        self._tick_count = 0
+        if kw.get('tz') is None:
+            kw['tz'] = local_zone()
         super(TimeTick, self).__init__(*args, **kw)
+        self._batches = {}
     @classmethod
     def granularity(cls, mode):
         '''gives the multiplicity of this mode in terms of seconds.'''
-        return cls.scale_factor_dict['second'] / cls.scale_factor_dict[mode]
+        return (float(cls.scale_factor_dict['second']) 
+                / cls.scale_factor_dict[mode])
     def time_min_max(self, tl, extended=False):
         '''gives either (:meth:`time_0`, :meth`time_1`) or 
         (:meth:`time_1`, :meth`time_0`) applied to ``tl``
@@ -518,39 +2188,304 @@ class TimeTick(Tick):
             max_ += timedelta(seconds=interval)
         return min_, max_
         
+    def index_range(self, tl):
+        '''gives, in closed form, the ticks that should be drawn on screen
+        as a triple ``(first, last, shift)``: the local indices of these
+        ticks are ``k - shift`` for ``first <= k <= last``. ``shift`` 
+        accounts for the utc offset of :attr:`tz`, so that ticks fall on
+        local wall clock boundaries.
+        
+        Returns None if the utc offset changes within the window (e.g.
+        a daylight saving transition is on screen), or for 
+        :attr:`calendar_modes`, in which case the ticks have to be found by
+        :meth:`micros_iter`.
+        '''
+        if self.mode in self.calendar_modes:
+            return None
+        index_0, index_1 = tl.index_0, tl.index_1
+        if index_0 > index_1:
+            index_0, index_1 = index_1, index_0
+        # extend the window by 1 densest tick, like ``time_min_max``
+        pad = 1. / tl.densest_tick.scale_factor
+        index_0 -= pad
+        index_1 += pad
+        offset = self._utcoffset(index_0)
+        if offset != self._utcoffset(index_1):
+            return None
+        if self.mode == 'day' and offset != self._utcoffset(
+                index_0 - 1 if tl.backward else index_1 + 1):
+            # the extra day is past a change of the utc offset
+            return None
+        sf = self.scale_factor
+        unit = mode_micros(self.mode)
+        shift = ((self.origin + offset * micros_per_second) % unit 
+                 / float(unit))
+        first = int(ceil(index_0 * sf + shift))
+        last = int(floor(index_1 * sf + shift))
+        if self.mode == 'day':
+            # the extra day for the push graphics of TimeLabeller
+            if tl.backward:
+                first -= 1
+            else:
+                last += 1
+        return first, last, shift
+    
+    def _utcoffset(self, global_index):
+        '''the utc offset of :attr:`tz`, in seconds, at ``global_index``.'''
+        return self.get_offsets().offset_at(
+            micros_of_index(global_index, origin=self.origin) 
+            // micros_per_second)
+    
+    def get_offsets(self):
+        '''gives the :class:`TzOffsets` of :attr:`tz`.'''
+        offsets = self._offsets
+        if offsets is None:
+            offsets = self._offsets = tz_offsets(self.tz)
+        return offsets
+    
+    def on_tz(self, *args):
+        self._offsets = None
+    
     def tick_iter(self, tl):
         '''Overrides :meth:`Tick.tick_iter`.
         
-        Provides an iterator of the times that correspond to ticks that 
-        should be drawn on screen, depending on :attr:`mode`. Note that
+        Provides an iterator of the local indices of ticks that 
+        should be drawn on screen, depending on :attr:`mode`. These are
+        computed arithmetically by :meth:`index_range` whenever possible,
+        without creating any datetime. Note that
         for the "day" mode, the day past the last day shown on screen is also
         given, for the push graphics (see :class:`TimeLabeller` for details).
+        
+        If :attr:`datetime_ticks` is True, then the times of the ticks 
+        are given instead, as computed by :meth:`datetime_iter`.
+        
+        Ticks of a :class:`Timeline` in a :class:`TimelineGroup` get the
+        indices without a closed form from the group, which computes them 
+        once for all members with the same :attr:`mode` and :attr:`tz`.
         '''
+        if not self.shown_on(tl):
+            return
+        if self.datetime_ticks:
+            for time in self.datetime_iter(tl):
+                yield time
+            return
+        index_range = self.index_range(tl)
+        if index_range is None and getattr(tl, 'group', None) is not None:
+            indices = tl.group.tick_indices(self, tl)
+            self._tick_count = len(indices)
+            for index in indices:
+                yield index
+            return
+        if index_range is None:
+            scale_factor, origin = self.scale_factor, self.origin
+            self._tick_count = 0
+            for micros in self.micros_iter(tl):
+                self._tick_count += 1
+                yield index_of_micros(micros, scale_factor, origin)
+            return
+        first, last, shift = index_range
+        self._tick_count = last - first + 1
+        for k in range(first, last + 1):
+            yield k - shift
+    
+    def shown_on(self, tl):
+        '''whether the ticks are drawn on ``tl``: if they're not too dense,
+        and, on a :class:`Timeline`, not dropped by its level of detail 
+        (see :attr:`Timeline.frame_budget`).'''
         if self.scale(tl.scale) < self.min_space:
-            raise StopIteration        
-        time_min, time_max = self.time_min_max(tl, extended=True)
-        time = round_time(time_min, self.mode, 'up')
-        delta = timedelta(seconds=self.granularity(self.mode))
+            return False
+        return not isinstance(tl, Timeline) or tl.shows(self)
+    
+    def display(self, tickline):
+        '''Overrides :meth:`Tick.display` to use :meth:`draw_batch` if 
+        :attr:`batch_draw`.'''
+        stats = getattr(tickline, '_frame_stats', None)
+        if stats is not None:
+            start = default_timer()
+            self._tick_count = 0
+        if self.batch_draw and not self.datetime_ticks and \
+                import_numpy() is not None:
+            self.draw_batch(tickline)
+        else:
+            super(TimeTick, self).display(tickline)
+        if stats is not None:
+            stats['ticks'][self.mode] = (self._tick_count, 
+                                         default_timer() - start)
+            
+    def index_array(self, tl):
+        '''gives the local indices of :meth:`tick_iter` as a numpy array.'''
+        index_range = self.index_range(tl)
+        if index_range is None:
+            return numpy.fromiter(self.tick_iter(tl), dtype=float)
+        first, last, shift = index_range
+        return numpy.arange(first, last + 1, dtype=float) - shift
+        
+    def cross_extent(self, tl):
+        '''gives the (start, length) of a tick across ``tl``: its x and width
+        if ``tl`` is vertical, its y and height otherwise.'''
+        length = self.tick_size[1]
+        if tl.is_vertical():
+            align = self.halign
+            if align == 'left':
+                start = tl.x
+            elif align == 'line_left':
+                start = tl.line_pos - length
+            elif align == 'line_right':
+                start = tl.line_pos
+            else:
+                start = tl.right - length
+        else:
+            align = self.valign
+            if align == 'top':
+                start = tl.top - length
+            elif align == 'line_top':
+                start = tl.line_pos
+            elif align == 'line_bottom':
+                start = tl.line_pos - length
+            else:
+                start = tl.y
+        return start, length
+    
+    def positions_of(self, tl, indices):
+        '''vectorized version of :meth:`pos_of`, for a numpy array of 
+        local ``indices``. Relies on :meth:`Tickline.index2pos` being
+        affine.'''
+        index_0 = tl.index_0
+        pos_0 = tl.index2pos(index_0)
+        slope = tl.index2pos(index_0 + 1) - pos_0
+        return pos_0 + (indices / self.scale_factor - index_0) * slope
+    
+    def _get_batch(self, tl):
+        batch = self._batches.get(tl)
+        if batch is None:
+            color = Color(*self.tick_color)
+            mesh = Mesh(mode='triangles')
+            group = InstructionGroup()
+            group.add(color)
+            group.add(mesh)
+            tl.canvas.add(group)
+            # vertices and indices buffers are grown as needed
+            batch = self._batches[tl] = [group, color, mesh,
+                                         numpy.zeros(0, dtype='float32'),
+                                         numpy.zeros(0, dtype='uint16')]
+        return batch
+    
+    def clear_batch(self, tickline):
+        '''removes the graphics of :meth:`draw_batch` from ``tickline``.'''
+        batch = self._batches.pop(tickline, None)
+        if batch is not None:
+            tickline.canvas.remove(batch[0])
+    
+    def draw_batch(self, tickline):
+        '''draws all ticks of the current frame at once, computing their
+        positions with numpy and writing their rectangles into a 
+        preallocated vertex buffer of a single mesh. Ticks that may be 
+        labelled are registered with the labeller as usual.'''
+        tl = tickline
+        batch = self._get_batch(tl)
+        group, color, mesh, vertices, indices = batch
+        color.rgba = self.tick_color
+        if not self.shown_on(tl):
+            mesh.indices = []
+            return
+        tick_indices = self.index_array(tl)[:self.max_batch_size]
+        n = self._tick_count = len(tick_indices)
+        if not n:
+            # kivy can't take empty buffers
+            mesh.indices = []
+            return
+        if len(vertices) < 16 * n:
+            size = max(n, 2 * len(vertices) // 16, 64)
+            size = min(size, self.max_batch_size)
+            vertices = batch[3] = numpy.zeros(16 * size, dtype='float32')
+            quad = numpy.array([0, 1, 2, 2, 3, 0], dtype='uint16')
+            indices = batch[4] = (
+                quad + 4 * numpy.arange(size, dtype='uint16')[:, None]
+                ).astype('uint16').ravel()
+        pos = self.positions_of(tl, tick_indices)
+        thickness = self.tick_size[0]
+        start, length = self.cross_extent(tl)
+        lo = pos - thickness / 2.
+        hi = lo + thickness
+        v = vertices[:16 * n].reshape(n, 4, 4)
+        # xy of corners, counterclockwise, starting at the origin of the tick
+        a, b = (1, 0) if tl.is_vertical() else (0, 1)
+        v[:, 0, a] = lo
+        v[:, 1, a] = lo
+        v[:, 2, a] = hi
+        v[:, 3, a] = hi
+        v[:, 0, b] = start
+        v[:, 1, b] = start + length
+        v[:, 2, b] = start + length
+        v[:, 3, b] = start
+        mesh.vertices = vertices[:16 * n]
+        mesh.indices = indices[:6 * n]
+        if self.scale(tl.scale) >= self.min_label_space:
+            register = tl.labeller.register
+            if a:
+                for index, y in zip(tick_indices.tolist(), lo.tolist()):
+                    register(self, index, (start, y, length, thickness))
+            else:
+                for index, x in zip(tick_indices.tolist(), lo.tolist()):
+                    register(self, index, (x, start, thickness, length))
+    
+    def micros_iter(self, tl):
+        '''Provides an iterator of the times, in microseconds since unix 
+        epoch, that correspond to ticks that should be drawn on screen, 
+        read from the :class:`BoundaryTable` of :attr:`mode`, or for 
+        :attr:`calendar_modes`, by stepping from the first one. See 
+        :meth:`tick_iter`.'''
+        index_0, index_1 = tl.index_0, tl.index_1
+        if index_0 > index_1:
+            index_0, index_1 = index_1, index_0
+        # extend the window by 1 densest tick, like ``time_min_max``
+        pad = 1. / tl.densest_tick.scale_factor
+        time_min = micros_of_index(index_0 - pad, origin=self.origin)
+        time_max = micros_of_index(index_1 + pad, origin=self.origin)
+        if self.mode in self.calendar_modes:
+            # jump to the first boundary, then step from boundary to 
+            # boundary on the wall clock. A period whose midnight is 
+            # skipped starts at the transition.
+            offsets, mode = self.get_offsets(), self.mode
+            local = round_micros(offsets.local_micros(time_min), mode, 'up')
+            time = offsets.first_showing(local)
+            while time <= time_max:
+                yield time
+                local = calendar_bounds(local, mode)[1]
+                time = offsets.first_showing(local)
+            return
+        # the wall clock boundaries, exact across utc offset changes
+        table = self.get_offsets().boundaries(self.mode)
         if self.mode == 'day' and tl.backward:
-            yield time - timedelta(days=1)
-        while time <= time_max:
+            yield table.before(time_min)
+        for time in table.between(time_min, time_max):
             yield time
-            time += delta
         if self.mode == 'day' and not tl.backward:
-            yield time
-        raise StopIteration
+            yield table.after(time_max)
+    
+    def datetime_iter(self, tl):
+        '''Provides an iterator of the times that correspond to ticks that 
+        should be drawn on screen, as datetimes in :attr:`tz`. See 
+        :meth:`micros_iter`.'''
+        tz = self.tz
+        for micros in self.micros_iter(tl):
+            yield datetime_of_micros(micros, tz)
     
     def draw(self, tickline, time):
         '''Override :meth:`Tick.draw`.
         
         Instead of taking a pair (pos, index) of the tick to be drawn, takes
-        the time of such a tick, and internally convert it to (pos, index)
-        using :meth:`index_of` and :meth:`index2pos`.
+        either the local index or the time of such a tick, and internally 
+        convert it to (pos, index) using :meth:`index_of` and 
+        :meth:`index2pos`.
         '''
         super(TimeTick, self).draw(tickline, self.pos_index_of(tickline, time))
         
     def pos_index_of(self, tickline, time):
-        tick_index = self.index_of(time)
+        if isinstance(time, Number):
+            tick_index = time
+        else:
+            tick_index = self.index_of(time)
         tick_pos = tickline.index2pos(self.globalize(tick_index))
         return tick_pos, tick_index
     
@@ -561,20 +2496,40 @@ class TimeTick(Tick):
         self.scale_factor = self.scale_factor_dict[self.mode]
         
     def datetime_of(self, tick_index):
-        if self.mode in ('day', 'hour', 'minute', 'second'):
-            t = timedelta(**{self.mode + 's': tick_index}) + unixepoch
-        else:
-            mult, mode = self.mode.split(' ')
-            t = timedelta(**{mode: int(mult) * tick_index}) + unixepoch
-        t = t.astimezone(self.tz)
-        return t
+        '''converts the ``tick_index`` to a datetime in :attr:`tz`.'''
+        return datetime_of_micros(self.to_micros(tick_index), self.tz)
+    
+    def to_micros(self, tick_index):
+        '''converts the ``tick_index`` to the number of microseconds since
+        unix epoch, to the nearest integer, or to the nearest second for 
+        :attr:`calendar_modes`, whose ticks are on whole seconds but whose
+        indices aren't round.'''
+        micros = micros_of_index(tick_index, self.scale_factor, self.origin)
+        if self.mode in self.calendar_modes:
+            return round_micros(micros, 'second')
+        return micros
+    
+    def micros_array(self, tick_indices):
+        '''vectorized :meth:`to_micros`.'''
+        return micros_of_index_array(tick_indices, self.scale_factor,
+                                     self.origin)
+    
+    def seconds_of(self, tick_index):
+        '''converts the ``tick_index`` to the number of seconds since 
+        unix epoch, to the nearest microsecond.'''
+        return self.to_micros(tick_index) / float(micros_per_second)
+    
+    def wall_clock_of(self, tick_index):
+        '''gives the local wall clock of ``tick_index`` in :attr:`tz` as
+        fields, without creating a datetime. See 
+        :meth:`TzOffsets.wall_clock_micros`.'''
+        return self.get_offsets().wall_clock_micros(self.to_micros(tick_index))
     
     def to_seconds(self, tick_index):
         '''converts the ``tick_index`` to the number of seconds since 
         unix epoch. Always returns the nearest integer.'''
-        
-        return round(tick_index * self.scale_factor_dict['second'] 
-                     / self.scale_factor)
+        return (self.to_micros(tick_index) + micros_per_second // 2) \
+            // micros_per_second
         
     def pos2time(self, pos, tl):
         return self.datetime_of(self.localize(tl.pos2index(pos)))
@@ -589,58 +2544,1903 @@ class TimeTick(Tick):
             Defaults to False.
         '''
         
-        secs = (dt - unixepoch).total_seconds() 
-        global_idx = secs / self.scale_factor_dict['second']
         if global_:
-            return global_idx
-        return self.localize(global_idx)
+            return index_of_micros(micros_of(dt), origin=self.origin)
+        return index_of_micros(micros_of(dt), self.scale_factor, self.origin)
             
     def get_label_texture(self, index, succinct=True, return_kw=False,
                           return_label=False, **kw):
+        if self.mode == 'microsecond':
+            return None
         if isinstance(index, Number):
-            t = self.datetime_of(index)
+            micros = self.to_micros(index)
         else:
-            t = index
-        if self.mode == 'second':
-            return None
+            micros = micros_of(index)
+        wall_clock = self.get_offsets().wall_clock_micros
         if self.mode == 'day':
-            # need to get the datetime of the previous day
-            text = (t - timedelta(seconds=1)).strftime('%a\n%m-%d-%y')
+            # need to get the date of the previous day
+            year, month, day, _, _, _, _, weekday = wall_clock(
+                micros - micros_per_second)
+            text = '%s\n%02d-%02d-%02d' % (day_abbr[weekday], month, day,
+                                           year % 100)
+            kw.setdefault('height', 50)
+        elif self.mode in self.calendar_modes:
+            # name the period starting at the tick
+            year, month, day = wall_clock(micros)[:3]
+            if self.mode == 'week':
+                # iso week number: that of the week's thursday in its year
+                days = days_from_civil(year, month, day)
+                thursday_year = civil_from_days(days + 3)[0]
+                week = (days + 3 - days_from_civil(thursday_year, 1, 1)) // 7
+                text = 'W%02d\n%02d-%02d-%02d' % (week + 1, month, day, 
+                                                  year % 100)
+            elif self.mode == 'month':
+                text = '%s\n%d' % (month_abbr[month], year)
+            elif self.mode == 'quarter':
+                text = 'Q%d\n%d' % ((month - 1) // 3 + 1, year)
+            elif self.mode == 'year':
+                text = '%d' % year
+            else:
+                text = '%ds' % year
             kw.setdefault('height', 50)
-        elif 'second' not in self.mode and succinct:
-            text = str(t.time())[:-3]
         else:
-            text = str(t.time())
+            hour, minute, second, microsecond = wall_clock(micros)[3:7]
+            if 'second' not in self.mode and succinct:
+                text = '%02d:%02d' % (hour, minute)
+            else:
+                text = '%02d:%02d:%02d' % (hour, minute, second)
+                if microsecond % 1000:
+                    text += '.%06d' % microsecond
+                elif microsecond:
+                    text += '.%03d' % (microsecond // 1000)
         kw.setdefault('height', 20)
         kw['text'] = text
         if return_kw:
             return kw
         if not return_label:
-            return CoreLabel(**kw).texture
-        label = AutoSizeLabel(**kw)
+            return default_texture_cache.texture_of(kw)
+        label = auto_size_label()(**kw)
         label.texture_update()
         return label
     
-def all_time_ticks():
+def all_time_ticks(**kw):
     '''returns a list of :class:`TimeTick`s, one for each of the available
     :attr:`~TimeTick.mode`s, specified in :attr:`TimeTick.mode_options`.
+    Keyword arguments are passed on to each :class:`TimeTick`, e.g.
+    ``all_time_ticks(batch_draw=True)``.
     '''
-    return [TimeTick(mode=m) for m in TimeTick.mode.options]
+    return [TimeTick(mode=m, **kw) for m in TimeTick.mode.options]
 
-def selected_time_ticks():
+def selected_time_ticks(**kw):
     '''returns a list of :class:`TimeTick`s with intervals of
     1 day, 4 hours, 1 hour, 15 minutes, 5 minutes, 1 minute, 15 seconds,
-    5 seconds, and 1 second.'''
-    return [TimeTick(mode=TimeTick.mode.options[i]) for i in 
-            [0, 3, 5, 7, 9, 10, 12, 14, 15]]
+    5 seconds, and 1 second. Keyword arguments are passed on to each
+    :class:`TimeTick`.'''
+    return [TimeTick(mode=mode, **kw) for mode in 
+            ['day', '4 hours', 'hour', '15 minutes', '5 minutes', 'minute',
+             '15 seconds', '5 seconds', 'second']]
+
+class TimelineGroup(object):
+    '''locks :class:`Timeline`s to the same window, whatever their
+    :attr:`~Timeline.tz`, orientation or size, and shares their work. 
+    
+    Members have the same :attr:`~Timeline.origin`, :attr:`~Tickline.index_0`
+    and :attr:`~Tickline.index_1`: moving one moves the others. As their 
+    indices are then equal, the ticks that have to be found by 
+    :meth:`TimeTick.micros_iter` are computed once per mode and timezone
+    for the whole group (see :meth:`tick_indices`), and labels are
+    rasterized once into the shared :attr:`texture_cache`. Timezone
+    conversions are shared by all timelines already (see 
+    :func:`tz_offsets`).
+    
+    :param timelines: the initial members. The first sets the window.
+    :param texture_cache: the :class:`LabelTextureCache` of the members' 
+        labellers. Defaults to a new one.
+    '''
+    
+    def __init__(self, timelines=(), texture_cache=None):
+        self.timelines = []
+        if texture_cache is None:
+            texture_cache = LabelTextureCache(1024)
+        self.texture_cache = texture_cache
+        self._tick_indices = {}
+        self._syncing = False
+        for tl in timelines:
+            self.add(tl)
+            
+    def __len__(self):
+        return len(self.timelines)
+    
+    def __iter__(self):
+        return iter(self.timelines)
+        
+    def add(self, tl):
+        '''adds the :class:`Timeline` ``tl``, moving it to the window of the
+        group, if it has members already.'''
+        if tl.group is not None:
+            tl.group.remove(tl)
+        if self.timelines:
+            self._copy_window(self.timelines[0], tl)
+        self.timelines.append(tl)
+        tl.group = self
+        tl.labeller.texture_cache = self.texture_cache
+        tl.bind(origin=self._sync, index_0=self._sync, index_1=self._sync)
+        
+    def remove(self, tl):
+        '''removes the :class:`Timeline` ``tl``, which keeps its window but
+        uses :data:`default_texture_cache` again.'''
+        self.timelines.remove(tl)
+        tl.unbind(origin=self._sync, index_0=self._sync, index_1=self._sync)
+        tl.group = None
+        tl.labeller.texture_cache = default_texture_cache
+        
+    def _copy_window(self, source, tl):
+        # the origin first, as changing it shifts the indices
+        tl.origin = source.origin
+        tl.index_0 = source.index_0
+        tl.index_1 = source.index_1
+        
+    def _sync(self, source, *args):
+        if self._syncing:
+            return
+        self._syncing = True
+        try:
+            self._tick_indices.clear()
+            for tl in self.timelines:
+                if tl is not source:
+                    self._copy_window(source, tl)
+        finally:
+            self._syncing = False
+            
+    def tick_indices(self, tick, tl):
+        '''gives the list of the local indices of the ticks of ``tick`` on
+        ``tl``, as :meth:`TimeTick.micros_iter` finds them, computing them
+        only for the first member that asks, in a frame, for the same 
+        ticks.'''
+        key = (tick.mode, tick.tz, tick.origin, tl.index_0, tl.index_1,
+               tl.backward, tl.densest_tick.scale_factor)
+        indices = self._tick_indices.get(key)
+        if indices is None:
+            scale_factor, origin = tick.scale_factor, tick.origin
+            indices = self._tick_indices[key] = [
+                index_of_micros(micros, scale_factor, origin) 
+                for micros in tick.micros_iter(tl)]
+        return indices
+
+class TimelineOverlay(EventDispatcher):
+    '''base class of graphics drawn over the ticks of a :class:`Timeline`,
+    such as a :class:`TimeSeries`. Add it to :attr:`Timeline.overlays`, 
+    and it will be asked to :meth:`display` itself whenever the window of 
+    the timeline changes.
+    
+    Subclasses draw into the instruction group given by :meth:`get_group`,
+    one for each timeline the overlay is shown on.
+    
+    Live data can be pushed from any thread with :meth:`enqueue`; the 
+    items pushed during a frame are handed together to :meth:`ingest` on 
+    the main thread, at the next frame.
+    '''
+    
+    def __init__(self, **kw):
+        super(TimelineOverlay, self).__init__(**kw)
+        self._groups = {}
+        self._pending = deque()
+        self.trigger_refresh = Clock.create_trigger(self.refresh)
+        self._trigger_ingest = Clock.create_trigger(self._ingest_pending)
+        
+    def enqueue(self, item):
+        '''queues ``item`` for :meth:`ingest`. Safe to call from any 
+        thread.'''
+        self._pending.append(item)
+        self._trigger_ingest()
+        
+    def _ingest_pending(self, *args):
+        pending = self._pending
+        items = []
+        while pending:
+            items.append(pending.popleft())
+        if items:
+            self.ingest(items)
+            
+    def ingest(self, items):
+        '''applies the ``items`` queued by :meth:`enqueue` since the last 
+        frame, on the main thread.'''
+        raise NotImplementedError
+        
+    def get_group(self, tl):
+        '''gives the :class:`~kivy.graphics.InstructionGroup` of this 
+        overlay on ``tl``, adding it to the canvas of ``tl`` if necessary.'''
+        group = self._groups.get(tl)
+        if group is None:
+            group = self._groups[tl] = InstructionGroup()
+            tl.canvas.add(group)
+        return group
+    
+    def timelines(self):
+        '''gives the timelines this overlay is shown on.'''
+        return list(self._groups)
+    
+    def display(self, tl):
+        '''draws this overlay on ``tl``, for its current window.'''
+        raise NotImplementedError
+    
+    def refresh(self, *args):
+        '''redraws this overlay on all timelines it's shown on. Use
+        :meth:`trigger_refresh` to do so once at the next frame.'''
+        for tl in self.timelines():
+            self.display(tl)
+            
+    def clear(self, tl):
+        '''removes the graphics of this overlay from ``tl``.'''
+        group = self._groups.pop(tl, None)
+        if group is not None:
+            tl.canvas.remove(group)
+            
+    @staticmethod
+    def window_of(tl, extended=True):
+        '''gives the window of ``tl`` as (min, max) seconds since unix 
+        epoch. If ``extended``, the window is padded by half its length on 
+        each side, so that panning doesn't immediately reveal undrawn 
+        parts.'''
+        index_0, index_1 = tl.index_0, tl.index_1
+        if index_0 > index_1:
+            index_0, index_1 = index_1, index_0
+        if extended:
+            pad = (index_1 - index_0) / 2.
+            index_0 -= pad
+            index_1 += pad
+        origin = tl.origin / float(micros_per_second)
+        return origin + index_0 * 86400, origin + index_1 * 86400
+    
+    @staticmethod
+    def days_window_of(tl):
+        '''gives the window of ``tl`` as (min, max) days since unix epoch,
+        whatever its :attr:`~Timeline.origin`.'''
+        origin = index_of_micros(tl.origin)
+        return tuple(sorted((origin + tl.index_0, origin + tl.index_1)))
+    
+    @staticmethod
+    def positions_of(tl, seconds):
+        '''vectorized conversion of a numpy array of ``seconds`` since unix
+        epoch to positions along ``tl``.'''
+        index_0 = tl.index_0
+        pos_0 = tl.index2pos(index_0)
+        slope = tl.index2pos(index_0 + 1) - pos_0
+        origin = tl.origin / float(micros_per_second)
+        return pos_0 + ((seconds - origin) / 86400. - index_0) * slope
+    
+
+class ColumnBuffer(object):
+    '''parallel numpy columns that grow at the end and shrink at the front,
+    each in amortized constant time per element: spare room is kept at the
+    end, and the live part is only moved back to the front when the room 
+    runs out, so the buffer never holds more than about twice the live 
+    part.
+    
+    :param dtypes: the dtype of each column.
+    '''
+    
+    def __init__(self, dtypes):
+        self.columns = [numpy.zeros(16, dtype=dtype) for dtype in dtypes]
+        self.start = self.end = 0
+        
+    def __len__(self):
+        return self.end - self.start
+    
+    def views(self):
+        '''gives the live part of each column, without copying.'''
+        start, end = self.start, self.end
+        return [column[start:end] for column in self.columns]
+    
+    def append(self, *arrays):
+        '''appends ``arrays``, one for each column, at the end.'''
+        n = len(arrays[0])
+        start, end = self.start, self.end
+        if end + n > len(self.columns[0]):
+            live = end - start
+            capacity = max(2 * (live + n), 16)
+            columns = []
+            for column in self.columns:
+                new = numpy.empty(capacity, dtype=column.dtype)
+                new[:live] = column[start:end]
+                columns.append(new)
+            self.columns = columns
+            start, end = self.start, self.end = 0, live
+        for column, array in zip(self.columns, arrays):
+            column[end:end + n] = array
+        self.end = end + n
+        
+    def drop_front(self, n):
+        '''drops the first ``n`` live elements.'''
+        self.start = min(self.start + n, self.end)
+        
+
+class MinMaxPyramid(object):
+    '''summaries of a time series at several granularities: for each 
+    granularity, the samples are grouped into buckets of that many seconds
+    (since unix epoch), and the minimum, maximum, sum and count of each 
+    bucket is kept in contiguous numpy arrays. Coarser levels are computed 
+    from the finest finer level whose granularity divides theirs. Bucket
+    ids are computed in whole microseconds (see :meth:`bucket_ids`), so 
+    that sub-second buckets line up across levels.
+    
+    Samples can later be :meth:`append`ed, updating only the last buckets
+    of each level, and the oldest buckets dropped with :meth:`drop_before`.
+    
+    :param timestamps: sorted numpy array of seconds since unix epoch.
+    :param values: numpy array of the values at ``timestamps``.
+    :param granularities: the bucket sizes, in seconds. Defaults to 
+        the granularities of :attr:`TimeTick.mode_options` of a millisecond
+        or more, leaving out the :attr:`TimeTick.calendar_modes`.
+    '''
+    
+    def __init__(self, timestamps, values, granularities=None):
+        if granularities is None:
+            granularities = [TimeTick.granularity(mode) 
+                             for mode in TimeTick.mode_options
+                             if mode not in TimeTick.calendar_modes]
+            granularities = [g for g in granularities if g >= 1e-3]
+        self.granularities = sorted(set(granularities))
+        if self.granularities and self.granularities[0] < 1e-6:
+            raise ValueError('granularities must be at least a microsecond')
+        self._levels = []
+        levels = {}
+        # in whole microseconds, to tell exactly which granularities divide
+        micros = dict((g, int(round(g * micros_per_second))) 
+                      for g in self.granularities)
+        for g in self.granularities:
+            finer = [f for f in levels if micros[g] % micros[f] == 0]
+            if finer:
+                f = max(finer)
+                bucket_ids, mins, maxs, sums, counts = levels[f]
+                ids = bucket_ids // (micros[g] // micros[f])
+                level = self._reduce(ids, mins, maxs, sums, counts)
+            else:
+                ids = self.bucket_ids(timestamps, g)
+                level = self._reduce(ids, values, values, values, 
+                                     numpy.ones(len(values), dtype='int64'))
+            levels[g] = level
+            buf = ColumnBuffer(('int64', 'float64', 'float64', 'float64',
+                                'int64'))
+            buf.append(*level)
+            self._levels.append((g, buf))
+            
+    @property
+    def levels(self):
+        '''list of (granularity, bucket_ids, mins, maxs, sums, counts), from
+        the finest granularity to the coarsest.'''
+        return [(g,) + tuple(buf.views()) for g, buf in self._levels]
+    
+    @staticmethod
+    def bucket_ids(seconds, g):
+        '''gives the ids of the buckets of granularity ``g`` holding the
+        ``seconds`` since unix epoch, a number or a numpy array. Both are
+        rounded to whole microseconds first, as float division would put
+        samples on the edge of a sub-second bucket on either side.'''
+        micros = numpy.rint(numpy.asarray(seconds, dtype='float64') 
+                            * micros_per_second).astype('int64')
+        return micros // int(round(g * micros_per_second))
+            
+    @staticmethod
+    def _reduce(ids, mins, maxs, sums, counts):
+        if not len(ids):
+            return ids, mins, maxs, sums, counts
+        starts = numpy.flatnonzero(numpy.diff(ids)) + 1
+        starts = numpy.concatenate(([0], starts))
+        return (ids[starts], numpy.minimum.reduceat(mins, starts),
+                numpy.maximum.reduceat(maxs, starts),
+                numpy.add.reduceat(sums, starts),
+                numpy.add.reduceat(counts, starts))
+    
+    def append(self, timestamps, values):
+        '''summarizes the samples ``timestamps`` and ``values``, none of 
+        which may be earlier than those already summarized.'''
+        if not len(timestamps):
+            return
+        ones = numpy.ones(len(values), dtype='int64')
+        for g, buf in self._levels:
+            ids = self.bucket_ids(timestamps, g)
+            ids, mins, maxs, sums, counts = \
+                self._reduce(ids, values, values, values, ones)
+            last = buf.end - 1
+            if len(buf) and buf.columns[0][last] == ids[0]:
+                # the first bucket continues the last one
+                columns = buf.columns
+                columns[1][last] = min(columns[1][last], mins[0])
+                columns[2][last] = max(columns[2][last], maxs[0])
+                columns[3][last] += sums[0]
+                columns[4][last] += counts[0]
+                ids, mins, maxs, sums, counts = \
+                    ids[1:], mins[1:], maxs[1:], sums[1:], counts[1:]
+            buf.append(ids, mins, maxs, sums, counts)
+            
+    def drop_before(self, seconds):
+        '''drops the buckets that end before ``seconds``. Buckets straddling
+        ``seconds`` are kept as they are.'''
+        for g, buf in self._levels:
+            buf.drop_front(numpy.searchsorted(buf.views()[0], 
+                                              self.bucket_ids(seconds, g)))
+    
+    @staticmethod
+    def regroup(t, mins, maxs, sums, counts, start, end, columns):
+        '''regroups buckets centered at the sorted seconds ``t`` into 
+        ``columns`` equal columns between the ``start`` and ``end`` seconds.
+        Returns numpy arrays (times, mins, maxs, means), one entry per 
+        nonempty column.'''
+        if not len(t):
+            return t, mins, maxs, sums
+        width = (end - start) / float(columns)
+        col = numpy.floor((t - start) / width).astype('int64')
+        starts = numpy.flatnonzero(numpy.diff(col)) + 1
+        starts = numpy.concatenate(([0], starts))
+        counts = numpy.add.reduceat(counts, starts)
+        return ((col[starts] + .5) * width + start,
+                numpy.minimum.reduceat(mins, starts),
+                numpy.maximum.reduceat(maxs, starts),
+                numpy.add.reduceat(sums, starts) / counts)
+    
+    def level_for(self, start, end, max_buckets):
+        '''gives the finest level (granularity, bucket_ids, mins, maxs, sums,
+        counts) with at most ``max_buckets`` buckets between the ``start`` 
+        and ``end`` seconds, or the coarsest level if there's none.'''
+        levels = self.levels
+        for level in levels:
+            g, bucket_ids = level[:2]
+            i0 = numpy.searchsorted(bucket_ids, self.bucket_ids(start, g))
+            i1 = numpy.searchsorted(bucket_ids, self.bucket_ids(end, g), 
+                                    'right')
+            if i1 - i0 <= max_buckets:
+                return level
+        return levels[-1]
+    
+
+class TimeSeriesStore(object):
+    '''a read-only time series stored on disk, in columns memory-mapped 
+    with ``mmap``, so that datasets much larger than memory can be plotted:
+    only the pages holding the part of the series in view are read. 
+    Requires numpy.
+    
+    A store is a directory holding:
+    
+    - ``times.i8``, the timestamps as little-endian 64-bit integer 
+      microseconds since unix epoch, sorted;
+    - ``values.f8``, the values at these timestamps, as little-endian 
+      64-bit floats;
+    - ``summary-<n>.npy``, the block index at level n: for level 0, one
+      row per block of :attr:`block_size` samples, with the first and last 
+      timestamps of the block, the offset of its first sample, and the 
+      minimum, maximum, sum and count of its values; each further level 
+      summarizes :attr:`fanout` rows of the previous one;
+    - ``meta.json``, giving the format, block size, fanout and number of
+      levels.
+    
+    Stores are made by :meth:`write`. Slices of :attr:`times` and 
+    :attr:`values` are numpy views of the mapped files, not copies.
+    
+    :param path: the directory of the store.
+    '''
+    
+    summary_fields = [('start', '<i8'), ('end', '<i8'), ('offset', '<i8'),
+                      ('min', '<f8'), ('max', '<f8'), ('sum', '<f8'), 
+                      ('count', '<i8')]
+    '''the fields of the rows of the block index.'''
+    
+    format = 1
+    
+    def __init__(self, path):
+        if import_numpy() is None:
+            raise ImportError('TimeSeriesStore requires numpy')
+        self.path = path
+        with open(join(path, 'meta.json')) as f:
+            meta = loads(f.read())
+        if meta['format'] != self.format:
+            raise ValueError('unknown time series store format %r' 
+                             % meta['format'])
+        self.block_size = meta['block_size']
+        self.fanout = meta['fanout']
+        self.times = self._map(join(path, 'times.i8'), '<i8')
+        self.values = self._map(join(path, 'values.f8'), '<f8')
+        if len(self.times) != len(self.values):
+            raise ValueError('times and values differ in length')
+        self.levels = [numpy.load(join(path, 'summary-%d.npy' % n), 
+                                  mmap_mode='r')
+                       for n in range(meta['levels'])]
+        
+    @staticmethod
+    def _map(filename, dtype):
+        # numpy can't map empty files
+        if not getsize(filename):
+            return numpy.zeros(0, dtype=dtype)
+        return numpy.memmap(filename, dtype=dtype, mode='r')
+        
+    def __len__(self):
+        return len(self.times)
+    
+    @classmethod
+    def write(cls, path, chunks, block_size=512, fanout=16):
+        '''writes the samples of ``chunks``, an iterable of (timestamps,
+        values) in seconds since unix epoch, as a store in the directory 
+        ``path``, and returns it opened. Timestamps must be sorted 
+        throughout. Chunks are written as they come, so that series larger
+        than memory can be converted piecewise.'''
+        if import_numpy() is None:
+            raise ImportError('TimeSeriesStore requires numpy')
+        if not exists(path):
+            makedirs(path)
+        dtype = numpy.dtype(cls.summary_fields)
+        rows = []
+        carry_t = numpy.zeros(0, dtype='<i8')
+        carry_v = numpy.zeros(0, dtype='<f8')
+        offset = 0
+        last = None
+        with open(join(path, 'times.i8'), 'wb') as times, \
+                open(join(path, 'values.f8'), 'wb') as values:
+            for t, v in chunks:
+                t = numpy.rint(numpy.asarray(t, dtype='float64') 
+                               * micros_per_second).astype('<i8')
+                v = numpy.asarray(v, dtype='<f8')
+                if len(t) != len(v):
+                    raise ValueError('timestamps and values differ in length')
+                if not len(t):
+                    continue
+                if (last is not None and t[0] < last) or \
+                        (numpy.diff(t) < 0).any():
+                    raise ValueError('timestamps must be sorted')
+                last = t[-1]
+                times.write(t.tobytes())
+                values.write(v.tobytes())
+                carry_t = numpy.concatenate((carry_t, t))
+                carry_v = numpy.concatenate((carry_v, v))
+                full = len(carry_t) // block_size * block_size
+                if full:
+                    rows.append(cls._summarize(
+                        carry_t[:full], carry_v[:full], offset, block_size))
+                    offset += full
+                    carry_t, carry_v = carry_t[full:], carry_v[full:]
+        if len(carry_t):
+            rows.append(cls._summarize(carry_t, carry_v, offset, 
+                                       len(carry_t)))
+        level = numpy.concatenate(rows) if rows else numpy.zeros(0, dtype)
+        levels = [level]
+        while len(level) > 1:
+            level = cls._coarsen(level, fanout)
+            levels.append(level)
+        for n, level in enumerate(levels):
+            numpy.save(join(path, 'summary-%d.npy' % n), level)
+        with open(join(path, 'meta.json'), 'w') as f:
+            f.write(dumps({'format': cls.format, 'block_size': block_size,
+                           'fanout': fanout, 'levels': len(levels)}))
+        return cls(path)
+    
+    @classmethod
+    def _summarize(cls, t, v, offset, size):
+        '''gives the rows of the blocks of ``size`` samples of ``t`` and 
+        ``v``, the first of which is at ``offset``.'''
+        starts = numpy.arange(0, len(t), size)
+        rows = numpy.zeros(len(starts), dtype=cls.summary_fields)
+        rows['start'] = t[starts]
+        rows['end'] = t[numpy.minimum(starts + size, len(t)) - 1]
+        rows['offset'] = starts + offset
+        rows['min'] = numpy.minimum.reduceat(v, starts)
+        rows['max'] = numpy.maximum.reduceat(v, starts)
+        rows['sum'] = numpy.add.reduceat(v, starts)
+        rows['count'] = numpy.diff(numpy.append(starts, len(t)))
+        return rows
+    
+    @classmethod
+    def _coarsen(cls, level, fanout):
+        starts = numpy.arange(0, len(level), fanout)
+        rows = numpy.zeros(len(starts), dtype=cls.summary_fields)
+        rows['start'] = level['start'][starts]
+        rows['end'] = level['end'][numpy.minimum(starts + fanout, 
+                                                 len(level)) - 1]
+        rows['offset'] = level['offset'][starts]
+        rows['min'] = numpy.minimum.reduceat(level['min'], starts)
+        rows['max'] = numpy.maximum.reduceat(level['max'], starts)
+        rows['sum'] = numpy.add.reduceat(level['sum'], starts)
+        rows['count'] = numpy.add.reduceat(level['count'], starts)
+        return rows
+    
+    def rows_between(self, level, start, end):
+        '''gives the (first, last + 1) rows of the block index ``level`` 
+        overlapping the ``start`` and ``end`` microseconds, plus one on each
+        side, so that lines leaving the window are drawn.'''
+        rows = self.levels[level]
+        # bisect rather than numpy.searchsorted, which would copy the 
+        # strided columns, reading all of the index
+        i0 = max(bisect_left(rows['end'], start) - 1, 0)
+        i1 = min(bisect(rows['start'], end) + 1, len(rows))
+        return i0, max(i0, i1)
+    
+    def window(self, start, end):
+        '''gives views (times, values) of the samples of the blocks 
+        overlapping the ``start`` and ``end`` seconds, and the neighbouring 
+        blocks.'''
+        levels = self.levels
+        if not len(levels[0]):
+            return self.times[:0], self.values[:0]
+        i0, i1 = self.rows_between(0, int(floor(start * micros_per_second)),
+                                   int(ceil(end * micros_per_second)))
+        rows = levels[0]
+        o0 = rows['offset'][i0]
+        o1 = rows['offset'][i1 - 1] + rows['count'][i1 - 1] if i1 > i0 else o0
+        return self.times[o0:o1], self.values[o0:o1]
+    
+    def summary(self, start, end, columns):
+        '''like :meth:`TimeSeries.summary`: summarizes the data between the
+        ``start`` and ``end`` seconds into at most ``columns`` equal 
+        columns. Only the samples of the blocks in the window are read, 
+        and only when there are few enough of them; otherwise, the finest
+        level of the block index that is small enough is used.'''
+        times, values = self.window(start, end)
+        start_micros = int(floor(start * micros_per_second))
+        end_micros = int(ceil(end * micros_per_second))
+        max_rows = columns * 8
+        i0, i1 = self.rows_between(0, start_micros, end_micros)
+        # blocks wider than columns would show as steps: read their samples
+        if len(times) <= max_rows or i1 - i0 < columns:
+            i0 = max(numpy.searchsorted(times, start_micros) - 1, 0)
+            i1 = numpy.searchsorted(times, end_micros, 'right') + 1
+            t = times[i0:i1] / float(micros_per_second)
+            v = values[i0:i1]
+            if len(t) <= columns:
+                return t, v, v, v
+            return MinMaxPyramid.regroup(t, v, v, v, 
+                                         numpy.ones(len(v), dtype='int64'),
+                                         start, end, columns)
+        level = 0
+        while i1 - i0 > max_rows and level + 1 < len(self.levels):
+            level += 1
+            i0, i1 = self.rows_between(level, start_micros, end_micros)
+        rows = self.levels[level][i0:i1]
+        t = (rows['start'] + rows['end']) / (2. * micros_per_second)
+        return MinMaxPyramid.regroup(t, rows['min'], rows['max'], 
+                                     rows['sum'], rows['count'], 
+                                     start, end, columns)
+    
+
+class IntervalIndex(object):
+    '''an index of intervals (start, end, key) answering which intervals
+    overlap a query interval in logarithmic time (plus the number of 
+    intervals found).
+    
+    Intervals are kept sorted by start, alongside an implicit binary tree
+    holding the maximal end of each subtree. Appending intervals in order
+    of start, as when streaming, updates the tree in logarithmic time; 
+    inserting out of order rebuilds it lazily at the next query.
+    '''
+    
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.keys = []
+        self._capacity = 0
+        self._tree = []
+        self._dirty = False
+        self._removed = 0
+        
+    def __len__(self):
+        return len(self.keys) - self._removed
+    
+    def _rebuild(self):
+        starts, ends, keys = self.starts, self.ends, self.keys
+        if self._removed:
+            live = [i for i, key in enumerate(keys) if key is not None]
+            self.starts = starts = [starts[i] for i in live]
+            self.ends = ends = [ends[i] for i in live]
+            self.keys = keys = [keys[i] for i in live]
+            self._removed = 0
+        capacity = 1
+        while capacity < len(starts):
+            capacity *= 2
+        tree = [float('-inf')] * (2 * capacity)
+        tree[capacity:capacity + len(ends)] = ends
+        for node in range(capacity - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self._capacity = capacity
+        self._tree = tree
+        self._dirty = False
+        
+    def _update(self, i):
+        tree = self._tree
+        node = self._capacity + i
+        tree[node] = self.ends[i] if self.keys[i] is not None else \
+                        float('-inf')
+        node //= 2
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+            
+    def insert(self, start, end, key):
+        '''adds the interval [``start``, ``end``] under ``key``.'''
+        starts = self.starts
+        if not starts or start >= starts[-1]:
+            starts.append(start)
+            self.ends.append(end)
+            self.keys.append(key)
+            if self._dirty or len(starts) > self._capacity:
+                self._dirty = True
+            else:
+                self._update(len(starts) - 1)
+        else:
+            i = bisect(starts, start)
+            starts.insert(i, start)
+            self.ends.insert(i, end)
+            self.keys.insert(i, key)
+            self._dirty = True
+            
+    def remove(self, start, key):
+        '''removes the interval starting at ``start`` under ``key``.'''
+        starts, keys = self.starts, self.keys
+        i = bisect_left(starts, start)
+        while i < len(starts) and starts[i] == start:
+            if keys[i] == key:
+                keys[i] = None
+                self._removed += 1
+                if self._removed > len(keys) // 2:
+                    self._dirty = True
+                elif not self._dirty:
+                    self._update(i)
+                return
+            i += 1
+        raise KeyError(key)
+    
+    def overlapping(self, start, end):
+        '''gives the keys of the intervals overlapping [``start``, ``end``],
+        in order of their start.'''
+        if self._dirty:
+            self._rebuild()
+        n = bisect(self.starts, end)
+        if not n:
+            return []
+        tree, ends, keys = self._tree, self.ends, self.keys
+        capacity = self._capacity
+        found = []
+        # depth first through subtrees within the first n intervals whose
+        # maximal end reaches ``start``
+        stack = [(1, 0, capacity)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= n or tree[node] < start:
+                continue
+            if node >= capacity:
+                found.append(keys[lo])
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return found
+
+
+class RangeCache(object):
+    '''samples fetched for ranges of time, kept sorted in contiguous numpy
+    arrays, along with the ranges they cover, merged into disjoint 
+    intervals. Requires numpy.
+    '''
+    
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.timestamps = numpy.zeros(0)
+        self.values = numpy.zeros(0)
+        
+    def __len__(self):
+        return len(self.timestamps)
+    
+    def missing(self, start, end):
+        '''gives the (start, end) parts of the range between the ``start``
+        and ``end`` seconds that aren't covered.'''
+        starts, ends = self.starts, self.ends
+        gaps = []
+        pos = start
+        for i in range(bisect_left(ends, start), len(ends)):
+            if starts[i] >= end:
+                break
+            if starts[i] > pos:
+                gaps.append((pos, starts[i]))
+            pos = max(pos, ends[i])
+        if pos < end:
+            gaps.append((pos, end))
+        return gaps
+    
+    def covers(self, start, end):
+        '''whether the range between the ``start`` and ``end`` seconds is
+        wholly covered.'''
+        i = bisect_left(self.ends, end)
+        return i < len(self.ends) and self.starts[i] <= start
+        
+    def add(self, start, end, timestamps, values):
+        '''caches the samples ``timestamps`` and ``values`` fetched for the
+        range between the ``start`` and ``end`` seconds, replacing those 
+        cached for that range.'''
+        timestamps = numpy.asarray(timestamps, dtype='float64')
+        values = numpy.asarray(values, dtype='float64')
+        if len(timestamps) != len(values):
+            raise ValueError('timestamps and values differ in length')
+        order = numpy.argsort(timestamps, kind='mergesort')
+        timestamps, values = timestamps[order], values[order]
+        j0 = numpy.searchsorted(timestamps, start)
+        j1 = numpy.searchsorted(timestamps, end, 'right')
+        old = self.timestamps
+        i0 = numpy.searchsorted(old, start)
+        i1 = numpy.searchsorted(old, end, 'right')
+        self.timestamps = numpy.concatenate(
+            (old[:i0], timestamps[j0:j1], old[i1:]))
+        self.values = numpy.concatenate(
+            (self.values[:i0], values[j0:j1], self.values[i1:]))
+        starts, ends = self.starts, self.ends
+        i = bisect_left(ends, start)
+        j = bisect(starts, end)
+        if i < j:
+            start, end = min(start, starts[i]), max(end, ends[j - 1])
+        starts[i:j] = [start]
+        ends[i:j] = [end]
+        
+    def samples(self, start, end):
+        '''gives views (timestamps, values) of the samples between the 
+        ``start`` and ``end`` seconds, and one more on each side, so that 
+        lines leaving the range are drawn.'''
+        timestamps = self.timestamps
+        i0 = max(numpy.searchsorted(timestamps, start) - 1, 0)
+        i1 = numpy.searchsorted(timestamps, end, 'right') + 1
+        return timestamps[i0:i1], self.values[i0:i1]
+    
+    def keep(self, start, end):
+        '''drops the samples and ranges outside of the ``start`` and ``end``
+        seconds.'''
+        i0 = numpy.searchsorted(self.timestamps, start)
+        i1 = numpy.searchsorted(self.timestamps, end, 'right')
+        self.timestamps = self.timestamps[i0:i1].copy()
+        self.values = self.values[i0:i1].copy()
+        ranges = [(max(s, start), min(e, end)) 
+                  for s, e in zip(self.starts, self.ends)
+                  if e >= start and s <= end]
+        self.starts = [s for s, e in ranges]
+        self.ends = [e for s, e in ranges]
+    
+
+class SpanLayer(TimelineOverlay):
+    '''an overlay of spans of time, such as shifts or incidents, drawn as
+    bars along a :class:`Timeline`. Spans are kept in an 
+    :class:`IntervalIndex` keyed by the global index of the timeline, so
+    finding those in view takes logarithmic time, and like the labels of
+    :class:`TimeLabeller`, only the spans entering or leaving the view
+    add or remove canvas instructions.
+    
+    Live spans can be pushed from any thread with :meth:`push_span`.
+    '''
+    
+    color = ListProperty([.5, .5, 1, .6])
+    '''default color of the spans.'''
+    
+    offset = NumericProperty('0dp')
+    '''distance of the bars from the left (or bottom, if horizontal) of 
+    the timeline.'''
+    
+    thickness = NumericProperty('8dp')
+    '''thickness of the bars.'''
+    
+    def __init__(self, **kw):
+        super(SpanLayer, self).__init__(**kw)
+        self.index = IntervalIndex()
+        self.spans = {}
+        self._instructions = {}
+        self._keys = count()
+        self.bind(color=self._recolor, offset=self.trigger_refresh, 
+                  thickness=self.trigger_refresh)
+        
+    @staticmethod
+    def _index(time):
+        if isinstance(time, Number):
+            return time
+        return index_of_micros(micros_of(time))
+    
+    def add_span(self, start, end, color=None, key=None):
+        '''adds a span from ``start`` to ``end``, each either a datetime
+        or a number of days since unix epoch (a global index of a 
+        :class:`Timeline` of default :attr:`~Timeline.origin`), and returns
+        its key. If ``color`` is None, the span takes :attr:`color`.'''
+        key = self._add_span(start, end, color, key)
+        self.trigger_refresh()
+        return key
+    
+    def _add_span(self, start, end, color, key):
+        start, end = self._index(start), self._index(end)
+        if end < start:
+            start, end = end, start
+        if key is None:
+            key = next(self._keys)
+        elif key in self.spans:
+            self.remove_span(key)
+        self.spans[key] = (start, end, color)
+        self.index.insert(start, end, key)
+        return key
+    
+    def push_span(self, start, end, color=None):
+        '''queues a span to be added at the next frame, and returns its key.
+        Safe to call from any thread. See :meth:`add_span`.'''
+        key = next(self._keys)
+        self.enqueue((start, end, color, key))
+        return key
+    
+    def ingest(self, items):
+        add_span = self._add_span
+        lo = hi = None
+        for start, end, color, key in items:
+            start, end = self.spans[add_span(start, end, color, key)][:2]
+            lo = start if lo is None else min(lo, start)
+            hi = end if hi is None else max(hi, end)
+        # only redraw where the new spans show
+        for tl in self.timelines():
+            index_0, index_1 = self.days_window_of(tl)
+            if lo <= index_1 and hi >= index_0:
+                self.display(tl)
+    
+    def remove_span(self, key):
+        '''removes the span under ``key``.'''
+        start, end, color = self.spans.pop(key)
+        self.index.remove(start, key)
+        for tl, instrs in self._instructions.items():
+            instr = instrs.pop(key, None)
+            if instr is not None:
+                group = self.get_group(tl)
+                group.remove(instr[0])
+                group.remove(instr[1])
+        self.trigger_refresh()
+        
+    def spans_in(self, start, end):
+        '''gives the keys of the spans overlapping ``start`` to ``end``,
+        each either a datetime or a number of days since unix epoch.'''
+        return self.index.overlapping(self._index(start), self._index(end))
+    
+    def _recolor(self, *args):
+        for instrs in self._instructions.values():
+            for key, (color, rect) in instrs.items():
+                if self.spans[key][2] is None:
+                    color.rgba = self.color
+        
+    def clear(self, tl):
+        self._instructions.pop(tl, None)
+        super(SpanLayer, self).clear(tl)
+        
+    def display(self, tl):
+        group = self.get_group(tl)
+        instrs = self._instructions.setdefault(tl, {})
+        visible = self.index.overlapping(*self.days_window_of(tl))
+        to_pop = set(instrs)
+        vertical = tl.is_vertical()
+        cross = (tl.x if vertical else tl.y) + self.offset
+        thickness = self.thickness
+        lo_bound, hi_bound = (tl.y, tl.top) if vertical else (tl.x, tl.right)
+        index2pos = tl.index2pos
+        origin = index_of_micros(tl.origin)
+        spans = self.spans
+        for key in visible:
+            start, end, color = spans[key]
+            p0, p1 = index2pos(start - origin), index2pos(end - origin)
+            if p0 > p1:
+                p0, p1 = p1, p0
+            # keep the bars within the screen, give or take a pixel
+            p0 = max(p0, lo_bound - 1)
+            p1 = min(p1, hi_bound + 1)
+            if vertical:
+                pos, size = (cross, p0), (thickness, p1 - p0)
+            else:
+                pos, size = (p0, cross), (p1 - p0, thickness)
+            if key in instrs:
+                rect = instrs[key][1]
+                rect.pos = pos
+                rect.size = size
+                to_pop.remove(key)
+            else:
+                color_instr = Color(*(color or self.color))
+                rect = Rectangle(pos=pos, size=size)
+                group.add(color_instr)
+                group.add(rect)
+                instrs[key] = (color_instr, rect)
+        for key in to_pop:
+            color_instr, rect = instrs.pop(key)
+            group.remove(color_instr)
+            group.remove(rect)
+    
+    
+class TimeSeries(TimelineOverlay):
+    '''an overlay plotting a time series on a :class:`Timeline`. The 
+    series is stored as contiguous numpy arrays of timestamps and values,
+    summarized by a :class:`MinMaxPyramid`, so that each frame only ever 
+    draws about :attr:`points_per_pixel` points per pixel along the timeline,
+    whether the window spans one second or one year. Requires numpy.
+    
+    Values are plotted across the timeline: :attr:`value_min` at its left 
+    (or bottom, if horizontal) and :attr:`value_max` at its right (or top).
+    
+    Live samples can be pushed from any thread with :meth:`push` or 
+    :meth:`extend`. They are appended once per frame, and only the part 
+    of the plot they affect is redrawn. With :attr:`capacity` set, the 
+    oldest samples are dropped as new ones come in.
+    
+    :param timestamps: sorted seconds since unix epoch.
+    :param values: the values at ``timestamps``.
+    '''
+    
+    color = ListProperty([1, 1, 1, 1])
+    '''color of the plot.'''
+    
+    value_min = NumericProperty(0.)
+    '''value plotted at the left (or bottom) of the timeline.'''
+    
+    value_max = NumericProperty(1.)
+    '''value plotted at the right (or top) of the timeline.'''
+    
+    auto_range = BooleanProperty(False)
+    '''if True, :attr:`value_min` and :attr:`value_max` are ignored, and
+    the values shown are fit across the timeline.'''
+    
+    mode = OptionProperty('minmax', options=['minmax', 'mean'])
+    '''whether each pixel shows the minimum and maximum of the samples it
+    covers, or their mean.'''
+    
+    points_per_pixel = NumericProperty(2)
+    '''maximal number of points drawn per pixel along the timeline.'''
+    
+    capacity = NumericProperty(0)
+    '''maximal number of samples kept; when exceeded, the oldest samples
+    are dropped. 0 means no limit.'''
+    
+    def __init__(self, timestamps=(), values=(), **kw):
+        if import_numpy() is None:
+            raise ImportError('TimeSeries requires numpy')
+        super(TimeSeries, self).__init__(**kw)
+        self._graphics = {}
+        self._shown = {}
+        self.set_data(timestamps, values)
+        trigger = self.trigger_refresh
+        self.bind(color=trigger, value_min=trigger, value_max=trigger,
+                  auto_range=trigger, mode=trigger, points_per_pixel=trigger)
+        
+    @property
+    def timestamps(self):
+        '''the timestamps of the samples, in seconds since unix epoch.'''
+        return self._samples.views()[0]
+    
+    @property
+    def values(self):
+        '''the values of the samples.'''
+        return self._samples.views()[1]
+        
+    def set_data(self, timestamps, values):
+        '''replaces the data of this series, and rebuilds its
+        :class:`MinMaxPyramid`.'''
+        timestamps = numpy.ascontiguousarray(timestamps, dtype='float64')
+        values = numpy.ascontiguousarray(values, dtype='float64')
+        if len(timestamps) != len(values):
+            raise ValueError('timestamps and values differ in length')
+        self._samples = ColumnBuffer(('float64', 'float64'))
+        self._samples.append(timestamps, values)
+        self.pyramid = MinMaxPyramid(timestamps, values)
+        self._drop_excess()
+        self.trigger_refresh()
+        
+    def push(self, timestamp, value):
+        '''queues a sample for appending at the next frame. Safe to call 
+        from any thread.'''
+        self.enqueue(([timestamp], [value]))
+        
+    def extend(self, timestamps, values):
+        '''queues samples for appending at the next frame. Safe to call 
+        from any thread.'''
+        self.enqueue((timestamps, values))
+        
+    def ingest(self, items):
+        timestamps = numpy.concatenate(
+            [numpy.asarray(t, dtype='float64') for t, v in items])
+        values = numpy.concatenate(
+            [numpy.asarray(v, dtype='float64') for t, v in items])
+        if len(timestamps) != len(values):
+            raise ValueError('timestamps and values differ in length')
+        if not len(timestamps):
+            return
+        order = numpy.argsort(timestamps, kind='mergesort')
+        timestamps, values = timestamps[order], values[order]
+        old = self.timestamps
+        if len(old) and timestamps[0] < old[-1]:
+            # out of order: merge and summarize everything again
+            timestamps = numpy.concatenate((old, timestamps))
+            values = numpy.concatenate((self.values, values))
+            order = numpy.argsort(timestamps, kind='mergesort')
+            self.set_data(timestamps[order], values[order])
+            return
+        self._samples.append(timestamps, values)
+        self.pyramid.append(timestamps, values)
+        self._drop_excess()
+        for tl in self.timelines():
+            self.update_tail(tl, timestamps[0])
+            
+    def _drop_excess(self):
+        excess = len(self._samples) - int(self.capacity)
+        if self.capacity and excess > 0:
+            self._samples.drop_front(excess)
+            self.pyramid.drop_before(self.timestamps[0])
+        
+    def summary(self, start, end, columns):
+        '''summarizes the data between the ``start`` and ``end`` seconds 
+        into at most ``columns`` equal columns. Returns numpy arrays 
+        (times, mins, maxs, means), one entry per nonempty column; when the 
+        raw samples are sparse enough they are returned as is.'''
+        timestamps = self.timestamps
+        i0 = max(numpy.searchsorted(timestamps, start) - 1, 0)
+        i1 = numpy.searchsorted(timestamps, end, 'right') + 1
+        if i1 - i0 <= columns:
+            t = timestamps[i0:i1]
+            v = self.values[i0:i1]
+            return t, v, v, v
+        level = self.pyramid.level_for(start, end, columns * 8)
+        g, bucket_ids, mins, maxs, sums, counts = level
+        i0 = max(numpy.searchsorted(bucket_ids, 
+                                    MinMaxPyramid.bucket_ids(start, g)) - 1, 0)
+        i1 = numpy.searchsorted(bucket_ids, MinMaxPyramid.bucket_ids(end, g), 
+                                'right') + 1
+        t = (bucket_ids[i0:i1] + .5) * g
+        mins, maxs = mins[i0:i1], maxs[i0:i1]
+        sums, counts = sums[i0:i1], counts[i0:i1]
+        return MinMaxPyramid.regroup(t, mins, maxs, sums, counts, 
+                                     start, end, columns)
+    
+    def points(self, start, end, columns):
+        '''gives the (times, values) of the points plotted between the 
+        ``start`` and ``end`` seconds, over ``columns`` columns.'''
+        t, mins, maxs, means = self.summary(start, end, max(columns, 1))
+        if self.mode == 'mean' or mins is maxs:
+            return t, means
+        # zigzag through the minimum and maximum of each column
+        v = numpy.empty(2 * len(t))
+        v[0::2] = mins
+        v[1::2] = maxs
+        return numpy.repeat(t, 2), v
+    
+    def _get_graphics(self, tl):
+        graphics = self._graphics.get(tl)
+        if graphics is None:
+            group = self.get_group(tl)
+            color = Color(*self.color)
+            mesh = Mesh(mode='line_strip')
+            group.add(color)
+            group.add(mesh)
+            graphics = self._graphics[tl] = [color, mesh, 
+                                             numpy.zeros(0, dtype='float32'),
+                                             numpy.zeros(0, dtype='uint16')]
+        return graphics
+    
+    def clear(self, tl):
+        self._graphics.pop(tl, None)
+        self._shown.pop(tl, None)
+        super(TimeSeries, self).clear(tl)
+        
+    def _columns(self, tl):
+        length = tl.height if tl.is_vertical() else tl.width
+        # the window spans twice the screen, and each column gives 2 points
+        # (its minimum and maximum) unless only means are shown
+        columns = int(length * self.points_per_pixel)
+        if self.mode == 'mean':
+            columns *= 2
+        return max(columns, 1)
+    
+    def display(self, tl):
+        graphics = self._get_graphics(tl)
+        graphics[0].rgba = self.color
+        start, end = self.window_of(tl)
+        columns = self._columns(tl)
+        t, v = self.points(start, end, columns)
+        self._write(tl, t, v, 0)
+        self._shown[tl] = (start, end, columns, t, v)
+        
+    def update_tail(self, tl, since):
+        '''redraws the plot on ``tl`` from the column containing ``since``
+        seconds on, if the window of ``tl`` hasn't changed since it was
+        last drawn. Otherwise, redraws all of it.'''
+        start, end = self.window_of(tl)
+        shown = self._shown.get(tl)
+        if shown is None or shown[:3] != (start, end, self._columns(tl)) \
+                or self.auto_range:
+            self.display(tl)
+            return
+        if since > end:
+            return
+        columns, t, v = shown[2:]
+        width = (end - start) / float(columns)
+        col = max(int((since - start) // width), 0)
+        cut = start + col * width
+        keep = numpy.searchsorted(t, cut)
+        new_t, new_v = self.points(cut, end, columns - col)
+        later = new_t >= cut
+        t = numpy.concatenate((t[:keep], new_t[later]))
+        v = numpy.concatenate((v[:keep], new_v[later]))
+        self._write(tl, t, v, keep)
+        self._shown[tl] = (start, end, columns, t, v)
+        
+    def _write(self, tl, t, v, first):
+        '''writes the vertices of the points (``t``, ``v``) from the 
+        ``first`` on; those before are assumed unchanged.'''
+        graphics = self._graphics[tl]
+        mesh = graphics[1]
+        n = min(len(t), 65535)
+        if n < 2:
+            mesh.indices = []
+            return
+        if self.auto_range:
+            value_min, value_max = v[:n].min(), v[:n].max()
+        else:
+            value_min, value_max = self.value_min, self.value_max
+        if tl.is_vertical():
+            cross_start, cross_length, a, b = tl.x, tl.width, 1, 0
+        else:
+            cross_start, cross_length, a, b = tl.y, tl.height, 0, 1
+        span = float(value_max - value_min) or 1.
+        if len(graphics[2]) < 4 * n:
+            size = min(max(n, 2 * len(graphics[2]) // 4), 65535)
+            new = numpy.zeros(4 * size, dtype='float32')
+            new[:len(graphics[2])] = graphics[2]
+            graphics[2] = new
+            graphics[3] = numpy.arange(size, dtype='uint16')
+        first = min(first, n)
+        vertices = graphics[2][:4 * n].reshape(n, 4)[first:]
+        vertices[:, a] = self.positions_of(tl, t[first:n])
+        vertices[:, b] = cross_start + (v[first:n] - value_min) / span * \
+                            cross_length
+        mesh.vertices = graphics[2][:4 * n]
+        mesh.indices = graphics[3][:n]
+    
+    
+class StoredTimeSeries(TimeSeries):
+    '''a :class:`TimeSeries` plotting a :class:`TimeSeriesStore`, so that
+    series larger than memory can be shown. Each frame only reads the 
+    blocks of the store overlapping the window of the timeline, or only 
+    its block index when the window holds too many samples to draw. Unlike
+    other :class:`TimeSeries`, the window isn't padded by half its length
+    on each side, but by a step of the densest tick shown, as by 
+    :meth:`TimeTick.time_min_max` when ``extended``: pans then read little 
+    more than the pages shown. Requires numpy.
+    
+    Stores are read-only: :meth:`push` and :meth:`extend` raise TypeError.
+    
+    :param store: a :class:`TimeSeriesStore`, or the path of one.
+    '''
+    
+    store = ObjectProperty(None, allownone=True)
+    '''the :class:`TimeSeriesStore` plotted.'''
+    
+    def __init__(self, store=None, **kw):
+        super(StoredTimeSeries, self).__init__(**kw)
+        self.bind(store=self.trigger_refresh)
+        if store is not None and not isinstance(store, TimeSeriesStore):
+            store = TimeSeriesStore(store)
+        self.store = store
+        
+    def push(self, timestamp, value):
+        '''raises TypeError: stores are read-only.'''
+        raise TypeError('StoredTimeSeries is read-only')
+    
+    def extend(self, timestamps, values):
+        '''raises TypeError: stores are read-only.'''
+        raise TypeError('StoredTimeSeries is read-only')
+        
+    def ingest(self, items):
+        raise TypeError('StoredTimeSeries is read-only')
+    
+    @staticmethod
+    def window_of(tl, extended=True):
+        '''gives the window of ``tl`` as (min, max) seconds since unix 
+        epoch. If ``extended``, the window given by 
+        :meth:`TimeTick.time_min_max` when ``extended``, a step of the 
+        densest tick beyond it on each side.'''
+        tick = tl.densest_tick
+        if not extended or not isinstance(tick, TimeTick):
+            return TimelineOverlay.window_of(tl, extended=False)
+        return tuple(micros_of(t) / float(micros_per_second) 
+                     for t in tick.time_min_max(tl, extended=True))
+    
+    def _columns(self, tl):
+        # as many columns per pixel as the other series, whose window 
+        # spans twice the screen
+        columns = super(StoredTimeSeries, self)._columns(tl)
+        start, end = self.window_of(tl)
+        shown_start, shown_end = self.window_of(tl, extended=False)
+        if shown_end <= shown_start:
+            return columns
+        ratio = (end - start) / (2. * (shown_end - shown_start))
+        return max(int(ceil(columns * ratio)), 1)
+        
+    def summary(self, start, end, columns):
+        store = self.store
+        if store is None:
+            return super(StoredTimeSeries, self).summary(start, end, columns)
+        return store.summary(start, end, columns)
+    
+    
+class DataSource(object):
+    '''the protocol of sources of samples fetched asynchronously, such as
+    remote databases, for :class:`SourcedTimeSeries`.
+    
+    :meth:`fetch` must return at once a future of the samples, such as a 
+    :class:`concurrent.futures.Future` or an :class:`asyncio.Future`: an
+    object with ``add_done_callback``, ``cancel``, ``cancelled``, 
+    ``exception`` and ``result`` methods. Its callbacks may be called from
+    any thread.
+    '''
+    
+    def fetch(self, start, end, resolution):
+        '''returns a future of the samples between the ``start`` and ``end``
+        seconds since unix epoch, as a pair (timestamps, values). 
+        ``resolution`` is the spacing in seconds of the samples wanted; 
+        sources may return finer or coarser samples.'''
+        raise NotImplementedError
+    
     
+class SimulatedSource(DataSource):
+    '''an in-process :class:`DataSource` standing in for a remote one, to
+    try out :class:`SourcedTimeSeries` without one: samples are computed by
+    ``func(start, end, resolution)`` in worker threads, after sleeping 
+    ``latency`` seconds. Requires numpy and :mod:`concurrent.futures`.
+    
+    :param func: gives the samples (timestamps, values) of a range. 
+        Defaults to :meth:`wave`.
+    :param latency: the delay of each fetch, in seconds. Defaults to 
+        100 milliseconds.
+    :param workers: the number of fetches served at once. Defaults to 2.
+    '''
+    
+    def __init__(self, func=None, latency=.1, workers=2):
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+        except ImportError:
+            ThreadPoolExecutor = None
+        if import_numpy() is None or ThreadPoolExecutor is None:
+            raise ImportError('SimulatedSource requires numpy and '
+                              'concurrent.futures')
+        self.func = func or self.wave
+        self.latency = latency
+        self.executor = ThreadPoolExecutor(workers)
+        self.fetches = 0
+        
+    def fetch(self, start, end, resolution):
+        self.fetches += 1
+        return self.executor.submit(self._fetch, start, end, resolution)
+    
+    def _fetch(self, start, end, resolution):
+        sleep(self.latency)
+        return self.func(start, end, resolution)
+    
+    @staticmethod
+    def wave(start, end, resolution):
+        '''samples a sine wave of a period of a day every ``resolution`` 
+        seconds between ``start`` and ``end``.'''
+        t = numpy.arange(ceil(start / resolution), 
+                         floor(end / resolution) + 1) * resolution
+        return t, numpy.sin(t * (2 * numpy.pi / 86400))
+    
+    
+class SourcedTimeSeries(TimeSeries):
+    '''a :class:`TimeSeries` plotting samples fetched asynchronously from
+    a :class:`DataSource`, so that slow sources don't hold up frames. 
+    Requires numpy.
+    
+    Whenever the window of a timeline changes, the parts of 
+    :meth:`~TimelineOverlay.window_of` not yet cached are fetched, in 
+    blocks of :attr:`fetch_block` samples at a resolution given by the 
+    densest :class:`TimeTick` shown (see :meth:`resolution_of`). Blocks
+    already being fetched, for this or another timeline, aren't fetched 
+    again, and those the windows moved away from are cancelled. Meanwhile,
+    what's cached is shown; fetched samples are cached by resolution, 
+    in :class:`RangeCache`s, and drawn at the next frame.
+    
+    Samples can't be pushed to this series.
+    
+    :param source: the :class:`DataSource`.
+    '''
+    
+    source = ObjectProperty(None, allownone=True)
+    '''the :class:`DataSource` samples are fetched from.'''
+    
+    fetch_block = NumericProperty(256)
+    '''the number of samples, at the resolution wanted, of each fetch. Ranges
+    are fetched in blocks aligned to this size, so that neighbouring
+    windows share their fetches.'''
+    
+    cache_limit = NumericProperty(1000000)
+    '''the maximal number of samples cached for each resolution. When 
+    exceeded, the samples outside of the windows shown are dropped.'''
+    
+    cached_resolutions = NumericProperty(4)
+    '''the maximal number of resolutions cached. When exceeded, the samples
+    of the least recently wanted resolution are dropped.'''
+    
+    def __init__(self, source=None, **kw):
+        super(SourcedTimeSeries, self).__init__(**kw)
+        self._caches = OrderedDict()
+        self._fetching = {}
+        self._wanted = {}
+        self.bind(source=self._on_source)
+        self.source = source
+        
+    def _on_source(self, *args):
+        self._wanted.clear()
+        self.cancel_fetches()
+        self._caches.clear()
+        self.trigger_refresh()
+        
+    def resolution_of(self, tl):
+        '''gives the resolution in seconds of the samples fetched for ``tl``:
+        the granularity of its densest tick shown or, if there's none, the 
+        length of a column of the plot, rounded up to a power of 2.'''
+        tick = tl.densest_tick
+        if isinstance(tick, TimeTick):
+            return TimeTick.granularity(tick.mode)
+        start, end = self.window_of(tl, extended=False)
+        column = (end - start) / self._columns(tl)
+        return 2. ** ceil(log(column, 2)) if column > 0 else 1.
+    
+    def _cache_of(self, resolution):
+        caches = self._caches
+        cache = caches.pop(resolution, None)
+        if cache is None:
+            cache = RangeCache()
+        caches[resolution] = cache
+        while len(caches) > max(self.cached_resolutions, 1):
+            caches.popitem(last=False)
+        return cache
+    
+    def fetch(self, tl):
+        '''fetches the blocks of the window of ``tl`` that aren't cached or 
+        being fetched, and cancels the fetches no window wants anymore.'''
+        source = self.source
+        if source is None:
+            return
+        start, end = self.window_of(tl)
+        resolution = self.resolution_of(tl)
+        self._wanted[tl] = (resolution, start, end)
+        self._cancel_unwanted()
+        cache = self._cache_of(resolution)
+        block = resolution * self.fetch_block
+        fetching = self._fetching
+        # only the blocks of the gaps in the cache, whose blocks aren't 
+        # wholly cached
+        for gap_start, gap_end in cache.missing(start, end):
+            for k in range(int(floor(gap_start / block)), 
+                           int(ceil(gap_end / block))):
+                key = (resolution, k)
+                if key in fetching:
+                    continue
+                block_start, block_end = k * block, (k + 1) * block
+                future = source.fetch(block_start, block_end, resolution)
+                fetching[key] = (block_start, block_end, future)
+                future.add_done_callback(
+                    partial(self._fetched, key, block_start, block_end))
+            
+    def _fetched(self, key, start, end, future):
+        # possibly in another thread
+        self.enqueue((key, start, end, future))
+        
+    def _cancel_unwanted(self):
+        wanted = list(self._wanted.values())
+        fetching = self._fetching
+        for key, (start, end, future) in list(fetching.items()):
+            if not any(resolution == key[0] and start < w_end 
+                       and end > w_start 
+                       for resolution, w_start, w_end in wanted):
+                future.cancel()
+                del fetching[key]
+                
+    def cancel_fetches(self):
+        '''cancels all fetches under way.'''
+        for start, end, future in self._fetching.values():
+            future.cancel()
+        self._fetching.clear()
+                
+    def ingest(self, items):
+        for key, start, end, future in items:
+            fetching = self._fetching.get(key)
+            if fetching is not None and fetching[2] is future:
+                del self._fetching[key]
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                Logger.warning('Timeline: fetching %s to %s failed: %r' 
+                               % (start, end, error))
+                continue
+            if key[0] not in self._caches:
+                # the resolution was dropped meanwhile
+                continue
+            timestamps, values = future.result()
+            self._caches[key[0]].add(start, end, timestamps, values)
+        for resolution, cache in self._caches.items():
+            if len(cache) > self.cache_limit:
+                windows = [w for w in self._wanted.values() 
+                           if w[0] == resolution]
+                if windows:
+                    cache.keep(min(w[1] for w in windows), 
+                               max(w[2] for w in windows))
+                else:
+                    cache.keep(0, 0)
+        self.trigger_refresh()
+        
+    def summary(self, start, end, columns):
+        caches = self._caches
+        if not caches:
+            empty = numpy.zeros(0)
+            return empty, empty, empty, empty
+        # the finest samples covering the window, or else the latest wanted
+        covering = [r for r, cache in caches.items() 
+                    if cache.covers(start, end)]
+        resolution = min(covering) if covering else next(reversed(caches))
+        t, v = caches[resolution].samples(start, end)
+        if len(t) <= columns:
+            return t, v, v, v
+        return MinMaxPyramid.regroup(t, v, v, v, 
+                                     numpy.ones(len(v), dtype='int64'),
+                                     start, end, columns)
+    
+    def display(self, tl):
+        self.fetch(tl)
+        super(SourcedTimeSeries, self).display(tl)
+        
+    def clear(self, tl):
+        self._wanted.pop(tl, None)
+        self._cancel_unwanted()
+        super(SourcedTimeSeries, self).clear(tl)
+    
+    
+class _Viewport(object):
+    # a window of a timeline, other than its current one, for
+    # TimeTick.index_range and TimeTick.micros_iter. Its densest_tick is 
+    # None if the timeline shows no tick, in which case it has no ticks to
+    # iterate.
+    
+    __slots__ = ('index_0', 'index_1', 'backward', 'densest_tick', 'scale')
+    
+    def __init__(self, tl, index_0, index_1):
+        self.index_0 = index_0
+        self.index_1 = index_1
+        self.backward = tl.backward
+        self.scale = tl.scale * abs(tl.index_1 - tl.index_0) / \
+                     (abs(index_1 - index_0) or 1e-9)
+        candidates = [t for t in tl.ticks 
+                      if t.scale(self.scale) >= t.min_space]
+        self.densest_tick = max(candidates, key=lambda t: t.scale_factor) \
+                            if candidates else tl.densest_tick
+                            
+_setting_names = {}
+
+def _settings_of(obj, base, skip=()):
+    # the values of the kivy properties of obj that its class adds to 
+    # base, except computed ones and those in skip, as sorted (name, value)
+    # pairs, with lists as tuples
+    key = (type(obj), base, skip)
+    names = _setting_names.get(key)
+    if names is None:
+        cls = type(obj)
+        names = _setting_names[key] = [
+            name for name in sorted(dir(cls)) 
+            if isinstance(getattr(cls, name, None), Property) and 
+            not isinstance(getattr(cls, name), 
+                           (AliasProperty, ReferenceListProperty)) and
+            not hasattr(base, name) and name not in skip]
+    settings = []
+    for name in names:
+        value = getattr(obj, name)
+        if isinstance(value, list):
+            value = tuple(value)
+        settings.append((name, value))
+    return tuple(settings)
+
+class TimelineTiles(object):
+    '''renders the ticks and labels of a :class:`Timeline` into tiles 
+    spanning a fixed length of time, each drawn once into an
+    :class:`~kivy.graphics.fbo.Fbo`, so that a pan only moves the tiles on
+    screen and renders those entering it. See :attr:`Timeline.tiled`.
+    
+    Tiles are keyed by the scale and their position in time, and kept in
+    least recently used order within :attr:`memory`. They're all dropped 
+    when the look of the timeline changes: its size across, orientation, 
+    timezone, origin, ticks or labeller settings. The tiles are rendered 
+    by a private :class:`Timeline` with copies of the ticks, of the same 
+    classes and with the same properties, and a labeller with the same 
+    settings, except that its date labels stay at their ticks (see 
+    :attr:`TimeLabeller.push_dates`) and that labels are never left to
+    :attr:`TimeLabeller.async_labels`, as a tile is rendered once.
+    
+    :param timeline: the :class:`Timeline` drawn.
+    :param tile_size: the length of a tile, in pixels. Defaults to 256.
+    :param memory: the maximal size, in bytes, of the tiles kept. Tiles 
+        on screen are never evicted. Defaults to 32 MiB.
+    :param margin: how far, in pixels, beyond its tile the ticks and 
+        labels overlapping a tile are looked for. Defaults to 64.
+    '''
+    
+    def __init__(self, timeline, tile_size=256, memory=32 * 2 ** 20,
+                 margin=64):
+        self.timeline = timeline
+        self.tile_size = tile_size
+        self.memory = memory
+        self.margin = margin
+        self.used = 0
+        self.rendered = 0
+        self._tiles = OrderedDict()
+        self._look = None
+        self._renderer = None
+        self._rects = {}
+        self._group = None
+        
+    def __len__(self):
+        return len(self._tiles)
+        
+    def look_of(self, tl):
+        '''gives what the tiles of ``tl`` depend on, besides time and 
+        scale.'''
+        cross = tl.width if tl.is_vertical() else tl.height
+        ticks = tuple((type(tick),) + _settings_of(tick, Widget) 
+                      for tick in tl.ticks)
+        return (tl.orientation, tl.backward, cross, tl.tz, tl.origin, 
+                tl.line_offset, tl.tick_label_padding, ticks, 
+                type(tl.labeller), 
+                _settings_of(tl.labeller, TickLabeller, 
+                             self.labeller_state), 
+                Metrics.dpi)
+    
+    labeller_state = ('cache_hits', 'cache_misses', 'texture_cache', 
+                      'texture_cache_size', 'rasterizer')
+    '''the properties of :class:`TimeLabeller` that aren't settings: they 
+    aren't copied to the renderer, and don't change the look of the 
+    tiles.'''
+        
+    def _make_renderer(self):
+        tl = self.timeline
+        ticks = [type(tick)(**dict((name, getattr(tick, name)) for name, _ 
+                                   in _settings_of(tick, Widget)))
+                 for tick in tl.ticks]
+        renderer = Timeline(ticks=ticks, tz=tl.tz, auto_origin=False,
+                            orientation=tl.orientation, backward=tl.backward,
+                            line_offset=tl.line_offset,
+                            tick_label_padding=tl.tick_label_padding,
+                            labeller_cls=type(tl.labeller))
+        renderer.origin = tl.origin
+        lab, labeller = renderer.labeller, tl.labeller
+        for name, _ in _settings_of(labeller, TickLabeller, 
+                                    self.labeller_state):
+            setattr(lab, name, getattr(labeller, name))
+        lab.texture_cache = labeller.texture_cache
+        lab.push_dates = False
+        lab.async_labels = False
+        return renderer
+    
+    def clear(self):
+        '''drops all tiles, and removes them from the screen.'''
+        self._tiles.clear()
+        self.used = 0
+        if self._group is not None:
+            self.timeline.canvas.remove(self._group)
+        self._group = None
+        self._rects = {}
+        
+    def draw(self):
+        '''draws the tiles in view, rendering those missing.'''
+        tl = self.timeline
+        look = self.look_of(tl)
+        if look != self._look:
+            self.clear()
+            self._look = look
+            self._renderer = self._make_renderer()
+        if self._group is None:
+            self._group = InstructionGroup()
+            self._group.add(Color(1, 1, 1, 1))
+            tl.canvas.add(self._group)
+        # a key robust to the rounding errors of panning
+        scale = float('%.9g' % tl.scale)
+        length = self.tile_size / scale
+        index_0, index_1 = sorted((tl.index_0, tl.index_1))
+        visible = range(int(floor(index_0 / length)), 
+                        int(floor(index_1 / length)) + 1)
+        rects, group = self._rects, self._group
+        for n in list(rects):
+            if n not in visible:
+                group.remove(rects.pop(n))
+        tiles = self._tiles
+        vertical = tl.is_vertical()
+        for n in visible:
+            key = (scale, n)
+            fbo = tiles.pop(key, None)
+            if fbo is None:
+                fbo = self._render(n, scale)
+                self.used += fbo.size[0] * fbo.size[1] * 8
+            tiles[key] = fbo
+            # the bottom or left of the tile on screen
+            start = min(tl.index2pos(n * length), 
+                        tl.index2pos((n + 1) * length))
+            along = length * tl.scale
+            pos = (tl.x, start) if vertical else (start, tl.y)
+            size = (tl.width, along) if vertical else (along, tl.height)
+            rect = rects.get(n)
+            if rect is None:
+                rect = rects[n] = Rectangle()
+                group.add(rect)
+            rect.texture = fbo.texture
+            rect.pos = pos
+            rect.size = size
+        in_view = set((scale, n) for n in visible)
+        for key in list(tiles):
+            if self.used <= self.memory:
+                break
+            if key not in in_view:
+                fbo = tiles.pop(key)
+                self.used -= fbo.size[0] * fbo.size[1] * 8
+                
+    def _render(self, n, scale):
+        # renders tile n at scale into a new fbo
+        tl, renderer = self.timeline, self._renderer
+        tile_size, margin = self.tile_size, self.margin
+        length = tile_size / scale
+        start, end = n * length, (n + 1) * length
+        pad = margin / scale
+        cross = tl.width if tl.is_vertical() else tl.height
+        if tl.is_vertical():
+            size = (cross, tile_size)
+            renderer.pos = (0, -margin)
+            renderer.size = (cross, tile_size + 2 * margin)
+        else:
+            size = (tile_size, cross)
+            renderer.pos = (-margin, 0)
+            renderer.size = (tile_size + 2 * margin, cross)
+        if tl.backward:
+            renderer.index_0, renderer.index_1 = end + pad, start - pad
+        else:
+            renderer.index_0, renderer.index_1 = start - pad, end + pad
+        renderer.redraw()
+        from kivy.graphics.fbo import Fbo
+        from kivy.graphics.gl_instructions import ClearBuffers, ClearColor
+        fbo = Fbo(size=(int(ceil(size[0])), int(ceil(size[1]))),
+                  with_stencilbuffer=True)
+        with fbo:
+            ClearColor(0, 0, 0, 0)
+            ClearBuffers()
+        fbo.add(renderer.canvas)
+        fbo.draw()
+        fbo.remove(renderer.canvas)
+        # it's drawn already
+        for trigger in (renderer.trigger_redraw, renderer._trigger_overlays,
+                        renderer._trigger_origin, renderer._trigger_prefetch):
+            trigger.cancel()
+        self.rendered += 1
+        return fbo
+
 class Timeline(Tickline):
     '''subclass of :class:`Tickline` specialized for displaying time 
     information. See module documentation for more details.'''
     
     labeller_cls = ObjectProperty(TimeLabeller)
     
-    tz = ObjectProperty(get_localzone())
+    tz = ObjectProperty(None)
+    '''the timezone of the timeline, a pytz timezone, pushed to its ticks.
+    Defaults to the local zone, see :func:`local_zone`.'''
+    
+    overlays = ListProperty([])
+    '''list of :class:`TimelineOverlay`s, such as :class:`TimeSeries`, drawn 
+    over the ticks, in order.'''
+    
+    follow_now = BooleanProperty(False)
+    '''if True, the window advances with the current time, keeping it at 
+    :attr:`follow_ratio` of the way from :attr:`index_0` to 
+    :attr:`index_1`. Touching the timeline stops following.'''
+    
+    follow_ratio = NumericProperty(.9)
+    '''where the current time is kept when :attr:`follow_now` is True.'''
+    
+    profiling = BooleanProperty(False)
+    '''if True, counts and timings of each redraw are recorded into
+    :attr:`frame_stats` and :attr:`stats_history`. Costs next to nothing
+    when False.'''
+    
+    profile_size = NumericProperty(120)
+    '''the number of redraws kept in :attr:`stats_history`.'''
+    
+    frame_stats = ObjectProperty(None, allownone=True)
+    '''the stats of the last redraw, when :attr:`profiling`, as a dict of
+    
+        - ``time``: when the redraw started, as seconds since unix epoch
+        - ``duration``: seconds from the labeller's ``re_init`` to the end 
+          of its ``make_labels``
+        - ``ticks``: a dict of (number of ticks, seconds spent iterating 
+          and drawing them) by :attr:`TimeTick.mode`
+        - ``labels_registered``, ``labels_created``, ``labels_reused``,
+          ``labels_removed`` and ``labels_culled``: label counts of 
+          :class:`TimeLabeller`. Created and removed labels are also the 
+          canvas instructions added and removed; culled labels are those 
+          left out for overlapping others (see 
+          :attr:`TimeLabeller.cull_labels`).
+        - ``textures``, ``texture_time``: the number of label textures 
+          rasterized, and the seconds it took
+        - ``overlays``: seconds spent drawing :attr:`overlays` since the 
+          last redraw
+        - ``lod``: the :attr:`lod` of the redraw
+    
+    Bind to it to log or show the stats of each redraw.'''
+    
+    follow_step = NumericProperty(1)
+    '''the minimal distance, in pixels, the window is advanced by when 
+    following the current time, so that it isn't redrawn for changes
+    too small to see.'''
+    
+    origin = NumericProperty(0)
+    '''the time, in microseconds since unix epoch, of the global index 0:
+    indices are the (float) number of days since :attr:`origin`. Near their
+    origin, indices are exact to well below a microsecond, while at the 
+    default, the unix epoch, they get too coarse for sub-second 
+    :attr:`TimeTick.mode`s. Changing it shifts :attr:`index_0`, 
+    :attr:`index_1`, :attr:`min_index` and :attr:`max_index`, so that the
+    same times stay on screen, and is pushed to the :class:`TimeTick`s.
+    See :attr:`auto_origin`.'''
+    
+    prefetch = BooleanProperty(False)
+    '''if True, the labels about to enter the window are prepared ahead 
+    of time (see :meth:`TimeLabeller.prefetch`), during the frames of a 
+    pan or a zoom. Where the window is going is extrapolated from how it 
+    moved since the last frame, :attr:`prefetch_lookahead` seconds ahead.
+    '''
+    
+    prefetch_lookahead = NumericProperty(.5)
+    '''how far ahead, in seconds of the current motion, labels are 
+    prefetched. The extrapolated window never moves more than a window 
+    width, nor zooms more than twice, away from the current one.'''
+    
+    prefetch_limit = NumericProperty(64)
+    '''the maximal number of labels prefetched for a motion, and at most 
+    half the capacity of the texture cache, so that prefetching never 
+    evicts the labels on screen.'''
+    
+    prefetch_budget = NumericProperty(.002)
+    '''the time, in seconds, prefetching may take per frame. The rest 
+    waits for the next frame.'''
+    
+    frame_budget = NumericProperty(0)
+    '''the time, in seconds, a redraw should take at most. When one takes 
+    longer, :attr:`lod` is raised for the next ones, until the window 
+    stops moving for :attr:`refine_delay` seconds, when it's redrawn in 
+    full. Defaults to 0, never lowering the level of detail.'''
+    
+    lod = NumericProperty(0)
+    '''the current level of detail, lowered when redraws exceed 
+    :attr:`frame_budget`: 0 is the full detail; from 1, labels not yet 
+    rasterized are rasterized off the frame, as with 
+    :attr:`TimeLabeller.async_labels`; from 2, the ``lod - 1`` densest 
+    ticks shown are dropped, the coarsest tick labelled on screen, and
+    those coarser, always staying.'''
+    
+    refine_delay = NumericProperty(.2)
+    '''the time, in seconds, the window has to stay still before it's 
+    redrawn in full detail.'''
+    
+    tiled = BooleanProperty(False)
+    '''if True, the ticks and labels are rendered into tiles of 
+    :attr:`tile_size` pixels, which a pan only has to move, by a
+    :class:`TimelineTiles`. The date labels then stay at their ticks.'''
+    
+    tile_size = NumericProperty(256)
+    '''the length, in pixels, of the tiles when :attr:`tiled`.'''
+    
+    tile_memory = NumericProperty(32 * 2 ** 20)
+    '''the maximal size, in bytes, of the tiles kept when :attr:`tiled`.
+    '''
+    
+    group = ObjectProperty(None, allownone=True)
+    '''the :class:`TimelineGroup` this timeline is synchronized with, if 
+    any. Set by :meth:`TimelineGroup.add` and 
+    :meth:`TimelineGroup.remove`.'''
+    
+    auto_origin = BooleanProperty(True)
+    '''if True, :attr:`origin` is moved to the center of the window, 
+    between frames, whenever the window gets narrower than 
+    ``2 ** -32`` of its distance to the origin, i.e. when zooming in 
+    below about a second. Code keeping indices across frames should then
+    keep times instead (see :meth:`index_of` and :meth:`datetime_of`).'''
     
     def get_min_time(self, *args):
         return self.datetime_of(self.min_index)
@@ -663,7 +4463,7 @@ class Timeline(Tickline):
     def get_time_0(self, *args):
         return self.datetime_of(self.index_0)
     def set_time_0(self, val):
-        self.index_0 = self.datetime_of(val)
+        self.index_0 = self.index_of(val)
     time_0 = AliasProperty(get_time_0, set_time_0,
                            bind=['index_0'])  
     '''gives the time that that sits on top of
@@ -676,7 +4476,7 @@ class Timeline(Tickline):
     def get_time_1(self, *args):
         return self.datetime_of(self.index_1)
     def set_time_1(self, val):
-        self.index_1 = self.datetime_of(val)
+        self.index_1 = self.index_of(val)
     time_1 = AliasProperty(get_time_1, set_time_1,
                            bind=['index_1'])  
     '''gives the time that that sits on top of
@@ -687,23 +4487,287 @@ class Timeline(Tickline):
     This is the time version of :class:`Tickline.index_1`.'''       
 
     def __init__(self, **kw):
+        self._offsets = None
+        self._origin = 0
+        self._dropped = ()
+        self._refining = False
+        self._tiles = None
+        self._frame_stats = None
+        self._overlay_time = 0.
+        # the stats of the last profile_size redraws, oldest first
+        self.stats_history = deque(maxlen=120)
+        # set first: the other properties, e.g. origin, push it to the ticks
+        self.tz = kw.pop('tz', None) or local_zone()
         now = local_now().astimezone(UTC)
         self.center_on_timeframe(now - timedelta(days=1),
                                  now + timedelta(days=1))
         self.ticks = selected_time_ticks()
         super(Timeline, self).__init__(**kw)
+        self._displayed_ticks = list(self.ticks)
+        self.bind(ticks=self._clear_removed_batches)
+        self.bind(ticks=self._push_to_ticks)
+        self._push_to_ticks()
+        self._trigger_origin = Clock.create_trigger(self._check_origin)
+        # (time, origin, index_0, index_1) at the last prefetch check
+        self._motion = None
+        self._prefetch_jobs = iter(())
+        # labels prepared since the motion last changed, within 
+        # prefetch_limit
+        self._prefetch_done = 0
+        self._trigger_prefetch = Clock.create_trigger(self._predict)
+        self.bind(index_0=self._trigger_prefetch, 
+                  index_1=self._trigger_prefetch)
+        self.bind(index_0=self._trigger_origin, index_1=self._trigger_origin,
+                  auto_origin=self._trigger_origin)
+        self._displayed_overlays = []
+        self._trigger_overlays = Clock.create_trigger(self.draw_overlays)
+        self.bind(index_0=self._trigger_overlays, 
+                  index_1=self._trigger_overlays, 
+                  size=self._trigger_overlays, pos=self._trigger_overlays,
+                  orientation=self._trigger_overlays,
+                  backward=self._trigger_overlays,
+                  overlays=self._trigger_overlays)
+        self._trigger_overlays()
+    def _clear_removed_batches(self, *args):
+        for tick in self._displayed_ticks:
+            if tick not in self.ticks and isinstance(tick, TimeTick):
+                tick.clear_batch(self)
+        self._displayed_ticks = list(self.ticks)
+    def on_follow_now(self, *args):
+        if self.follow_now:
+            Clock.schedule_interval(self._follow, 0)
+            self._follow()
+        else:
+            Clock.unschedule(self._follow)
+    def _follow(self, *args):
+        now = self.index_of_micros(micros_of_seconds(unix_time()))
+        index_0, index_1 = self.index_0, self.index_1
+        shift = now - (index_0 + self.follow_ratio * (index_1 - index_0))
+        if abs(shift) * self.scale < self.follow_step:
+            return
+        self.index_0 = index_0 + shift
+        self.index_1 = index_1 + shift
+    def on_touch_down(self, touch):
+        if self.follow_now and self.collide_point(*touch.pos):
+            self.follow_now = False
+        return super(Timeline, self).on_touch_down(touch)
+    def draw_overlays(self, *args):
+        '''displays each of :attr:`overlays`, and clears those removed 
+        since the last call.'''
+        if self.profiling:
+            start = default_timer()
+        for overlay in self._displayed_overlays:
+            if overlay not in self.overlays:
+                overlay.clear(self)
+        for overlay in self.overlays:
+            overlay.display(self)
+        self._displayed_overlays = list(self.overlays)
+        if self.profiling:
+            self._overlay_time += default_timer() - start
+    def on_profile_size(self, *args):
+        self.stats_history = deque(self.stats_history, 
+                                   maxlen=int(self.profile_size))
+    def on_profiling(self, *args):
+        if not self.profiling:
+            self._frame_stats = None
+    def start_frame_stats(self):
+        '''starts recording the stats of a redraw. Called by 
+        :meth:`TimeLabeller.re_init` when :attr:`profiling`.'''
+        self._frame_stats = {'time': unix_time(), 'start': default_timer(),
+                             'ticks': {}, 'texture_time': 0., 'lod': self.lod,
+                             'textures': self.labeller.cache_misses}
+    def finish_frame_stats(self):
+        '''finishes recording the stats of a redraw, and publishes them to
+        :attr:`frame_stats` and :attr:`stats_history`. Called at the end of
+        :meth:`TimeLabeller.make_labels`.'''
+        stats = self._frame_stats
+        if stats is None:
+            return
+        self._frame_stats = None
+        stats['duration'] = default_timer() - stats.pop('start')
+        stats['textures'] = self.labeller.cache_misses - stats['textures']
+        stats['overlays'] = self._overlay_time
+        self._overlay_time = 0.
+        self.stats_history.append(stats)
+        self.frame_stats = stats
     def on_tz(self, *args):
+        self._offsets = None
+        self._push_to_ticks()
+    def on_origin(self, *args):
+        shift = index_of_micros(self.origin, origin=self._origin)
+        self._origin = self.origin
+        self._push_to_ticks()
+        self.index_0 -= shift
+        self.index_1 -= shift
+        self.min_index -= shift
+        self.max_index -= shift
+    def redraw(self, *args):
+        '''Overrides :meth:`Tickline.redraw` to keep it within 
+        :attr:`frame_budget`, see :attr:`lod`.'''
+        if self.lod > 1:
+            shown = sorted((tick for tick in self.ticks 
+                            if isinstance(tick, TimeTick) and
+                            tick.scale(self.scale) >= tick.min_space),
+                           key=lambda tick: tick.scale_factor, reverse=True)
+            # keep the coarsest tick labelled and on screen, so that 
+            # labels stay
+            length = self.height if self.is_vertical() else self.width
+            labelled = [i for i, tick in enumerate(shown) 
+                        if tick.min_label_space <= tick.scale(self.scale) 
+                        <= length]
+            kept = labelled[-1] if labelled else len(shown) - 1
+            self._dropped = shown[:min(int(self.lod) - 1, kept)]
+        else:
+            self._dropped = ()
+        start = default_timer()
+        # when tiled, ticks don't show and labels leave
+        super(Timeline, self).redraw(*args)
+        if self.tiled:
+            tiles = self._tiles
+            if tiles is None:
+                tiles = self._tiles = TimelineTiles(self)
+            tiles.tile_size = self.tile_size
+            tiles.memory = self.tile_memory
+            tiles.draw()
+        if not self.frame_budget or self._refining:
+            return
+        if default_timer() - start > self.frame_budget:
+            self.lod = min(self.lod + 1, len(self.ticks))
+        if self.lod:
+            Clock.unschedule(self._refine)
+            Clock.schedule_once(self._refine, self.refine_delay)
+            
+    def _refine(self, *args):
+        self.lod = 0
+        self._refining = True
+        try:
+            self.redraw()
+        finally:
+            self._refining = False
+            
+    def shows(self, tick):
+        '''whether ``tick`` is drawn at the current :attr:`lod`, and not 
+        into tiles, see :attr:`tiled`.'''
+        return not self.tiled and tick not in self._dropped
+    
+    def on_tiled(self, *args):
+        if not self.tiled and self._tiles is not None:
+            self._tiles.clear()
+            self._tiles = None
+        self.trigger_redraw()
+        
+    def on_tile_size(self, *args):
+        if self._tiles is not None:
+            self._tiles.clear()
+    
+    def _predict(self, *args):
+        # extrapolate the motion of the window, and prefetch the labels of
+        # where it's going
+        if not self.prefetch:
+            self._motion = None
+            return
+        now = default_timer()
+        index_0, index_1 = self.index_0, self.index_1
+        motion = self._motion
+        self._motion = (now, self.origin, index_0, index_1)
+        if motion is None or motion[1] != self.origin or now <= motion[0]:
+            return
+        ahead = self.prefetch_lookahead / (now - motion[0])
+        width = index_1 - index_0
+        shift = (index_0 + index_1 - motion[2] - motion[3]) / 2. * ahead
+        shift = max(-abs(width), min(shift, abs(width)))
+        zoom = (width / (motion[3] - motion[2])) ** ahead \
+               if motion[3] != motion[2] else 1
+        zoom = max(.5, min(zoom, 2))
+        if not shift and zoom == 1:
+            return
+        center = (index_0 + index_1) / 2. + shift
+        window = _Viewport(self, center - width * zoom / 2., 
+                           center + width * zoom / 2.)
+        if window.densest_tick is None:
+            return
+        self._prefetch_jobs = self._prefetch_iter(window)
+        self._prefetch_done = 0
+        Clock.unschedule(self._prefetch_step)
+        Clock.schedule_once(self._prefetch_step)
+    
+    def _prefetch_iter(self, window):
+        # the ticks and indices of the labels in ``window`` but not on 
+        # screen, nearest to the screen first
+        labeller = self.labeller
+        registrar = labeller.registrar
+        center = (self.index_0 + self.index_1) / 2.
         for tick in self.ticks:
-            tick.tz = self.tz
+            if not isinstance(tick, TimeTick) or \
+                    tick.scale(window.scale) < tick.min_label_space:
+                continue
+            index_range = tick.index_range(window)
+            if index_range is None:
+                sf, origin = tick.scale_factor, tick.origin
+                indices = [index_of_micros(micros, sf, origin)
+                           for micros in tick.micros_iter(window)]
+            else:
+                first, last, shift = index_range
+                indices = [k - shift for k in range(first, last + 1)]
+            labelled = registrar.get(tick, ())
+            local_center = center * tick.scale_factor
+            for index in sorted(indices, 
+                                key=lambda i: abs(i - local_center)):
+                if index not in labelled:
+                    yield tick, index
+                    
+    def _prefetch_step(self, *args):
+        labeller = self.labeller
+        limit = min(self.prefetch_limit, 
+                    labeller.texture_cache.capacity // 2)
+        start = default_timer()
+        for tick, index in self._prefetch_jobs:
+            self._prefetch_done += labeller.prefetch(tick, index)
+            if self._prefetch_done >= limit:
+                break
+            if default_timer() - start > self.prefetch_budget:
+                Clock.schedule_once(self._prefetch_step)
+                return
+        self._prefetch_jobs = iter(())
+        
+    def _push_to_ticks(self, *args):
+        for tick in self.ticks:
+            if isinstance(tick, TimeTick):
+                tick.tz = self.tz
+                tick.origin = self.origin
+    def _check_origin(self, *args):
+        if not self.auto_origin:
+            return
+        index_0, index_1 = self.index_0, self.index_1
+        center = (index_0 + index_1) / 2.
+        if abs(center) > abs(index_1 - index_0) * 2 ** 32:
+            self.origin = round_micros(
+                micros_of_index(center, origin=self.origin), 'second')
+    def get_offsets(self):
+        '''gives the :class:`TzOffsets` of :attr:`tz`.'''
+        offsets = self._offsets
+        if offsets is None:
+            offsets = self._offsets = tz_offsets(self.tz)
+        return offsets
+    def wall_clock_of(self, index):
+        '''gives the local wall clock of the global ``index`` in :attr:`tz` 
+        as fields, without creating a datetime. See 
+        :meth:`TzOffsets.wall_clock_micros`.'''
+        return self.get_offsets().wall_clock_micros(self.micros_of(index))
     def pos2time(self, pos):
         return self.datetime_of(self.pos2index(pos))
+    def micros_of(self, index):
+        '''converts the global ``index`` to microseconds since unix 
+        epoch.'''
+        return micros_of_index(index, origin=self.origin)
+    def index_of_micros(self, micros):
+        '''converts ``micros`` since unix epoch to a global index.'''
+        return index_of_micros(micros, origin=self.origin)
     def datetime_of(self, index):
-        return (timedelta(days=index) + unixepoch).astimezone(self.tz)
+        return datetime_of_micros(self.micros_of(index), self.tz)
     def index_of(self, dt):
         '''return a global index corresponding to a datetime. '''
-        secs = (dt - unixepoch).total_seconds() 
-        global_idx = secs / TimeTick.scale_factor_dict['second']
-        return global_idx
+        return self.index_of_micros(micros_of(dt))
     def pos_of_time(self, time):
         return self.index2pos(self.index_of(time))
     def timedelta2dist(self, td):
@@ -713,6 +4777,8 @@ class Timeline(Tickline):
         self.index_1 = self.index_of(end)
                 
 if __name__ == '__main__':
+    from kivy.base import runTouchApp
+    from kivy.uix.accordion import AccordionItem, Accordion
     acc = Accordion(orientation='vertical')
     simple = AccordionItem(title='simple')
     simple.add_widget(Timeline())
@@ -0,0 +1,188 @@
+'''
+Benchmark
+=========
+
+Drives :class:`~kivy.garden.timeline.Timeline` headlessly, with Kivy's mock
+graphics backend, through scripted pan, pinch-zoom and follow-now
+scenarios, each with the ticks of
+:func:`~kivy.garden.timeline.selected_time_ticks` and of
+:func:`~kivy.garden.timeline.all_time_ticks`. For every frame, it measures
+the time spent iterating ticks (:meth:`TimeTick.tick_iter`), registering
+labels (:meth:`TimeLabeller.register`), making labels
+(:meth:`TimeLabeller.make_labels`) and creating label textures, as well as
+the whole frame.
+
+Results are printed as JSON, one object per scenario and set of ticks,
+with the mean, median, 95th percentile and maximum of each measure in
+milliseconds, so that runs can be diffed::
+
+    python benchmark.py --frames 300 > nightly.json
+
+Run it as a script, so that the mock backend is selected before Kivy is
+imported.
+'''
+import os
+
+if __name__ == '__main__':
+    os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    from kivy.config import Config
+    # don't let the clock sleep between frames
+    Config.set('graphics', 'maxfps', '0')
+
+import json
+import sys
+from argparse import ArgumentParser
+from timeit import default_timer
+
+from kivy.clock import Clock
+from kivy.garden.timeline import Timeline, all_time_ticks, \
+    selected_time_ticks
+
+
+class Probe(object):
+    '''accumulates the time spent in, and the number of calls to, the
+    functions it wraps, until :meth:`reset`.'''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.time = 0.
+        self.calls = 0
+
+    def wrap(self, func):
+        def wrapper(*args, **kw):
+            start = default_timer()
+            try:
+                return func(*args, **kw)
+            finally:
+                self.time += default_timer() - start
+                self.calls += 1
+        return wrapper
+
+    def wrap_iter(self, func):
+        '''like :meth:`wrap`, for a function returning an iterator: the time
+        spent getting each item is accumulated.'''
+        def wrapper(*args, **kw):
+            start = default_timer()
+            it = iter(func(*args, **kw))
+            self.time += default_timer() - start
+            self.calls += 1
+            while True:
+                start = default_timer()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    self.time += default_timer() - start
+                yield item
+        return wrapper
+
+
+def pan(tl, frame):
+    '''pans by 1% of the window each frame, reversing every 100 frames,
+    so that the same times scroll in and out of view.'''
+    step = (tl.index_1 - tl.index_0) / 100.
+    if (frame // 100) % 2:
+        step = -step
+    tl.index_0 += step
+    tl.index_1 += step
+
+def zoom(tl, frame):
+    '''zooms in by 5% each frame around the center of the window, from 2
+    days down to about a minute, then back out.'''
+    factor = 1.05 if (frame // 150) % 2 else 1 / 1.05
+    center = (tl.index_0 + tl.index_1) / 2.
+    half = (tl.index_1 - tl.index_0) / 2. * factor
+    tl.index_0, tl.index_1 = center - half, center + half
+
+def follow(tl, frame):
+    '''advances a 5 minute window by a second each frame, like
+    :attr:`Timeline.follow_now` with time sped up 60 times.'''
+    if frame == 0:
+        center = (tl.index_0 + tl.index_1) / 2.
+        tl.index_0, tl.index_1 = center - 150 / 86400., center + 150 / 86400.
+    tl.index_0 += 1 / 86400.
+    tl.index_1 += 1 / 86400.
+
+scenarios = {'pan': pan, 'zoom': zoom, 'follow': follow}
+
+tick_sets = {'selected': selected_time_ticks, 'all': all_time_ticks}
+
+
+def stats(samples):
+    '''gives the mean, median, 95th percentile and maximum of ``samples``,
+    in milliseconds.'''
+    samples = sorted(samples)
+    n = len(samples)
+    return {'mean': 1000 * sum(samples) / n,
+            'median': 1000 * samples[n // 2],
+            'p95': 1000 * samples[min(int(n * .95), n - 1)],
+            'max': 1000 * samples[-1]}
+
+
+def run(scenario, ticks, frames=300, size=(400, 800), **kw):
+    '''runs ``scenario`` for ``frames`` frames on a :class:`Timeline` of
+    ``size`` showing ``ticks``, and gives the results as a dict. Other
+    keyword arguments are passed on to the :class:`Timeline`.'''
+    tl = Timeline(size=size, ticks=tick_sets[ticks](), **kw)
+    probes = dict((name, Probe()) for name in
+                  ('tick_iter', 'register', 'make_labels', 'textures'))
+    for tick in tl.ticks:
+        tick.tick_iter = probes['tick_iter'].wrap_iter(tick.tick_iter)
+    labeller = tl.labeller
+    # start cold: the texture cache is shared by all timelines
+    labeller.texture_cache.clear()
+    labeller.register = probes['register'].wrap(labeller.register)
+    labeller.make_labels = probes['make_labels'].wrap(labeller.make_labels)
+    cache = labeller.texture_cache
+    cache.rasterize = probes['textures'].wrap(cache.rasterize)
+    # settle the first frame
+    Clock.tick()
+    samples = dict((name, []) for name in probes)
+    samples['frame'] = []
+    textures = 0
+    step = scenarios[scenario]
+    for frame in range(frames):
+        step(tl, frame)
+        for probe in probes.values():
+            probe.reset()
+        start = default_timer()
+        Clock.tick()
+        samples['frame'].append(default_timer() - start)
+        for name, probe in probes.items():
+            samples[name].append(probe.time)
+        textures += probes['textures'].calls
+    result = dict((name, stats(values)) for name, values in samples.items())
+    result.update(scenario=scenario, ticks=ticks, frames=frames,
+                  textures_created=textures)
+    return result
+
+
+def main(argv=None):
+    parser = ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--scenarios', nargs='+', default=sorted(scenarios),
+                        choices=sorted(scenarios))
+    parser.add_argument('--ticks', nargs='+', default=sorted(tick_sets),
+                        choices=sorted(tick_sets))
+    parser.add_argument('--width', type=int, default=400)
+    parser.add_argument('--height', type=int, default=800)
+    parser.add_argument('--orientation', default='vertical',
+                        choices=['vertical', 'horizontal'])
+    parser.add_argument('--frame-budget', type=float, default=0,
+                        help='Timeline.frame_budget, in seconds')
+    parser.add_argument('--tiled', action='store_true',
+                        help='draw into tiles, see Timeline.tiled')
+    args = parser.parse_args(argv)
+    results = [run(scenario, ticks, args.frames, (args.width, args.height),
+                   orientation=args.orientation,
+                   frame_budget=args.frame_budget, tiled=args.tiled)
+               for scenario in args.scenarios for ticks in args.ticks]
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+
+if __name__ == '__main__':
+    main()
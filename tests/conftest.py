@@ -0,0 +1,11 @@
+'''
+The tests run headlessly, with Kivy's mock graphics backend, against the
+timeline installed as ``kivy.garden.timeline`` (with ``garden install``, 
+or by linking this repository into ``~/.kivy/garden/garden.timeline``)::
+
+    python -m pytest tests
+'''
+import os
+
+os.environ.setdefault('KIVY_GL_BACKEND', 'mock')
+os.environ.setdefault('KIVY_NO_ARGS', '1')
@@ -0,0 +1,136 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from pytz import timezone, UTC
+
+from kivy.garden.timeline import BoundaryTable, Timeline, TimeTick, \
+    tz_offsets, micros_of, index_of_micros, mode_micros, micros_per_second
+
+minute = 60 * micros_per_second
+hour = 60 * minute
+
+
+def wall(tz, micros):
+    # the wall clock of tz, as naive micros, straight from pytz
+    dt = (datetime(1970, 1, 1, tzinfo=UTC) +
+          timedelta(microseconds=micros)).astimezone(tz)
+    return micros_of(dt.replace(tzinfo=None))
+
+
+def brute_boundaries(tz, unit, start, end):
+    # the first minute showing each unit of the wall clock. Turning the
+    # clock back by a unit or more shows the units it goes over again.
+    boundaries = []
+    prev = wall(tz, start - minute)
+    shown = prev // unit
+    for micros in range(start, end, minute):
+        w = wall(tz, micros)
+        if prev + minute - w >= unit:
+            shown = -(-w // unit) - 1
+        if w // unit > shown:
+            boundaries.append(micros)
+            shown = w // unit
+        prev = w
+    return boundaries
+
+
+def transitions_of(tz, year):
+    epoch = datetime(1970, 1, 1)
+    return [int((t - epoch).total_seconds()) * micros_per_second
+            for t in tz._utc_transition_times if t.year == year]
+
+
+@pytest.mark.parametrize('name, year', [
+    # back and forth by an hour, at 01:00 and 02:00
+    ('Europe/London', 2024),
+    # by half an hour, at 02:00
+    ('Australia/Lord_Howe', 2024),
+    # forward from 00:00: no midnight on 2024-09-08, and back to 23:00
+    ('America/Santiago', 2024),
+    # forward from 00:00 on 2024-03-10, and back from 01:00 to 00:00
+    ('America/Havana', 2024),
+    # forward from 00:00 on 2018-11-04
+    ('America/Sao_Paulo', 2018)])
+@pytest.mark.parametrize('mode', ['day', '6 hours', 'hour', '15 minutes'])
+def test_boundaries_around_transitions(name, year, mode):
+    tz = timezone(name)
+    unit = mode_micros(mode)
+    table = BoundaryTable(tz_offsets(tz), mode)
+    transitions = transitions_of(tz, year)
+    assert transitions
+    for transition in transitions:
+        start, end = transition - 36 * hour, transition + 36 * hour
+        expected = brute_boundaries(tz, unit, start, end)
+        assert table._compute(start, end) == expected
+        # the same, computed piecewise, as when panning
+        got = []
+        for t in range(start, end, 5 * hour):
+            got.extend(table._compute(t, min(t + 5 * hour, end)))
+        assert got == expected
+
+
+@pytest.mark.parametrize('name, day', [
+    ('America/Santiago', (2024, 9, 8)),
+    ('America/Havana', (2024, 3, 10)),
+    ('America/Sao_Paulo', (2018, 11, 4))])
+def test_day_with_skipped_midnight_starts_at_transition(name, day):
+    tz = timezone(name)
+    table = tz_offsets(tz).boundaries('day')
+    noon = micros_of(tz.localize(datetime(*day + (12,))))
+    days = table.between(noon - 48 * hour, noon + 48 * hour)
+    walls = [datetime(1970, 1, 1) + timedelta(microseconds=wall(tz, m))
+             for m in days]
+    assert [w.date() for w in walls] == \
+        [(datetime(*day) + timedelta(d)).date() for d in range(-1, 3)]
+    # it starts when the clock is turned forward from midnight to 1:00
+    assert walls[1] == datetime(*day + (1,))
+    assert [w.time() for w in walls[:1] + walls[2:]] == \
+        [datetime(*day).time()] * 3
+
+
+def test_boundaries_panned_randomly_match_computed_at_once():
+    rng = random.Random(25)
+    for name in ('Europe/London', 'America/Havana', 'Australia/Lord_Howe'):
+        offsets = tz_offsets(timezone(name))
+        for mode in ('day', 'hour'):
+            start = micros_of(datetime(2024, 1, 1))
+            end = micros_of(datetime(2025, 1, 1))
+            table = BoundaryTable(offsets, mode)
+            got = set()
+            t = start
+            while t < end:
+                step = rng.randint(1, 30) * hour
+                got.update(table.between(t, min(t + step, end - 1)))
+                t += step
+            assert sorted(got) == BoundaryTable(offsets, mode)._compute(
+                start, end)
+            assert table.micros == sorted(set(table.micros))
+
+
+@pytest.mark.parametrize('name', ['Europe/London', 'America/New_York',
+                                  'Australia/Lord_Howe'])
+@pytest.mark.parametrize('when', [datetime(1883, 11, 18, 12),
+                                  datetime(1916, 5, 21, 2),
+                                  datetime(2024, 3, 31, 2),
+                                  datetime(2300, 6, 1, 12)])
+def test_day_ticks_far_from_epoch(name, when):
+    tz = timezone(name)
+    tick = TimeTick(mode='day', tz=tz)
+    timeline = Timeline(size=(100, 800), tz=tz, ticks=[tick])
+    center = micros_of(tz.localize(when))
+    # an origin in the window, as auto_origin would set it
+    timeline.origin = center
+    c = index_of_micros(center, origin=timeline.origin)
+    timeline.index_0, timeline.index_1 = c - 4, c + 4
+    offsets = tz_offsets(tz)
+    ticks = list(tick.micros_iter(timeline))
+    # the window, and some margin
+    assert ticks[0] <= center - 3 * 24 * hour
+    assert ticks[-1] >= center + 3 * 24 * hour
+    days = [offsets.local_micros(micros) // mode_micros('day')
+            for micros in ticks]
+    assert days == list(range(days[0], days[0] + len(days)))
+    for micros in ticks:
+        assert offsets.local_micros(micros) % mode_micros('day') == 0
+        assert wall(tz, micros) == offsets.local_micros(micros)
@@ -0,0 +1,120 @@
+from datetime import datetime
+
+import pytest
+from pytz import timezone
+
+from kivy.garden.timeline import Timeline, TimelineGroup, TimeTick, \
+    default_texture_cache, micros_of, index_of_micros, selected_time_ticks
+
+
+def _calendar_ticks(tz):
+    return [TimeTick(mode=mode, tz=tz)
+            for mode in ('year', 'quarter', 'month', 'week', 'day')]
+
+
+def _members(count=3, **kw):
+    tz = timezone('America/New_York')
+    timelines = [Timeline(size=(100, 600), tz=tz, ticks=_calendar_ticks(tz),
+                          **kw)
+                 for _ in range(count)]
+    # a year around the end of daylight saving
+    center = index_of_micros(micros_of(tz.localize(datetime(2024, 11, 3))))
+    timelines[0].index_0, timelines[0].index_1 = center - 180, center + 180
+    return timelines
+
+
+def test_members_follow_a_pan():
+    london, tokyo = timezone('Europe/London'), timezone('Asia/Tokyo')
+    timelines = [Timeline(size=(100, 600), tz=london),
+                 Timeline(size=(800, 60), tz=tokyo,
+                          orientation='horizontal'),
+                 Timeline(size=(100, 300), tz=london, backward=True)]
+    timelines[0].index_0, timelines[0].index_1 = 19700., 19701.
+    group = TimelineGroup(timelines)
+    assert len(group) == 3 and list(group) == timelines
+    # the first sets the window
+    for tl in timelines:
+        assert (tl.index_0, tl.index_1) == (19700., 19701.)
+    for source in timelines:
+        source.index_0 -= .25
+        source.index_1 -= .5
+        for tl in timelines:
+            assert (tl.index_0, tl.index_1) == \
+                (source.index_0, source.index_1)
+            assert tl.origin == source.origin
+
+
+def test_members_follow_a_new_origin():
+    timelines = _members()
+    group = TimelineGroup(timelines)
+    times = [timelines[2].micros_of(index)
+             for index in (timelines[2].index_0, timelines[2].index_1)]
+    timelines[1].origin = times[0]
+    for tl in timelines:
+        assert tl.origin == times[0]
+        assert tl.index_0 == pytest.approx(0, abs=1e-9)
+        assert [tl.micros_of(tl.index_0), tl.micros_of(tl.index_1)] == \
+            pytest.approx(times, abs=1)
+    assert len(group) == 3
+
+
+def test_members_share_their_tick_sets(monkeypatch):
+    calls = []
+    micros_iter = TimeTick.micros_iter
+    def counting(tick, tl):
+        calls.append(tick.mode)
+        return micros_iter(tick, tl)
+    monkeypatch.setattr(TimeTick, 'micros_iter', counting)
+    timelines = _members()
+    alone = _members(1)[0]
+    group = TimelineGroup(timelines)
+    alone.index_0, alone.index_1 = timelines[0].index_0, timelines[0].index_1
+    for frame in range(3):
+        del calls[:]
+        for tl in timelines:
+            tl.redraw()
+        # once for the group, for each tick found by stepping
+        assert sorted(calls) == sorted(set(calls))
+        assert set(calls) >= set(['year', 'quarter', 'month', 'week'])
+        alone.redraw()
+        for tl in timelines:
+            for tick, other in zip(tl.ticks, alone.ticks):
+                assert list(tick.tick_iter(tl)) == \
+                    list(other.tick_iter(alone))
+        timelines[frame].index_0 += 20
+        timelines[frame].index_1 += 20
+        alone.index_0 += 20
+        alone.index_1 += 20
+    assert len(group._tick_indices) == 0
+
+
+def test_members_share_their_label_textures():
+    timelines = _members()
+    group = TimelineGroup(timelines)
+    timelines[0].redraw()
+    cache = group.texture_cache
+    assert all(tl.labeller.texture_cache is cache for tl in timelines)
+    misses = cache.misses
+    assert len(cache)
+    for tl in timelines[1:]:
+        tl.redraw()
+        assert tl.labeller.cache_misses == 0
+    assert cache.misses == misses
+
+
+def test_removed_members_keep_their_window():
+    timelines = _members()
+    group = TimelineGroup(timelines)
+    removed = timelines[1]
+    group.remove(removed)
+    assert removed.group is None and len(group) == 2
+    assert removed.labeller.texture_cache is default_texture_cache
+    window = removed.index_0, removed.index_1
+    timelines[0].index_0 += 1
+    assert (removed.index_0, removed.index_1) == window
+    assert timelines[2].index_0 == timelines[0].index_0
+    # and may join another group, taking its window
+    other = TimelineGroup([Timeline(ticks=selected_time_ticks())])
+    other.add(timelines[2])
+    assert timelines[2] not in group.timelines and len(group) == 1
+    assert timelines[2].index_0 == other.timelines[0].index_0
@@ -0,0 +1,338 @@
+import random
+import time
+from collections import Counter
+
+import pytest
+from pytz import timezone
+from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
+
+import kivy.garden.timeline as timeline_module
+from kivy.garden.timeline import Timeline, TimeTick, TimeLabeller, \
+    LabelRegistry, TickRegistry, LabelTextureCache, LabelRasterizer, \
+    GlyphAtlas, default_texture_cache, glyph_atlas, render_label, \
+    selected_time_ticks, all_time_ticks
+
+
+def test_label_registry_matches_dict():
+    rng = random.Random(16)
+    registry = LabelRegistry()
+    model = {}
+    for _ in range(2000):
+        index = rng.randrange(-50, 50)
+        if index in model and rng.random() < .5:
+            assert registry.remove(index) == model.pop(index)[0]
+        elif index in model:
+            info = [rng.random() for _ in range(4)]
+            registry[index] = info
+            model[index] = (model[index][0], info)
+        else:
+            info = [rng.random() for _ in range(4)]
+            registry.add(index, index * 1000, info)
+            model[index] = (index * 1000, info)
+        assert len(registry) == len(model)
+    assert list(registry) == sorted(model)
+    for index, (micros, info) in model.items():
+        assert index in registry
+        assert list(registry[index]) == pytest.approx(info)
+        assert registry.index_at(micros) == index
+    assert registry.index_at(1) is None
+    assert 1000 not in registry
+
+
+
+def test_tick_registry_matches_dict():
+    rng = random.Random(17)
+    registry = TickRegistry()
+    model = {}
+    ticks = [object() for _ in range(3)]
+    for _ in range(2000):
+        micros = rng.randrange(-50, 50) * 10 ** 12
+        if micros in model and rng.random() < .5:
+            del registry[micros]
+            del model[micros]
+        else:
+            tick = rng.choice(ticks)
+            registry[micros] = model[micros] = tick
+        assert len(registry) == len(model)
+    assert list(registry) == sorted(model)
+    for micros in range(-50 * 10 ** 12, 50 * 10 ** 12, 10 ** 12):
+        assert registry.get(micros) is model.get(micros)
+        assert (micros in registry) == (micros in model)
+    with pytest.raises(KeyError):
+        del registry[1]
+
+def _labels(timeline):
+    lab = timeline.labeller
+    return sorted((tick.mode, index, tuple(round(v, 3) for v in rect.pos),
+                   tuple(rect.size))
+                  for tick, instrs in lab.instructions.items()
+                  for index, rect in instrs.items())
+
+
+def _registrations(timeline):
+    lab = timeline.labeller
+    return sorted((tick.mode, index, tuple(info))
+                  for tick, registry in lab.registrar.items()
+                  for index, info in registry.items())
+
+
+@pytest.mark.parametrize('tz', [None, 'Europe/London'])
+@pytest.mark.parametrize('ticks', [selected_time_ticks, all_time_ticks])
+def test_diffed_registration_matches_full(tz, ticks):
+    # pans, zooms and jumps through time, registering only the labels
+    # that changed, against a timeline re-registering all of them each
+    # frame
+    rng = random.Random(str(tz) + ticks.__name__)
+    kw = dict(size=(300, 600), ticks=ticks())
+    if tz:
+        kw['tz'] = timezone(tz)
+    diffed, full = Timeline(**kw), Timeline(**kw)
+    for frame in range(150):
+        r = rng.random()
+        span = diffed.index_1 - diffed.index_0
+        if r < .7:
+            shift = span * rng.uniform(-.1, .1)
+            diffed.index_0 += shift
+            diffed.index_1 += shift
+        elif r < .9:
+            center = diffed.index_0 + span / 2.
+            half = span / 2. * rng.choice([.8, 1.25])
+            diffed.index_0, diffed.index_1 = center - half, center + half
+        else:
+            diffed.index_0 -= 300
+            diffed.index_1 -= 300
+        full.index_0, full.index_1 = diffed.index_0, diffed.index_1
+        diffed.redraw()
+        # forgetting the scale makes the labeller start over
+        full.labeller._scale = None
+        full.redraw()
+        assert _labels(diffed) == _labels(full), frame
+        assert _registrations(diffed) == _registrations(full), frame
+
+
+def test_glyph_atlas_keeps_a_bounded_number_of_runs():
+    atlas = GlyphAtlas(13)
+    atlas.capacity = 8
+    for minute in range(60):
+        atlas.layout('12:%02d' % minute)
+    assert ('12:59', 'left') in atlas
+    assert ('12:51', 'left') not in atlas
+    assert atlas.measure('Mon\n12:34') == atlas.layout('Mon\n12:34').size
+
+
+def test_culling_measures_without_laying_out():
+    timeline = Timeline(size=(100, 800), ticks=all_time_ticks())
+    timeline.labeller.cull_labels = True
+    texts = set()
+    for frame in range(30):
+        timeline.index_0 -= 3.7
+        timeline.index_1 -= 3.7
+        timeline.redraw()
+        lab = timeline.labeller
+        for tick, registry in lab.registrar.items():
+            for index in registry:
+                for which in ('time', 'date'):
+                    label_kw = lab._label_kw(tick, index, True, which)
+                    if label_kw:
+                        texts.add((label_kw['font_size'], label_kw['text'],
+                                   label_kw['halign']))
+    assert texts
+    assert not any((text, halign) in glyph_atlas(font_size)
+                   for font_size, text, halign in texts)
+
+
+def test_labels_are_culled_only_when_asked():
+    # hours 12.5 pixels apart on a horizontal timeline: their labels
+    # overlap
+    culled = []
+    for cull_labels in (None, False, True):
+        timeline = Timeline(size=(300, 100), orientation='horizontal',
+                            ticks=[TimeTick(mode='hour', min_label_space=5)],
+                            profiling=True)
+        if cull_labels is not None:
+            timeline.labeller.cull_labels = cull_labels
+        timeline.index_0, timeline.index_1 = 19700., 19701.
+        timeline.redraw()
+        culled.append(timeline.frame_stats['labels_culled'])
+    assert culled[0] == culled[1] == 0 and culled[2]
+
+
+def test_texture_cache_size_leaves_the_shared_cache_alone():
+    capacity = default_texture_cache.capacity
+    labeller = TimeLabeller(Timeline(), texture_cache_size=3)
+    assert labeller.texture_cache is not default_texture_cache
+    assert labeller.texture_cache.capacity == 3
+    other = Timeline()
+    assert other.labeller.texture_cache is default_texture_cache
+    other.labeller.texture_cache_size = 5
+    assert other.labeller.texture_cache is not default_texture_cache
+    assert other.labeller.texture_cache.capacity == 5
+    assert default_texture_cache.capacity == capacity
+    # a cache given explicitly is resized, for all its labellers
+    cache = LabelTextureCache(8)
+    labeller = TimeLabeller(Timeline(), texture_cache=cache,
+                            texture_cache_size=4)
+    assert labeller.texture_cache is cache and cache.capacity == 4
+    labeller.texture_cache_size = 6
+    assert cache.capacity == 6
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_async_labels_swap_in_their_textures(threaded):
+    rasterizer = LabelRasterizer()
+    if threaded:
+        # the text provider isn't thread safe, but the main thread only
+        # uploads meanwhile
+        rasterizer.threaded_providers = (CoreLabel.__name__,)
+    assert rasterizer.threaded() == threaded
+    kw = dict(size=(100, 600), ticks=selected_time_ticks())
+    timeline = Timeline(**kw)
+    timeline.index_0, timeline.index_1 = 19700., 19700.25
+    lab = timeline.labeller
+    lab.texture_cache = LabelTextureCache()
+    lab.rasterizer = rasterizer
+    lab.async_labels = True
+    timeline.redraw()
+    assert lab.placeholders and len(rasterizer)
+    assert all(tuple(lab.instructions[tick][index].size) == (0, 0)
+               for tick, index in lab.placeholders)
+    for _ in range(1000):
+        Clock.tick()
+        if not len(rasterizer) and not lab.placeholders:
+            break
+        time.sleep(.002)
+    assert not len(rasterizer) and not lab.placeholders
+    full = Timeline(**kw)
+    full.index_0, full.index_1 = timeline.index_0, timeline.index_1
+    full.labeller.texture_cache = LabelTextureCache()
+    full.redraw()
+    assert _labels(timeline) == _labels(full)
+
+
+def test_rasterizer_uploads_within_budget():
+    # nothing fits: one label per frame
+    rasterizer = LabelRasterizer(budget=0)
+    uploaded = []
+    def callback(key, texture):
+        uploaded.append((key, tuple(texture.size)))
+    for minute in range(5):
+        assert rasterizer.submit(minute, dict(text='12:%02d' % minute),
+                                 callback)
+    # queued already
+    assert not rasterizer.submit(0, dict(text='12:00'), callback)
+    assert len(rasterizer) == 5
+    rasterizer.upload()
+    assert len(rasterizer) == 4 and [key for key, _ in uploaded] == [0, 0]
+    while len(rasterizer):
+        rasterizer.upload()
+    assert [key for key, _ in uploaded] == [0, 0, 1, 2, 3, 4]
+    label = CoreLabel(text='12:04')
+    label.refresh()
+    assert uploaded[-1][1] == tuple(label.texture.size)
+
+
+def test_render_label_matches_refresh(monkeypatch):
+    label_kw = dict(text='Mon\n05-13-24', font_size=12, halign='left')
+    label = CoreLabel(**label_kw)
+    label.refresh()
+    data = render_label(label_kw)
+    assert (data.width, data.height) == tuple(label.texture.size)
+    texture = LabelRasterizer.texture_of(data, label_kw)
+    assert texture.size == label.texture.size
+    assert render_label(dict(text='')) is None
+    # a text provider without the internals rasterizes on the main thread
+    monkeypatch.setattr(timeline_module, 'renders_labels', lambda: False)
+    rasterizer = LabelRasterizer()
+    rasterizer.threaded_providers = (CoreLabel.__name__,)
+    assert not rasterizer.threaded()
+    with pytest.raises(NotImplementedError):
+        render_label(label_kw)
+
+
+def _glyph_timeline(glyph_labels, orientation='vertical', **kw):
+    size = (100, 600) if orientation == 'vertical' else (600, 100)
+    timeline = Timeline(size=size, orientation=orientation,
+                        ticks=selected_time_ticks(), **kw)
+    timeline.labeller.glyph_labels = glyph_labels
+    timeline.labeller.texture_cache = LabelTextureCache()
+    timeline.index_0, timeline.index_1 = 19700., 19700.25
+    timeline.redraw()
+    return timeline
+
+
+def _mesh_chars(labeller):
+    # the characters drawn by the glyph meshes, read from their texture
+    # coordinates
+    chars = Counter()
+    for atlas, meshes in labeller._glyph_meshes.items():
+        at = dict((x, c) for c, (x, w) in atlas.glyphs.items())
+        for mesh in meshes:
+            us = mesh.vertices[2::16]
+            chars.update(at[int(round(u * atlas.texture.width))] for u in us)
+    return chars
+
+
+@pytest.mark.parametrize('orientation', ['vertical', 'horizontal'])
+def test_glyph_labels_match_texture_labels(orientation):
+    textured = _glyph_timeline(False, orientation)
+    glyphs = _glyph_timeline(True, orientation)
+    # the texts of the textures, from the keys of the cache
+    texts = dict((id(texture), dict(key[:-1])['text'])
+                 for key, texture in
+                 textured.labeller.texture_cache._textures.items())
+    textured_labels = dict(((tick.mode, index), (texts[id(rect.texture)],
+                                                 rect.pos, rect.size))
+                           for tick, instrs in
+                           textured.labeller.instructions.items()
+                           for index, rect in instrs.items())
+    glyph_labels = dict(((tick.mode, index), (label.texture.text, label.pos,
+                                              label.size))
+                        for tick, instrs in
+                        glyphs.labeller.instructions.items()
+                        for index, label in instrs.items())
+    assert sorted(textured_labels) == sorted(glyph_labels)
+    a = 1 if orientation == 'vertical' else 0
+    for key, (text, pos, size) in textured_labels.items():
+        glyph_text, glyph_pos, glyph_size = glyph_labels[key]
+        assert glyph_text == text
+        # glyphs aren't kerned: a little wider or narrower
+        assert glyph_size[1] == size[1]
+        assert abs(glyph_size[0] - size[0]) <= 2 + .1 * size[0]
+        slack = abs(glyph_size[a] - size[a]) + 1e-6
+        assert abs(glyph_pos[a] - pos[a]) <= slack
+        assert abs(glyph_pos[1 - a] - pos[1 - a]) <= slack
+    assert _mesh_chars(glyphs.labeller) == Counter(
+        c for text, _, _ in glyph_labels.values() for c in text
+        if c not in ' \n')
+
+
+def test_glyph_meshes_split_at_the_vertex_limit():
+    timeline = _glyph_timeline(True)
+    labeller = timeline.labeller
+    chars = _mesh_chars(labeller)
+    limit = labeller.max_mesh_vertices = 24
+    # redraw everything
+    labeller.glyph_labels = False
+    labeller.glyph_labels = True
+    timeline.redraw()
+    meshes = [mesh for meshes in labeller._glyph_meshes.values()
+              for mesh in meshes]
+    assert len(meshes) > len(labeller._glyph_meshes)
+    runs = [label.texture for instrs in labeller.instructions.values()
+            for label in instrs.values()]
+    longest = max(run.vertex_count for run in runs)
+    for mesh in meshes:
+        count = len(mesh.vertices) // 4
+        assert count <= max(limit, longest)
+        assert max(mesh.indices) < count
+        assert mesh in timeline.canvas.children
+    assert _mesh_chars(labeller) == chars
+    # fewer labels, fewer meshes
+    timeline.ticks = timeline.ticks[:1]
+    timeline.redraw()
+    fewer = [mesh for meshes in labeller._glyph_meshes.values()
+             for mesh in meshes]
+    assert len(fewer) < len(meshes)
+    for mesh in set(meshes) - set(fewer):
+        assert mesh not in timeline.canvas.children
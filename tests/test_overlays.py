@@ -0,0 +1,310 @@
+import random
+import time
+from datetime import datetime
+
+import pytest
+from pytz import UTC
+from kivy.clock import Clock
+
+from kivy.garden.timeline import IntervalIndex, ColumnBuffer, MinMaxPyramid, \
+    TimeSeriesStore, StoredTimeSeries, TimelineOverlay, Timeline, \
+    RangeCache, SourcedTimeSeries, SimulatedSource, micros_of, \
+    selected_time_ticks
+
+numpy = pytest.importorskip('numpy')
+
+
+def brute_overlapping(intervals, start, end):
+    return sorted(key for s, e, key in intervals if s <= end and e >= start)
+
+
+@pytest.mark.parametrize('in_order', [True, False])
+def test_interval_index_matches_brute_force(in_order):
+    rng = random.Random(6)
+    index = IntervalIndex()
+    intervals = []
+    for key in range(500):
+        if in_order:
+            start = key + rng.random()
+        else:
+            start = rng.uniform(0, 500)
+        end = start + rng.expovariate(.1)
+        index.insert(start, end, key)
+        intervals.append((start, end, key))
+        if rng.random() < .3:
+            # remove a random one, possibly just inserted
+            removed = intervals.pop(rng.randrange(len(intervals)))
+            index.remove(removed[0], removed[2])
+        if key % 25 == 0:
+            start = rng.uniform(-10, 510)
+            end = start + rng.uniform(0, 50)
+            assert sorted(index.overlapping(start, end)) == \
+                brute_overlapping(intervals, start, end)
+    assert len(index) == len(intervals)
+    for start in range(-10, 520, 7):
+        assert sorted(index.overlapping(start, start + 3)) == \
+            brute_overlapping(intervals, start, start + 3)
+
+
+def test_interval_index_order_and_edges():
+    index = IntervalIndex()
+    index.insert(5, 6, 'b')
+    index.insert(0, 10, 'a')
+    index.insert(10, 11, 'c')
+    # closed intervals: touching counts as overlapping
+    assert index.overlapping(6, 10) == ['a', 'b', 'c']
+    assert index.overlapping(11, 20) == ['c']
+    assert index.overlapping(11.5, 20) == []
+    assert index.overlapping(-5, -1) == []
+
+
+def test_interval_index_remove_unknown():
+    index = IntervalIndex()
+    index.insert(0, 1, 'a')
+    with pytest.raises(KeyError):
+        index.remove(0, 'b')
+    index.remove(0, 'a')
+    assert len(index) == 0
+    assert index.overlapping(0, 1) == []
+
+
+def test_column_buffer_appends_and_drops():
+    rng = random.Random(7)
+    buf = ColumnBuffer(('int64', 'float64'))
+    model = []
+    peak = 0
+    for step in range(300):
+        n = rng.randrange(0, 40)
+        values = list(range(len(model), len(model) + n))
+        buf.append(numpy.array(values, 'int64'), 
+                   numpy.array(values, 'float64') / 2)
+        model.extend(values)
+        peak = max(peak, len(model))
+        drop = rng.randrange(0, 30)
+        buf.drop_front(drop)
+        del model[:drop]
+        ints, floats = buf.views()
+        assert len(buf) == len(model)
+        assert ints.tolist() == model
+        assert (floats == ints / 2.).all()
+        # room for at most twice the most ever held
+        assert len(buf.columns[0]) <= max(2 * peak, 16)
+    
+
+def test_column_buffer_views_dont_copy():
+    buf = ColumnBuffer(('float64',))
+    buf.append(numpy.arange(4.))
+    view = buf.views()[0]
+    view[0] = 10
+    assert buf.views()[0][0] == 10
+
+
+def brute_level(timestamps, values, g):
+    # buckets of exact decimal micros, with plain python integers
+    buckets = {}
+    micros = int(round(g * 10 ** 6))
+    for t, v in zip(timestamps, values):
+        key = int(round(t * 10 ** 6)) // micros
+        lo, hi, total, n = buckets.get(key, (v, v, 0., 0))
+        buckets[key] = (min(lo, v), max(hi, v), total + v, n + 1)
+    keys = sorted(buckets)
+    return keys, [buckets[k][0] for k in keys], [buckets[k][1] for k in keys]
+
+
+def test_min_max_pyramid_sub_second_levels():
+    rng = numpy.random.RandomState(12)
+    # samples landing exactly on the edges of millisecond buckets
+    timestamps = 1.7e9 + numpy.cumsum(rng.randint(1, 40, 3000)) / 1000.
+    values = rng.standard_normal(len(timestamps))
+    pyramid = MinMaxPyramid(timestamps, values,
+                            [.001, .01, .1, .2, .5, 1., 60.])
+    for g, ids, mins, maxs, sums, counts in pyramid.levels:
+        keys, lo, hi = brute_level(timestamps, values, g)
+        assert list(ids) == keys, g
+        assert list(mins) == lo and list(maxs) == hi
+        assert counts.sum() == len(timestamps)
+
+
+def test_min_max_pyramid_streamed_matches_constructed():
+    rng = numpy.random.RandomState(7)
+    timestamps = 1.7e9 + numpy.cumsum(rng.randint(1, 300, 5000)) / 1000.
+    values = rng.standard_normal(len(timestamps))
+    granularities = [.001, .005, .1, .3, 1., 15., 3600.]
+    whole = MinMaxPyramid(timestamps, values, granularities)
+    streamed = MinMaxPyramid(timestamps[:0], values[:0], granularities)
+    cuts = sorted(rng.randint(0, len(timestamps), 40))
+    for i0, i1 in zip([0] + cuts, cuts + [len(timestamps)]):
+        streamed.append(timestamps[i0:i1], values[i0:i1])
+    for level, other in zip(whole.levels, streamed.levels):
+        assert level[0] == other[0]
+        for a, b in zip(level[1:], other[1:]):
+            numpy.testing.assert_allclose(a, b)
+
+
+def test_stored_time_series_is_read_only(tmp_path):
+    t = numpy.arange(0., 5000., .5)
+    chunks = [(t[i:i + 777], numpy.sin(t[i:i + 777]))
+              for i in range(0, len(t), 777)]
+    store = TimeSeriesStore.write(str(tmp_path / 'store'), chunks,
+                                  block_size=64, fanout=4)
+    assert len(store) == len(t)
+    assert list(store.times[:3]) == [0, 500000, 1000000]
+    series = StoredTimeSeries(store=str(tmp_path / 'store'))
+    times, mins, maxs, means = series.summary(1000., 3000., 50)
+    # a column more on either side, to draw the line up to the edges
+    assert len(times) <= 52
+    assert mins.min() == pytest.approx(numpy.sin(t[2000:6001]).min(),
+                                       abs=1e-9)
+    assert maxs.max() == pytest.approx(numpy.sin(t[2000:6001]).max(),
+                                       abs=1e-9)
+    with pytest.raises(TypeError):
+        series.push(1., 2.)
+    with pytest.raises(TypeError):
+        series.extend([1.], [2.])
+
+
+def test_stored_time_series_reads_the_extended_window(tmp_path, monkeypatch):
+    # two days sampled every 10 seconds, from 2024-01-01
+    t = 1704067200. + numpy.arange(0., 2 * 86400., 10.)
+    store = TimeSeriesStore.write(str(tmp_path / 'store'),
+                                  [(t, numpy.sin(t))], block_size=64)
+    timeline = Timeline(size=(100, 600), tz=UTC, ticks=selected_time_ticks())
+    timeline.time_0 = datetime(2024, 1, 1, 18, tzinfo=UTC)
+    timeline.time_1 = datetime(2024, 1, 2, tzinfo=UTC)
+    series = StoredTimeSeries(store=store)
+    read = []
+    window = store.window
+    def reading(start, end):
+        views = window(start, end)
+        read.append((start, end, views[0]))
+        return views
+    monkeypatch.setattr(store, 'window', reading)
+    series.display(timeline)
+    tick = timeline.densest_tick
+    expected = [micros_of(time) / 1e6
+                for time in tick.time_min_max(timeline, extended=True)]
+    assert series.window_of(timeline) == pytest.approx(expected, abs=1e-6)
+    (start, end, times), = read
+    assert [start, end] == pytest.approx(expected, abs=1e-6)
+    # a tick beyond the screen on each side, not half the window, and the
+    # neighbouring blocks of 640 seconds
+    shown = TimelineOverlay.window_of(timeline, extended=False)
+    assert shown[0] - 640 - 1e-6 <= expected[0] < shown[0]
+    assert shown[1] < expected[1] <= shown[1] + 640 + 1e-6
+    assert expected[0] - 1280 <= times[0] / 1e6 <= shown[0]
+    assert shown[1] <= times[-1] / 1e6 <= expected[1] + 1280
+    # as many columns per pixel as other series
+    columns = series._shown[timeline][2]
+    assert columns == pytest.approx(
+        1200 * (expected[1] - expected[0]) / (2 * (shown[1] - shown[0])),
+        abs=1)
+
+
+def test_range_cache_merges_its_ranges():
+    cache = RangeCache()
+    t = numpy.arange(0., 100.)
+    for start, end in [(40, 50), (10, 20), (70, 80), (20, 30)]:
+        cache.add(start, end, t[start:end + 1], t[start:end + 1])
+    assert (cache.starts, cache.ends) == ([10, 40, 70], [30, 50, 80])
+    assert cache.missing(0, 100) == [(0, 10), (30, 40), (50, 70), (80, 100)]
+    assert cache.missing(15, 45) == [(30, 40)]
+    assert cache.missing(12, 28) == []
+    assert cache.covers(12, 28) and not cache.covers(25, 45)
+    # filling the gaps merges the ranges, and replaces their samples
+    cache.add(25, 75, t[25:76], -t[25:76])
+    assert (cache.starts, cache.ends) == ([10], [80])
+    assert cache.covers(10, 80) and cache.missing(10, 80) == []
+    assert list(cache.timestamps) == list(t[10:81])
+    assert list(cache.values) == list(t[10:25]) + list(-t[25:76]) + \
+        list(t[76:81])
+    cache.keep(30, 60)
+    assert (cache.starts, cache.ends) == ([30], [60])
+    assert list(cache.timestamps) == list(t[30:61])
+
+
+def _sourced(latency, workers=2):
+    source = SimulatedSource(latency=latency, workers=workers)
+    fetches = []
+    fetch = source.fetch
+    def recording(start, end, resolution):
+        future = fetch(start, end, resolution)
+        fetches.append(((start, end, resolution), future))
+        return future
+    source.fetch = recording
+    series = SourcedTimeSeries(source, fetch_block=16)
+    timeline = Timeline(size=(100, 600), tz=UTC, ticks=selected_time_ticks())
+    timeline.index_0, timeline.index_1 = 19700., 19700.25
+    return series, timeline, fetches
+
+
+def _wait(series):
+    for _ in range(1000):
+        Clock.tick()
+        if not series._fetching and not series._pending:
+            return
+        time.sleep(.005)
+    assert False, 'fetches still pending'
+
+
+def test_sourced_series_fetches_each_block_once():
+    series, timeline, fetches = _sourced(.02)
+    resolution = series.resolution_of(timeline)
+    block = resolution * 16
+    # pan down and back, while the first blocks are still fetched
+    for step in [-.02] * 10 + [.02] * 10:
+        timeline.index_0 += step
+        timeline.index_1 += step
+        series.display(timeline)
+    _wait(series)
+    # blocks left before they came may be fetched again, once the stale
+    # fetch is cancelled
+    ranges = [key for key, future in fetches if not future.cancelled()]
+    assert ranges and len(ranges) == len(set(ranges))
+    for n, (key, future) in enumerate(fetches):
+        if any(other == key for other, _ in fetches[n + 1:]):
+            assert future.cancelled()
+    assert all(end - start == block and start % block == 0
+               for start, end, _ in ranges)
+    cache = series._caches[resolution]
+    start, end = series.window_of(timeline)
+    # one range, the union of the blocks fetched
+    assert cache.starts == [min(r[0] for r in ranges)]
+    assert cache.ends == [max(r[1] for r in ranges)]
+    assert cache.covers(start, end)
+    # and once cached, never
+    covered = 0
+    for step in [-.01] * 5 + [.01] * 10:
+        timeline.index_0 += step
+        timeline.index_1 += step
+        if cache.covers(*series.window_of(timeline)):
+            count = len(fetches)
+            series.display(timeline)
+            assert len(fetches) == count
+            covered += 1
+    assert covered >= 5
+    t, mins, maxs, means = series.summary(start, end, 10 ** 6)
+    assert numpy.allclose(t, numpy.arange(t[0], t[-1] + 1, resolution))
+    assert numpy.allclose(means, numpy.sin(t * (2 * numpy.pi / 86400)))
+
+
+def test_sourced_series_cancels_stale_fetches():
+    series, timeline, fetches = _sourced(.1, workers=1)
+    series.display(timeline)
+    stale = [future for key, future in fetches]
+    assert len(stale) > 1
+    # far away: the fetches of the first window are wanted no more
+    timeline.index_0 += 10
+    timeline.index_1 += 10
+    series.display(timeline)
+    start, end = series.window_of(timeline)
+    assert all(start < s < end or start < e < end
+               for s, e, future in series._fetching.values())
+    # all but the one under way
+    assert sum(future.cancelled() for future in stale) >= len(stale) - 1
+    _wait(series)
+    cache = series._caches[series.resolution_of(timeline)]
+    assert cache.covers(start, end)
+    fetched = [key for key, future in fetches
+               if not future.cancelled()]
+    assert len(fetched) == len(fetches) - sum(
+        future.cancelled() for future in stale)
@@ -0,0 +1,171 @@
+import pytest
+from kivy.clock import Clock
+
+from kivy.garden.timeline import Timeline, TimeTick, LabelTextureCache, \
+    all_time_ticks, selected_time_ticks, _Viewport
+
+
+def _labels(timeline):
+    lab = timeline.labeller
+    return sorted((tick.mode, index, tuple(round(v, 3) for v in rect.pos),
+                   tuple(rect.size))
+                  for tick, instrs in lab.instructions.items()
+                  for index, rect in instrs.items())
+
+
+def _shown(timeline):
+    # the modes of the ticks shown, densest first
+    return [tick.mode for tick in sorted(
+        timeline.ticks, key=lambda tick: tick.scale_factor, reverse=True)
+        if tick.scale(timeline.scale) >= tick.min_space]
+
+
+def _pan(timeline, frames, step=.01):
+    for _ in range(frames):
+        timeline.index_0 -= step
+        timeline.index_1 -= step
+        timeline.redraw()
+
+
+def test_lod_drops_the_densest_ticks_over_budget():
+    # any redraw takes longer than this
+    timeline = Timeline(size=(100, 600), ticks=all_time_ticks(),
+                        frame_budget=1e-9, refine_delay=60)
+    shown = _shown(timeline)
+    assert shown[:6] == ['30 minutes', 'hour', '2 hours', '4 hours',
+                         '6 hours', '12 hours']
+    for frame in range(1, 5):
+        _pan(timeline, 1)
+        # raised once per redraw over budget
+        assert timeline.lod == frame
+        assert [tick.mode for tick in timeline._dropped] == \
+            shown[:max(frame - 2, 0)]
+    _pan(timeline, 40)
+    assert timeline.lod == len(timeline.ticks)
+    # down to the days, the coarsest ticks labelled on screen
+    assert [tick.mode for tick in timeline._dropped] == shown[:6]
+    labelled = [tick.mode for tick, instrs in
+                timeline.labeller.instructions.items() if instrs]
+    assert labelled == ['day']
+    for tick in timeline.ticks:
+        assert timeline.shows(tick) == (tick not in timeline._dropped)
+
+
+def test_lod_stays_within_budget():
+    timeline = Timeline(size=(100, 600), ticks=all_time_ticks(),
+                        frame_budget=60)
+    _pan(timeline, 10)
+    assert timeline.lod == 0 and not timeline._dropped
+
+
+def test_lod_refines_to_the_full_detail():
+    kw = dict(size=(100, 600), ticks=all_time_ticks())
+    timeline = Timeline(frame_budget=1e-9, refine_delay=0, **kw)
+    timeline.labeller.texture_cache = LabelTextureCache()
+    _pan(timeline, 20)
+    assert timeline.lod == 20
+    # the window stopped moving: the pending redraw, then the refinement
+    Clock.tick()
+    Clock.tick()
+    assert timeline.lod == 0 and not timeline._dropped
+    assert not timeline.labeller.placeholders
+    full = Timeline(**kw)
+    full.index_0, full.index_1 = timeline.index_0, timeline.index_1
+    full.redraw()
+    assert _labels(timeline) == _labels(full)
+
+
+def test_lod_keeps_the_coarsest_tick_without_labels():
+    ticks = [TimeTick(mode=mode, min_label_space=10 ** 6)
+             for mode in ('day', 'hour', 'minute')]
+    timeline = Timeline(size=(100, 600), ticks=ticks, frame_budget=1e-9,
+                        refine_delay=60)
+    # too dense to be shown
+    assert _shown(timeline) == ['hour', 'day']
+    _pan(timeline, 10)
+    assert [tick.mode for tick in timeline._dropped] == ['hour']
+
+
+def _moving(prefetch=True, **kw):
+    # a timeline of six hours, moved by a tenth of its width since the
+    # last prefetch check
+    timeline = Timeline(size=(100, 600), ticks=selected_time_ticks(),
+                        prefetch=prefetch, profiling=True, **kw)
+    timeline.labeller.texture_cache = LabelTextureCache(1024)
+    timeline.index_0, timeline.index_1 = 19700., 19700.25
+    timeline.redraw()
+    timeline._predict()
+    _pan(timeline, 1, step=.025)
+    timeline._predict()
+    timeline._prefetch_step()
+    return timeline
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_prefetch_warms_the_window_ahead(prefetch):
+    timeline = _moving(prefetch)
+    # the window ahead, moving as fast for the lookahead, is at most
+    # a window width away
+    _pan(timeline, 1, step=.25)
+    stats = timeline.frame_stats
+    assert stats['labels_created']
+    assert (stats['textures'] == 0) == prefetch
+
+
+def test_prefetch_only_warms_the_window_ahead():
+    timeline = _moving()
+    # back where it came from
+    _pan(timeline, 1, step=-.275)
+    assert timeline.frame_stats['textures']
+
+
+def test_prefetch_warms_the_finer_ticks_of_a_zoom():
+    timeline = Timeline(size=(100, 600), ticks=selected_time_ticks(),
+                        prefetch=True, profiling=True)
+    timeline.labeller.texture_cache = LabelTextureCache(1024)
+    timeline.index_0, timeline.index_1 = 19700., 19700.25
+    timeline.redraw()
+    shown = set(timeline.labeller.registrar)
+    timeline._predict()
+    timeline.index_0, timeline.index_1 = 19700.01, 19700.24
+    timeline.redraw()
+    timeline._predict()
+    timeline._prefetch_step()
+    # zooming in twice as much at most
+    timeline.index_0, timeline.index_1 = 19700.0675, 19700.1825
+    timeline.redraw()
+    assert set(timeline.labeller.registrar) > shown
+    assert timeline.frame_stats['textures'] == 0
+
+
+def test_prefetch_stays_within_its_limit():
+    timeline = Timeline(size=(100, 600), ticks=selected_time_ticks(),
+                        prefetch=True, prefetch_limit=3)
+    cache = timeline.labeller.texture_cache = LabelTextureCache(1024)
+    timeline._predict()
+    _pan(timeline, 1, step=.5)
+    count = len(cache)
+    timeline._predict()
+    timeline._prefetch_step()
+    assert timeline._prefetch_done == 3
+    assert len(cache) == count + 3
+
+
+def test_prefetch_iter_skips_labels_on_screen_nearest_first():
+    timeline = Timeline(size=(100, 600), ticks=selected_time_ticks())
+    timeline.index_0, timeline.index_1 = 19700., 19700.25
+    timeline.redraw()
+    registrar = timeline.labeller.registrar
+    window = _Viewport(timeline, 19699.875, 19700.125)
+    jobs = list(timeline._prefetch_iter(window))
+    assert jobs
+    center = 19700.125
+    for tick in set(tick for tick, _ in jobs):
+        indices = [index for t, index in jobs if t is tick]
+        assert not set(indices) & set(registrar.get(tick, ()))
+        distances = [abs(index / tick.scale_factor - center)
+                     for index in indices]
+        assert distances == sorted(distances)
+        # all of the window below the screen
+        assert all(19699.875 - .01 < index / tick.scale_factor < 19700.01
+                   for index in indices)
@@ -0,0 +1,164 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from pytz import timezone
+
+from kivy.garden.timeline import Timeline, TimeTick, all_time_ticks, \
+    micros_of, index_of_micros, split_micros, tz_offsets, \
+    micros_per_second, _Viewport
+
+periods = {
+    'week': lambda y, m, d: (date(y, m, d).toordinal() + 6) // 7,
+    'month': lambda y, m, d: y * 12 + m - 1,
+    'quarter': lambda y, m, d: y * 4 + (m - 1) // 3,
+    'year': lambda y, m, d: y,
+    'decade': lambda y, m, d: y // 10}
+
+
+def _timeline(tick, tz, when, count=15):
+    # a window of about count ticks centered on when
+    timeline = Timeline(size=(100, 600), tz=tz, ticks=[tick])
+    center = index_of_micros(micros_of(tz.localize(when)))
+    half = count / 2. / tick.scale_factor
+    timeline.index_0, timeline.index_1 = center - half, center + half
+    return timeline
+
+
+@pytest.mark.parametrize('mode', sorted(periods))
+@pytest.mark.parametrize('name, when', [
+    ('America/New_York', datetime(2024, 6, 15)),
+    # no midnight on 2023-10-01
+    ('America/Asuncion', datetime(2023, 10, 1, 12)),
+    # no midnight on Monday 2021-03-22
+    ('Asia/Tehran', datetime(2021, 3, 22, 12))])
+def test_calendar_ticks_start_their_periods(mode, name, when):
+    tz = timezone(name)
+    tick = TimeTick(mode=mode, tz=tz)
+    timeline = _timeline(tick, tz, when)
+    offsets = tz_offsets(tz)
+    period = periods[mode]
+    indices = list(tick.tick_iter(timeline))
+    assert len(indices) >= 15
+    shown = []
+    for index in indices:
+        micros = tick.to_micros(index)
+        wall = split_micros(offsets.local_micros(micros))
+        before = split_micros(
+            offsets.local_micros(micros - micros_per_second))
+        # the first second of the period on the wall clock
+        assert period(*wall[:3]) == period(*before[:3]) + 1
+        assert wall[3:6] == (0, 0, 0) or before[3:6] == (23, 59, 59)
+        shown.append(period(*wall[:3]))
+        label = tick.get_label_texture(index, return_kw=True)['text']
+        year, month, day = wall[:3]
+        if mode == 'week':
+            assert label == 'W%02d\n%02d-%02d-%02d' % (
+                date(year, month, day).isocalendar()[1], month, day,
+                year % 100)
+        elif mode == 'month':
+            assert label == datetime(year, month, 1).strftime('%b\n%Y')
+        elif mode == 'quarter':
+            assert label == 'Q%d\n%d' % ((month - 1) // 3 + 1, year)
+        elif mode == 'year':
+            assert label == str(year)
+        else:
+            assert label == '%ds' % year
+    assert shown == list(range(shown[0], shown[0] + len(shown)))
+
+
+@pytest.mark.parametrize('when', [datetime(2020, 12, 31),
+                                  datetime(2021, 1, 3),
+                                  datetime(2026, 12, 31),
+                                  datetime(2027, 1, 4)])
+def test_week_labels_are_iso_weeks(when):
+    # 2020 and 2026 have a week 53, in which 2021-01-03 still is
+    tz = timezone('UTC')
+    tick = TimeTick(mode='week', tz=tz)
+    timeline = _timeline(tick, tz, when, count=5)
+    labels = [tick.get_label_texture(index, return_kw=True)['text']
+              for index in tick.tick_iter(timeline)]
+    monday = when - timedelta(when.weekday())
+    expected = ['W%02d\n%s' % (day.isocalendar()[1],
+                                day.strftime('%m-%d-%y'))
+                for day in (monday + timedelta(7 * k) for k in range(-4, 5))]
+    # the window, padded by a week
+    assert set(expected[2:-2]) <= set(labels)
+    assert set(labels) <= set(expected)
+
+
+@pytest.mark.parametrize('mode', sorted(periods))
+def test_batch_draw_of_calendar_ticks(mode):
+    pytest.importorskip('numpy')
+    tz = timezone('America/New_York')
+    tick = TimeTick(mode=mode, tz=tz, batch_draw=True)
+    # across the end of daylight saving
+    timeline = _timeline(tick, tz, datetime(2024, 11, 3), count=12)
+    timeline.redraw()
+    indices = list(tick.tick_iter(timeline))
+    vertices = tick._batches[timeline][3][:16 * len(indices)]
+    thickness = tick.tick_size[0]
+    # the y of the first corner of each tick
+    assert vertices[1::16].tolist() == pytest.approx(
+        [tick.pos_of(timeline, index) - thickness / 2. for index in indices],
+        abs=1e-3)
+    assert sorted(timeline.labeller.registrar[tick]) == \
+        pytest.approx(indices)
+
+
+@pytest.mark.parametrize('kw', [
+    dict(origin=10 ** 15),
+    dict(origin=10 ** 15, auto_origin=False),
+    dict(auto_origin=False, origin=10 ** 15, tz=timezone('Asia/Tokyo')),
+    dict(tz=timezone('Asia/Tokyo'), origin=10 ** 15, auto_origin=True)])
+def test_timeline_takes_origin_in_constructor(kw):
+    timeline = Timeline(size=(300, 600), **kw)
+    tz = kw.get('tz', timeline.tz)
+    assert timeline.tz is tz and timeline.origin == 10 ** 15
+    assert timeline.auto_origin == kw.get('auto_origin', True)
+    for tick in timeline.ticks:
+        assert tick.tz is tz and tick.origin == 10 ** 15
+    # the window stays around now
+    now = micros_of(datetime.utcnow())
+    day = 24 * 3600 * micros_per_second
+    assert abs(timeline.micros_of(timeline.index_0) - (now - day)) < day / 2
+    assert abs(timeline.micros_of(timeline.index_1) - (now + day)) < day / 2
+
+
+@pytest.mark.parametrize('days', [.25, 3, 60, 4000])
+def test_batch_draw_registers_as_draw(days):
+    pytest.importorskip('numpy')
+    tz = timezone('Europe/London')
+    center = index_of_micros(micros_of(tz.localize(datetime(2024, 3, 31))))
+    registrations = []
+    for batch_draw in (True, False):
+        timeline = Timeline(size=(100, 600), tz=tz,
+                            ticks=all_time_ticks(batch_draw=batch_draw))
+        timeline.index_0 = center - days / 2.
+        timeline.index_1 = center + days / 2.
+        timeline.redraw()
+        registrations.append(sorted(
+            (tick.mode, index, tuple(round(v, 3) for v in info))
+            for tick, registry in timeline.labeller.registrar.items()
+            for index, info in registry.items()))
+    assert registrations[0] and registrations[0] == registrations[1]
+
+
+@pytest.mark.parametrize('mode', sorted(periods))
+def test_prefetch_iter_of_calendar_ticks(mode):
+    # the calendar ticks of a window ahead are found by stepping, as on
+    # screen
+    tz = timezone('America/New_York')
+    tick = TimeTick(mode=mode, tz=tz)
+    timeline = _timeline(tick, tz, datetime(2024, 6, 15), count=12)
+    timeline.redraw()
+    width = timeline.index_1 - timeline.index_0
+    ahead = _timeline(TimeTick(mode=mode, tz=tz), tz, datetime(2024, 6, 15),
+                      count=12)
+    ahead.index_0 -= width
+    ahead.index_1 -= width
+    window = _Viewport(timeline, ahead.index_0, ahead.index_1)
+    jobs = list(timeline._prefetch_iter(window))
+    expected = set(ahead.ticks[0].tick_iter(ahead)) - \
+        set(timeline.labeller.registrar[tick])
+    assert expected
+    assert set(index for _, index in jobs) == expected
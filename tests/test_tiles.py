@@ -0,0 +1,116 @@
+import pytest
+from pytz import timezone
+from kivy.properties import NumericProperty
+
+from kivy.garden.tickline import Tick
+from kivy.garden.timeline import Timeline, TimeTick, selected_time_ticks
+
+
+class WideTick(TimeTick):
+    width_factor = NumericProperty(1.)
+
+
+def _labels(labeller, shift=0):
+    # the labels by tick mode and index, moved by shift along the timeline
+    return dict(((tick.mode, index),
+                 (round(rect.pos[0], 3), round(rect.pos[1] + shift, 3),
+                  tuple(rect.size)))
+                for tick, instrs in labeller.instructions.items()
+                for index, rect in instrs.items())
+
+
+def _tiled_labels(timeline):
+    # the labels of the tiles on screen, in screen coordinates
+    tiles = timeline._tiles
+    scale = float('%.9g' % timeline.scale)
+    length = tiles.tile_size / scale
+    labels = {}
+    for n in sorted(tiles._rects):
+        tiles._render(n, scale)
+        start = timeline.index2pos(n * length)
+        for key, rect in _labels(tiles._renderer.labeller, start).items():
+            labels.setdefault(key, rect)
+    return labels
+
+
+@pytest.mark.parametrize('cull_labels', [False, True])
+@pytest.mark.parametrize('tz', ['UTC', 'America/New_York'])
+def test_tiles_match_the_untiled_timeline(cull_labels, tz):
+    kw = dict(size=(100, 600), tz=timezone(tz))
+    timelines = []
+    for tiled in (True, False):
+        timeline = Timeline(tiled=tiled, ticks=selected_time_ticks(), **kw)
+        timeline.labeller.cull_labels = cull_labels
+        timeline.labeller.push_dates = False
+        timeline.index_0, timeline.index_1 = 19700.03, 19700.28
+        timeline.redraw()
+        timelines.append(timeline)
+    tiled, untiled = _tiled_labels(timelines[0]), _labels(
+        timelines[1].labeller)
+    assert untiled
+    for key, rect in untiled.items():
+        assert tiled[key] == rect
+    # and those of the tiles on screen are all there
+    bottom, top = timelines[1].y, timelines[1].top
+    for key, rect in tiled.items():
+        if bottom <= rect[1] and rect[1] + rect[2][1] <= top:
+            assert key in untiled
+
+
+def test_tiles_copy_the_ticks_and_labeller():
+    tz = timezone('Asia/Tokyo')
+    ticks = [WideTick(mode='hour', width_factor=3., tick_color=[1, 0, 0, 1],
+                      min_label_space=60),
+             TimeTick(mode='day', tick_size=[3, 20], batch_draw=True),
+             Tick(scale_factor=10., halign='right')]
+    timeline = Timeline(size=(100, 600), tz=tz, ticks=ticks, tiled=True)
+    timeline.labeller.cull_labels = True
+    timeline.labeller.glyph_labels = True
+    timeline.labeller.time_font_size = 9
+    timeline.index_0, timeline.index_1 = 19700., 19700.25
+    timeline.redraw()
+    tiles = timeline._tiles
+    renderer = tiles._renderer
+    assert renderer.tz is tz
+    assert [type(tick) for tick in renderer.ticks] == \
+        [WideTick, TimeTick, Tick]
+    assert renderer.ticks[0].width_factor == 3.
+    assert renderer.ticks[0].tick_color == [1, 0, 0, 1]
+    assert renderer.ticks[0].min_label_space == 60
+    assert renderer.ticks[0].tz is tz
+    assert renderer.ticks[1].tick_size == [3, 20]
+    assert renderer.ticks[1].batch_draw
+    assert renderer.ticks[2].scale_factor == 10.
+    assert renderer.ticks[2].halign == 'right'
+    # copies, not the same lists
+    renderer.ticks[0].tick_color[0] = 0
+    assert ticks[0].tick_color == [1, 0, 0, 1]
+    labeller = renderer.labeller
+    assert type(labeller) is type(timeline.labeller)
+    assert labeller.cull_labels and labeller.glyph_labels
+    assert labeller.time_font_size == 9
+    assert labeller.texture_cache is timeline.labeller.texture_cache
+    assert not labeller.push_dates and not labeller.async_labels
+
+
+@pytest.mark.parametrize('change', [
+    lambda timeline: setattr(timeline.labeller, 'cull_labels', True),
+    lambda timeline: setattr(timeline.labeller, 'glyph_labels', True),
+    lambda timeline: setattr(timeline.labeller, 'date_font_size', 14),
+    lambda timeline: setattr(timeline.ticks[0], 'tick_color', [0, 1, 0, 1]),
+    lambda timeline: setattr(timeline.ticks[0], 'min_label_space', 80),
+    lambda timeline: setattr(timeline, 'tz', timezone('Asia/Tokyo'))])
+def test_tiles_are_rendered_again_for_a_new_look(change):
+    timeline = Timeline(size=(100, 600), ticks=selected_time_ticks(),
+                        tiled=True)
+    timeline.index_0, timeline.index_1 = 19700., 19700.25
+    timeline.redraw()
+    tiles = timeline._tiles
+    renderer, rendered = tiles._renderer, tiles.rendered
+    # the same look
+    timeline.redraw()
+    assert tiles.rendered == rendered and tiles._renderer is renderer
+    change(timeline)
+    timeline.redraw()
+    assert tiles._renderer is not renderer
+    assert tiles.rendered == 2 * rendered
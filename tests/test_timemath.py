@@ -0,0 +1,178 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from pytz import timezone, UTC
+
+from kivy.garden.timeline import civil_from_days, days_from_civil, \
+    round_micros, calendar_bounds, micros_of, split_micros, tz_offsets, \
+    micros_per_day, micros_per_second
+
+epoch = date(1970, 1, 1)
+
+
+@pytest.mark.parametrize('days', [-719468, -141428, -1, 0, 59, 60, 11016,
+                                  15000, 19782, 2932896])
+def test_civil_from_days_matches_date(days):
+    # includes 0000-03-01, 1582-10-15, leap days and 9999-12-31
+    d = date.fromordinal(epoch.toordinal() + days) if \
+        epoch.toordinal() + days >= 1 else None
+    civil = civil_from_days(days)
+    if d is not None:
+        assert civil == (d.year, d.month, d.day)
+    assert days_from_civil(*civil) == days
+
+
+def test_civil_round_trip_every_day_of_four_centuries():
+    start = days_from_civil(1900, 1, 1)
+    d = date(1900, 1, 1)
+    for days in range(start, start + 146097):
+        assert civil_from_days(days) == (d.year, d.month, d.day)
+        assert days_from_civil(d.year, d.month, d.day) == days
+        d += timedelta(1)
+
+
+def test_civil_from_days_arrays():
+    numpy = pytest.importorskip('numpy')
+    days = numpy.arange(-800000, 800000, 997, dtype='int64')
+    years, months, mdays = civil_from_days(days)
+    assert [tuple(map(int, t)) for t in zip(years, months, mdays)] == \
+        [civil_from_days(int(d)) for d in days]
+
+
+@pytest.mark.parametrize('mode', ['day', '6 hours', 'hour', '15 minutes',
+                                  'second', '100 milliseconds',
+                                  'millisecond'])
+def test_round_micros_fixed_modes(mode):
+    from kivy.garden.timeline import mode_micros
+    unit = mode_micros(mode)
+    rng = random.Random(mode)
+    for _ in range(500):
+        micros = rng.randrange(-10 ** 17, 10 ** 17)
+        down = round_micros(micros, mode, 'down')
+        up = round_micros(micros, mode, 'up')
+        assert down % unit == 0 and up % unit == 0
+        assert down <= micros <= up and up - down in (0, unit)
+        assert (up == down) == (micros % unit == 0)
+        nearest = round_micros(micros, mode)
+        assert nearest == (down if 2 * (micros - down) < unit else up)
+
+
+def test_round_micros_halves_round_up():
+    assert round_micros(500000, 'second') == micros_per_second
+    assert round_micros(499999, 'second') == 0
+    assert round_micros(-500000, 'second') == 0
+    assert round_micros(-500001, 'second') == -micros_per_second
+
+
+def _day_micros(year, month, day):
+    return days_from_civil(year, month, day) * micros_per_day
+
+
+@pytest.mark.parametrize('mode, expected', [
+    ('week', ((2024, 5, 13), (2024, 5, 20))),
+    ('month', ((2024, 5, 1), (2024, 6, 1))),
+    ('quarter', ((2024, 4, 1), (2024, 7, 1))),
+    ('year', ((2024, 1, 1), (2025, 1, 1))),
+    ('decade', ((2020, 1, 1), (2030, 1, 1)))])
+def test_calendar_bounds(mode, expected):
+    start, end = [_day_micros(*d) for d in expected]
+    for micros in (start, start + 1,
+                   micros_of(datetime(2024, 5, 17, 8, 30)), end - 1):
+        assert calendar_bounds(micros, mode) == (start, end)
+    assert calendar_bounds(end, mode)[0] == end
+    # a week starts on Monday
+    if mode == 'week':
+        assert split_micros(start)[7] == 0
+
+
+def test_calendar_bounds_far_from_epoch():
+    assert calendar_bounds(_day_micros(1, 2, 28), 'quarter') == \
+        (_day_micros(1, 1, 1), _day_micros(1, 4, 1))
+    assert calendar_bounds(_day_micros(9999, 12, 31), 'month') == \
+        (_day_micros(9999, 12, 1), _day_micros(10000, 1, 1))
+    assert calendar_bounds(_day_micros(1900, 3, 1) - 1, 'month') == \
+        (_day_micros(1900, 2, 1), _day_micros(1900, 3, 1))
+
+
+def test_round_micros_calendar_modes():
+    # february 2024 has 29 days, so its half is on the 15th at noon
+    micros = micros_of(datetime(2024, 2, 15, 12))
+    assert round_micros(micros, 'month') == _day_micros(2024, 3, 1)
+    assert round_micros(micros - 1, 'month') == _day_micros(2024, 2, 1)
+    assert round_micros(micros, 'month', 'down') == _day_micros(2024, 2, 1)
+    assert round_micros(_day_micros(2024, 2, 1), 'month', 'up') == \
+        _day_micros(2024, 2, 1)
+    assert round_micros(micros, 'year', 'up') == _day_micros(2025, 1, 1)
+
+
+def test_split_micros():
+    micros = micros_of(datetime(1969, 12, 31, 23, 59, 58, 123456))
+    assert split_micros(micros) == (1969, 12, 31, 23, 59, 58, 123456, 2)
+
+
+@pytest.mark.parametrize('name', ['UTC', 'Etc/GMT+5', 'Europe/London',
+                                  'America/New_York', 'Australia/Lord_Howe',
+                                  'America/Santiago', 'Asia/Kolkata'])
+def test_tz_offsets_match_pytz(name):
+    tz = timezone(name)
+    offsets = tz_offsets(tz)
+    assert tz_offsets(tz) is offsets
+    rng = random.Random(name)
+    seconds = [rng.randrange(-2 * 10 ** 9, 2 * 10 ** 9) for _ in range(300)]
+    # around each transition of 2024
+    for t in getattr(tz, '_utc_transition_times', []):
+        if t.year == 2024:
+            s = int((t - datetime(1970, 1, 1)).total_seconds())
+            seconds.extend((s - 1, s, s + 1))
+    for s in seconds:
+        dt = (datetime(1970, 1, 1, tzinfo=UTC) +
+              timedelta(seconds=s)).astimezone(tz)
+        assert offsets.offset_at(s) == dt.utcoffset().total_seconds()
+        micros = s * micros_per_second + 250
+        local = offsets.local_micros(micros)
+        assert split_micros(local)[:6] == dt.timetuple()[:6]
+        # an ambiguous wall clock may give the other instant showing it
+        assert offsets.local_micros(offsets.utc_micros(local)) == local
+        assert offsets.datetime_of(s) == dt
+
+
+def test_tz_offsets_utc_micros_round_trips():
+    offsets = tz_offsets(timezone('America/New_York'))
+    # 2024-03-10 02:30 doesn't exist and 2024-11-03 01:30 happens twice
+    for month, day in ((1, 1), (6, 1), (12, 31)):
+        micros = micros_of(timezone('America/New_York').localize(
+            datetime(2024, month, day, 12)))
+        assert offsets.utc_micros(offsets.local_micros(micros)) == micros
+    skipped = micros_of(datetime(2024, 3, 10, 2, 30))
+    assert offsets.utc_micros(skipped) in (
+        micros_of(datetime(2024, 3, 10, 7, 30)),
+        micros_of(datetime(2024, 3, 10, 6, 30)))
+
+
+def test_tz_offsets_arrays_match_scalars():
+    numpy = pytest.importorskip('numpy')
+    offsets = tz_offsets(timezone('Australia/Lord_Howe'))
+    rng = random.Random(4)
+    micros = numpy.array([rng.randrange(-10 ** 15, 4 * 10 ** 15)
+                          for _ in range(500)], dtype='int64')
+    assert list(offsets.local_array(micros)) == \
+        [offsets.local_micros(int(m)) for m in micros]
+    assert list(offsets.round_array(micros, 'hour')) == \
+        [offsets.round_micros(int(m), 'hour') for m in micros]
+
+
+@pytest.mark.parametrize('name, day', [
+    ('America/Asuncion', (2023, 10, 1)),
+    ('Asia/Tehran', (2021, 3, 22)),
+    ('America/New_York', (2024, 3, 10))])
+def test_first_showing_skipped_midnight_is_the_transition(name, day):
+    tz = timezone(name)
+    offsets = tz_offsets(tz)
+    local = _day_micros(*day)
+    first = offsets.first_showing(local)
+    # the first second showing the day
+    assert offsets.local_micros(first) >= local
+    assert offsets.local_micros(first - micros_per_second) < local
+    noon = local + 12 * 3600 * micros_per_second
+    assert offsets.first_showing(noon) == offsets.utc_micros(noon)